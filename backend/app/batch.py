@@ -0,0 +1,88 @@
+"""
+Run a file of chat requests as one batch, for routing checks after prompt edits
+and for pre-warming the response cache.
+
+Input is JSONL: each line a ChatRequest object ({"messages": [...], "state": ..., "session_id": ...})
+or just a question string. Results are written as JSONL in completion order, one per
+input line (with its `index`), then a summary line.
+
+Run from backend/:
+    python -m app.batch questions.jsonl -o results.jsonl
+    python -m app.batch questions.jsonl --url http://localhost:8000
+
+Without --url the requests run in this process; that only pre-warms a running server's
+cache when both use the sqlite response cache backend. With --url they are sent to
+the server's /api/chat/batch endpoint, which needs BATCH_ENABLED and the admin token
+(--token, default BATCH_ADMIN_TOKEN).
+"""
+import sys
+import json
+import asyncio
+import argparse
+import urllib.request
+from pathlib import Path
+from typing import List, TextIO
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config import settings, ChatRequest
+
+
+def read_requests(path: str) -> List[ChatRequest]:
+    requests = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if not line.strip():
+                continue
+            item = json.loads(line)
+            if isinstance(item, str):
+                item = {"messages": [{"role": "user", "content": item}]}
+            requests.append(ChatRequest.model_validate(item))
+    return requests
+
+
+async def run_local(requests: List[ChatRequest], concurrency: int, out: TextIO) -> None:
+    from app.services.ai_services import AIService
+    from app.services.batch import BatchRunner
+
+    async for item in BatchRunner(AIService(), concurrency).run(requests):
+        out.write(json.dumps(item) + "\n")
+        out.flush()
+
+
+def run_remote(requests: List[ChatRequest], concurrency: int, url: str, token: str, out: TextIO) -> None:
+    body = json.dumps({"requests": [r.model_dump() for r in requests], "concurrency": concurrency}).encode("utf-8")
+    request = urllib.request.Request(
+        url.rstrip("/") + "/api/chat/batch",
+        data=body,
+        headers={"Content-Type": "application/json", "Authorization": f"Bearer {token}"}
+    )
+    with urllib.request.urlopen(request) as response:
+        for line in response:
+            out.write(line.decode("utf-8"))
+            out.flush()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="JSONL file of chat requests or question strings")
+    parser.add_argument("-o", "--output", help="results file (default stdout)")
+    parser.add_argument("--concurrency", type=int, default=settings.BATCH_CONCURRENCY)
+    parser.add_argument("--url", help="send the batch to this server instead of running it here")
+    parser.add_argument("--token", default=settings.BATCH_ADMIN_TOKEN, help="admin token for --url (default BATCH_ADMIN_TOKEN)")
+    args = parser.parse_args()
+
+    requests = read_requests(args.input)
+    out = open(args.output, "w", encoding="utf-8") if args.output else sys.stdout
+    try:
+        if args.url:
+            run_remote(requests, args.concurrency, args.url, args.token, out)
+        else:
+            asyncio.run(run_local(requests, args.concurrency, out))
+    finally:
+        if args.output:
+            out.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -13,11 +13,21 @@ class Message(BaseModel):
 class ChatRequest(BaseModel):
     messages: List[Message]
     state: Optional[Dict[str, Any]] = None
+    # With a session_id, messages only holds the new turn; history and state are kept server-side
+    session_id: Optional[str] = None
+
+class BatchChatRequest(BaseModel):
+    requests: List[ChatRequest]
+    # Requests run at once; capped by BATCH_MAX_CONCURRENCY
+    concurrency: Optional[int] = None
 
 class ChatResponse(BaseModel):
     response: str
     state: Dict[str, Any]
     needs_interrupt: bool = False
+    session_id: Optional[str] = None
+    # Estimated prompt tokens per graph node for this request
+    input_tokens: Dict[str, int] = {}
 
 class Settings:
     # API Keys
@@ -35,15 +45,168 @@ class Settings:
     CORS_ALLOW_HEADERS: List[str] = ["*"]
     CORS_EXPOSE_HEADERS: List[str] = ["*"]
     
-    # Model settings
-    MODEL_NAME: str = "gemini-2.5-flash-lite"
-    TEMPERATURE: float = 0.7
-    MAX_TOKENS: int = 1000
+    # LLM provider: "gemini", or "synthetic" / "record" / "replay" for offline runs and benchmarks
+    LLM_PROVIDER: str = os.getenv("LLM_PROVIDER", "gemini")
+    SYNTHETIC_LATENCY_SECONDS: float = float(os.getenv("SYNTHETIC_LATENCY_SECONDS", "0.3"))
+    SYNTHETIC_TOKENS_PER_SECOND: float = float(os.getenv("SYNTHETIC_TOKENS_PER_SECOND", "200"))
+    SYNTHETIC_RESPONSE_TOKENS: int = int(os.getenv("SYNTHETIC_RESPONSE_TOKENS", "120"))
+    LLM_RECORDING_PATH: str = os.getenv("LLM_RECORDING_PATH", "llm_recording.jsonl")
+    LLM_REPLAY_LATENCY_SCALE: float = float(os.getenv("LLM_REPLAY_LATENCY_SCALE", "0"))
+    
+    # Model settings: the default profile, for any node without its own
+    MODEL_NAME: str = os.getenv("MODEL_NAME", "gemini-2.5-flash-lite")
+    TEMPERATURE: float = float(os.getenv("TEMPERATURE", "0.7"))
+    MAX_TOKENS: int = int(os.getenv("MAX_TOKENS", "1000"))
+    # Per-node profiles: the router answers deterministically within ROUTER_MAX_TOKENS,
+    # chat keeps the defaults and deep dives get a larger output budget
+    ROUTER_MODEL_NAME: str = os.getenv("ROUTER_MODEL_NAME", MODEL_NAME)
+    ROUTER_TEMPERATURE: float = float(os.getenv("ROUTER_TEMPERATURE", "0"))
+    CHAT_MODEL_NAME: str = os.getenv("CHAT_MODEL_NAME", MODEL_NAME)
+    CHAT_TEMPERATURE: float = float(os.getenv("CHAT_TEMPERATURE", str(TEMPERATURE)))
+    CHAT_MAX_TOKENS: int = int(os.getenv("CHAT_MAX_TOKENS", str(MAX_TOKENS)))
+    DEEP_DIVE_MODEL_NAME: str = os.getenv("DEEP_DIVE_MODEL_NAME", MODEL_NAME)
+    DEEP_DIVE_TEMPERATURE: float = float(os.getenv("DEEP_DIVE_TEMPERATURE", str(TEMPERATURE)))
+    DEEP_DIVE_MAX_TOKENS: int = int(os.getenv("DEEP_DIVE_MAX_TOKENS", "2048"))
+    
+    # Hedged LLM calls: a call still running after its node's recent HEDGE_PERCENTILE latency
+    # (at least HEDGE_MIN_DELAY_SECONDS) gets a duplicate, and the first to finish is used.
+    # At most HEDGE_MAX_FRACTION of calls are hedged; no delay is derived before HEDGE_MIN_SAMPLES calls
+    HEDGE_ENABLED: bool = os.getenv("HEDGE_ENABLED", "false").lower() == "true"
+    HEDGE_PERCENTILE: float = float(os.getenv("HEDGE_PERCENTILE", "95"))
+    HEDGE_MIN_DELAY_SECONDS: float = float(os.getenv("HEDGE_MIN_DELAY_SECONDS", "0.2"))
+    HEDGE_MAX_FRACTION: float = float(os.getenv("HEDGE_MAX_FRACTION", "0.1"))
+    HEDGE_MIN_SAMPLES: int = int(os.getenv("HEDGE_MIN_SAMPLES", "20"))
+    
+    # Context caching of the static prompt prefixes: "auto" (Gemini's when LLM_PROVIDER is gemini),
+    # "gemini", "stub" (offline, with the synthetic provider) or "none"
+    CONTEXT_CACHE_PROVIDER: str = os.getenv("CONTEXT_CACHE_PROVIDER", "auto")
+    CONTEXT_CACHE_TTL_SECONDS: float = float(os.getenv("CONTEXT_CACHE_TTL_SECONDS", "3600"))
+    # Gemini rejects cached contents below a model-specific minimum size
+    CONTEXT_CACHE_MIN_TOKENS: int = int(os.getenv("CONTEXT_CACHE_MIN_TOKENS", "1024"))
+    # Offline checks of the inline fallback with the "stub" provider: "none", "create" (every create fails)
+    # or "reject" (the model rejects every handle, as if the provider dropped it)
+    CONTEXT_CACHE_STUB_FAIL: str = os.getenv("CONTEXT_CACHE_STUB_FAIL", "none")
+    
+    # Shared connection pool to the Gemini API (gRPC, so HTTP/2; one connection per channel):
+    # channels, keepalive ping interval (0 disables), idle time before gRPC drops a connection,
+    # and how often idle or failed channels are re-connected. Pre-connected at startup unless disabled
+    LLM_POOL_ENABLED: bool = os.getenv("LLM_POOL_ENABLED", "true").lower() == "true"
+    LLM_API_ENDPOINT: str = os.getenv("LLM_API_ENDPOINT", "https://generativelanguage.googleapis.com")
+    LLM_POOL_SIZE: int = int(os.getenv("LLM_POOL_SIZE", "4"))
+    LLM_POOL_KEEPALIVE_SECONDS: float = float(os.getenv("LLM_POOL_KEEPALIVE_SECONDS", "300"))
+    LLM_POOL_IDLE_TIMEOUT_SECONDS: float = float(os.getenv("LLM_POOL_IDLE_TIMEOUT_SECONDS", "3600"))
+    LLM_POOL_CHECK_SECONDS: float = float(os.getenv("LLM_POOL_CHECK_SECONDS", "30"))
+    LLM_POOL_PRECONNECT: bool = os.getenv("LLM_POOL_PRECONNECT", "true").lower() == "true"
+    LLM_POOL_CONNECT_TIMEOUT_SECONDS: float = float(os.getenv("LLM_POOL_CONNECT_TIMEOUT_SECONDS", "5"))
+    
+    # Concurrency settings
+    LLM_MAX_CONCURRENCY: int = int(os.getenv("LLM_MAX_CONCURRENCY", "256"))
+    # Calls beyond the limit wait in a queue of this size, for at most this long; otherwise 503
+    LLM_QUEUE_SIZE: int = int(os.getenv("LLM_QUEUE_SIZE", "512"))
+    LLM_QUEUE_TIMEOUT_SECONDS: float = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "10"))
+    NODE_TIMEOUT_SECONDS: float = float(os.getenv("NODE_TIMEOUT_SECONDS", "60"))
+    
+    # Rate limits per client IP and per session: average requests per minute, and burst size
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    RATE_LIMIT_IP_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_IP_PER_MINUTE", "60"))
+    RATE_LIMIT_IP_BURST: int = int(os.getenv("RATE_LIMIT_IP_BURST", "20"))
+    RATE_LIMIT_SESSION_PER_MINUTE: float = float(os.getenv("RATE_LIMIT_SESSION_PER_MINUTE", "20"))
+    RATE_LIMIT_SESSION_BURST: int = int(os.getenv("RATE_LIMIT_SESSION_BURST", "10"))
+    
+    # Batch endpoint: off unless enabled with an admin token, which callers send as "Authorization: Bearer <token>"
+    BATCH_ENABLED: bool = os.getenv("BATCH_ENABLED", "false").lower() == "true"
+    BATCH_ADMIN_TOKEN: str = os.getenv("BATCH_ADMIN_TOKEN", "")
+    # Default and maximum requests run at once, and maximum requests per batch
+    BATCH_CONCURRENCY: int = int(os.getenv("BATCH_CONCURRENCY", "8"))
+    BATCH_MAX_CONCURRENCY: int = int(os.getenv("BATCH_MAX_CONCURRENCY", "32"))
+    BATCH_MAX_ITEMS: int = int(os.getenv("BATCH_MAX_ITEMS", "1000"))
+    
+    # Routing settings
+    FAST_ROUTER_ENABLED: bool = os.getenv("FAST_ROUTER_ENABLED", "true").lower() == "true"
+    FAST_ROUTER_MIN_CONFIDENCE: float = float(os.getenv("FAST_ROUTER_MIN_CONFIDENCE", "0.8"))
+    
+    # LLM router: output token cap, follow-ups after an invalid decision, cached decisions
+    ROUTER_MAX_TOKENS: int = int(os.getenv("ROUTER_MAX_TOKENS", "128"))
+    ROUTER_REPAIR_ATTEMPTS: int = int(os.getenv("ROUTER_REPAIR_ATTEMPTS", "1"))
+    ROUTER_CACHE_SIZE: int = int(os.getenv("ROUTER_CACHE_SIZE", "1024"))
+    
+    # Start the previous turn's answer node alongside the LLM router; kept only if the router agrees
+    SPECULATION_ENABLED: bool = os.getenv("SPECULATION_ENABLED", "false").lower() == "true"
+    
+    # Opt-in: after an overview of projects/experience, generate the first deep-dive answer for the items
+    # the user is most likely to pick next, only while fewer than PREFETCH_MAX_IN_FLIGHT LLM calls run
+    PREFETCH_ENABLED: bool = os.getenv("PREFETCH_ENABLED", "false").lower() == "true"
+    PREFETCH_ITEMS_PER_TURN: int = int(os.getenv("PREFETCH_ITEMS_PER_TURN", "2"))
+    PREFETCH_MAX_IN_FLIGHT: int = int(os.getenv("PREFETCH_MAX_IN_FLIGHT", "4"))
+    PREFETCH_CONCURRENCY: int = int(os.getenv("PREFETCH_CONCURRENCY", "1"))
+    # Token budget refilled per minute, queued candidates and how long they may wait, answers kept and for how long
+    PREFETCH_TOKENS_PER_MINUTE: int = int(os.getenv("PREFETCH_TOKENS_PER_MINUTE", "20000"))
+    PREFETCH_QUEUE_SIZE: int = int(os.getenv("PREFETCH_QUEUE_SIZE", "32"))
+    PREFETCH_MAX_WAIT_SECONDS: float = float(os.getenv("PREFETCH_MAX_WAIT_SECONDS", "30"))
+    PREFETCH_MAX_ENTRIES: int = int(os.getenv("PREFETCH_MAX_ENTRIES", "256"))
+    PREFETCH_TTL_SECONDS: float = float(os.getenv("PREFETCH_TTL_SECONDS", "900"))
+    
+    # Worker processes; they share no memory, so with more than one the cache and
+    # session store default to the SQLite backends every worker can open
+    WORKERS: int = int(os.getenv("WORKERS", "1"))
+    SHARED_BACKEND: str = "sqlite" if WORKERS > 1 else "memory"
+    
+    # Response cache settings
+    RESPONSE_CACHE_ENABLED: bool = os.getenv("RESPONSE_CACHE_ENABLED", "true").lower() == "true"
+    RESPONSE_CACHE_BACKEND: str = os.getenv("RESPONSE_CACHE_BACKEND", SHARED_BACKEND)
+    RESPONSE_CACHE_PATH: str = os.getenv("RESPONSE_CACHE_PATH", "response_cache.sqlite3")
+    RESPONSE_CACHE_SIZE: int = int(os.getenv("RESPONSE_CACHE_SIZE", "1024"))
+    RESPONSE_CACHE_TTL_SECONDS: float = float(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "3600"))
+    
+    # Share one graph execution between identical concurrent requests
+    COALESCING_ENABLED: bool = os.getenv("COALESCING_ENABLED", "true").lower() == "true"
+    
+    # Session store settings
+    SESSION_STORE_BACKEND: str = os.getenv("SESSION_STORE_BACKEND", SHARED_BACKEND)
+    SESSION_STORE_PATH: str = os.getenv("SESSION_STORE_PATH", "sessions.sqlite3")
+    SESSION_MAX_SESSIONS: int = int(os.getenv("SESSION_MAX_SESSIONS", "10000"))
+    SESSION_IDLE_TTL_SECONDS: float = float(os.getenv("SESSION_IDLE_TTL_SECONDS", "1800"))
+    SESSION_MAX_MESSAGES: int = int(os.getenv("SESSION_MAX_MESSAGES", "20"))
+    
+    # History settings
+    HISTORY_TOKEN_BUDGET: int = int(os.getenv("HISTORY_TOKEN_BUDGET", "2000"))
+    HISTORY_SUMMARY_TOKENS: int = int(os.getenv("HISTORY_SUMMARY_TOKENS", "300"))
+    
+    # Portfolio data: the frontend's JSON files, polled for changes every DATA_POLL_SECONDS (0 disables)
+    DATA_DIR: str = os.getenv("DATA_DIR", os.path.join(os.path.dirname(__file__), "..", "..", "frontend", "src", "data"))
+    DATA_POLL_SECONDS: float = float(os.getenv("DATA_POLL_SECONDS", "2"))
+    
+    # Retrieval settings
+    RETRIEVAL_ENABLED: bool = os.getenv("RETRIEVAL_ENABLED", "true").lower() == "true"
+    RETRIEVAL_MIN_DATA_TOKENS: int = int(os.getenv("RETRIEVAL_MIN_DATA_TOKENS", "4000"))
+    RETRIEVAL_TOP_K: int = int(os.getenv("RETRIEVAL_TOP_K", "6"))
+    
+    # Response compression: brotli (if installed) or gzip for text bodies of at least COMPRESSION_MIN_SIZE bytes
+    COMPRESSION_ENABLED: bool = os.getenv("COMPRESSION_ENABLED", "true").lower() == "true"
+    COMPRESSION_MIN_SIZE: int = int(os.getenv("COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_GZIP_LEVEL: int = int(os.getenv("COMPRESSION_GZIP_LEVEL", "6"))
+    COMPRESSION_BROTLI_QUALITY: int = int(os.getenv("COMPRESSION_BROTLI_QUALITY", "4"))
+    
+    # Image variants: source images, where generated variants are kept, width steps, encoder quality, browser cache lifetime
+    IMAGES_DIR: str = os.getenv("IMAGES_DIR", os.path.join(DATA_DIR, "images"))
+    IMAGE_CACHE_DIR: str = os.getenv("IMAGE_CACHE_DIR", "image_cache")
+    IMAGE_WIDTHS: List[int] = [int(w) for w in os.getenv("IMAGE_WIDTHS", "320,640,960,1280,1920").split(",")]
+    IMAGE_QUALITY: int = int(os.getenv("IMAGE_QUALITY", "75"))
+    IMAGE_MAX_AGE_SECONDS: int = int(os.getenv("IMAGE_MAX_AGE_SECONDS", "604800"))
+    
+    # Observability settings
+    TRACE_LOG_ENABLED: bool = os.getenv("TRACE_LOG_ENABLED", "true").lower() == "true"
+    
+    # Startup: "lazy" builds the AI service on first use (in the background right away with STARTUP_WARMUP),
+    # "lifespan" builds it during startup before serving
+    STARTUP_MODE: str = os.getenv("STARTUP_MODE", "lazy")
+    STARTUP_WARMUP: bool = os.getenv("STARTUP_WARMUP", "true").lower() == "true"
     
     # Server settings
-    HOST: str = "0.0.0.0"
-    PORT: int = 8000
-    RELOAD: bool = True
+    HOST: str = os.getenv("HOST", "0.0.0.0")
+    PORT: int = int(os.getenv("PORT", "8000"))
+    # Only applies to a single worker
+    RELOAD: bool = os.getenv("RELOAD", "true").lower() == "true"
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,160 @@
+import os
+import json
+import asyncio
+import hashlib
+import logging
+import threading
+from types import MappingProxyType
+from typing import Dict, Any, List, Optional, Tuple, Callable, Mapping
+
+logger = logging.getLogger("portfolio.data")
+
+# Section name -> file under the data directory
+BASIC_FILES = {
+    "personal_info": "personal_info.json",
+    "experience": "experience.json",
+    "projects": "projects.json",
+    "skills": "skills.json",
+}
+DETAILED_FILES = {
+    "det_experience": os.path.join("detailed", "detailed_experience.json"),
+    "det_projects": os.path.join("detailed", "detailed_projects.json"),
+}
+
+# (topic, section, list key) for the records that have ids
+BASIC_RECORDS = (("projects", "projects", "projects"), ("experience", "experience", "experience"))
+DETAILED_RECORDS = (("projects", "det_projects", "projects"), ("experience", "det_experience", "experience"))
+
+
+def index_records(data: Dict[str, Any], records) -> Mapping[Tuple[str, Any], Dict[str, Any]]:
+    """(topic, id) -> record"""
+    return MappingProxyType({
+        (topic, record["id"]): record
+        for topic, section, key in records
+        for record in data[section][key]
+    })
+
+
+class DataSnapshot:
+    """
+    One loaded version of the portfolio data. Snapshots are never modified once
+    published; a change on disk produces a new snapshot that replaces this one.
+    """
+    __slots__ = ("version", "digest", "basic_info", "detailed_info", "items", "detailed_items")
+
+    def __init__(self, version: int, basic_info: Dict[str, Any], detailed_info: Dict[str, Any]):
+        self.version = version
+        self.basic_info = basic_info
+        self.detailed_info = detailed_info
+        # Content hash: stable across restarts, unlike version
+        self.digest = hashlib.sha256(json.dumps([basic_info, detailed_info], sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.items = index_records(basic_info, BASIC_RECORDS)
+        self.detailed_items = index_records(detailed_info, DETAILED_RECORDS)
+
+
+class DataStore:
+    """
+    Portfolio data loaded from the frontend JSON files, reloaded when they change.
+    Readers take `store.snapshot` once per use; reloads swap it in a single assignment,
+    so a reader always sees one consistent version.
+    """
+
+    def __init__(self, data_dir: str):
+        self.data_dir = data_dir
+        self.listeners: List[Callable[[DataSnapshot], None]] = []
+        self.reloads = 0
+        self.reload_errors = 0
+        self._lock = threading.Lock()
+        self._task: Optional[asyncio.Task] = None
+        self._fingerprint = self._stat()
+        self._failed_fingerprint = None
+        self.snapshot = self._load(1)
+
+    def _paths(self) -> List[str]:
+        return [os.path.join(self.data_dir, name) for name in list(BASIC_FILES.values()) + list(DETAILED_FILES.values())]
+
+    def _stat(self) -> Tuple[Tuple[int, int], ...]:
+        """(mtime, size) of every data file; any difference means a reload"""
+        fingerprint = []
+        for path in self._paths():
+            stat = os.stat(path)
+            fingerprint.append((stat.st_mtime_ns, stat.st_size))
+        return tuple(fingerprint)
+
+    def _read(self, name: str) -> Any:
+        with open(os.path.join(self.data_dir, name), "r", encoding="utf-8") as file:
+            return json.load(file)
+
+    def _load(self, version: int) -> DataSnapshot:
+        basic_info = {section: self._read(name) for section, name in BASIC_FILES.items()}
+        detailed_info = {section: self._read(name) for section, name in DETAILED_FILES.items()}
+        return DataSnapshot(version, basic_info, detailed_info)
+
+    @property
+    def version(self) -> int:
+        return self.snapshot.version
+
+    def subscribe(self, listener: Callable[[DataSnapshot], None]) -> None:
+        """Called with every new snapshot after it is published"""
+        self.listeners.append(listener)
+
+    def refresh(self) -> bool:
+        """
+        Reload if any file changed since the last load. A file that doesn't parse
+        (e.g. caught mid-write) keeps the current snapshot and is retried once the files change again.
+        Returns whether a new snapshot was published.
+        """
+        with self._lock:
+            fingerprint = None
+            try:
+                fingerprint = self._stat()
+                if fingerprint in (self._fingerprint, self._failed_fingerprint):
+                    return False
+                snapshot = self._load(self.snapshot.version + 1)
+            except (OSError, ValueError, KeyError, TypeError) as e:
+                self._failed_fingerprint = fingerprint
+                self.reload_errors += 1
+                logger.warning(json.dumps({"event": "data_reload_failed", "error": str(e)}))
+                return False
+
+            self._fingerprint = fingerprint
+            if snapshot.digest == self.snapshot.digest:
+                # Touched but not changed
+                return False
+            self.snapshot = snapshot
+            self.reloads += 1
+
+        logger.info(json.dumps({"event": "data_reloaded", "version": snapshot.version, "digest": snapshot.digest}))
+        for listener in self.listeners:
+            try:
+                listener(snapshot)
+            except Exception as e:
+                # One failing consumer must not stop the others or the watcher
+                logger.error(json.dumps({"event": "data_listener_failed", "version": snapshot.version, "error": repr(e)}))
+        return True
+
+    async def watch(self, interval: float) -> None:
+        """Poll the files' mtimes every interval seconds; reloads run off the event loop"""
+        while True:
+            await asyncio.sleep(interval)
+            await asyncio.to_thread(self.refresh)
+
+    def start(self, interval: float) -> None:
+        if self._task is None and interval > 0:
+            self._task = asyncio.create_task(self.watch(interval))
+
+    async def stop(self) -> None:
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "version": self.snapshot.version,
+            "reloads": self.reloads,
+            "reload_errors": self.reload_errors,
+        }
@@ -1,20 +1,99 @@
+import os
 import sys
+import hmac
+import math
+import asyncio
+import logging
 from pathlib import Path
-from fastapi import FastAPI, HTTPException
+from typing import Optional
+from contextlib import asynccontextmanager
+from fastapi import FastAPI, HTTPException, Depends, Request, Query
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse, Response, JSONResponse, ORJSONResponse
+from prometheus_client import generate_latest, CONTENT_TYPE_LATEST
 
 # Add the parent directory to the Python path
 sys.path.append(str(Path(__file__).parent.parent))
 
-from app.config import settings, Message, ChatRequest, ChatResponse
-from app.services.ai_services import AIService
+from app.config import settings, Message, ChatRequest, ChatResponse, BatchChatRequest
+from app.services.telemetry import TraceMiddleware, metrics_registry, register_stats_source
+from app.services.startup import ServiceLoader
+from app.services.rate_limit import RateLimiter, OverloadedError
+from app.services.batch import BatchRunner
+from app.services.json_io import ORJSONRoute, dumps
+from app.services.compression import CompressionMiddleware
+from app.services.images import ImageVariants, RangeFileResponse, parse_range, MEDIA_TYPES
+
+def create_ai_service():
+    # Imported here: langgraph, langchain and the Gemini client dominate startup time
+    from app.services.ai_services import AIService
+    return AIService()
+
+def start_background_tasks(ai_service):
+    # Pick up edits to the portfolio data without restarting
+    ai_service.data_store.start(settings.DATA_POLL_SECONDS)
+    # Connect to the LLM provider before the first request needs it, and again after idle periods
+    if ai_service.upstream is not None:
+        ai_service.upstream.start(preconnect=settings.LLM_POOL_PRECONNECT)
+
+service_loader = ServiceLoader(create_ai_service, on_ready=start_background_tasks)
+
+async def get_ai_service():
+    return await service_loader.get()
+
+# Per worker process: with several workers each client gets up to WORKERS times these limits
+ip_limiter = RateLimiter("ip", settings.RATE_LIMIT_IP_PER_MINUTE / 60, settings.RATE_LIMIT_IP_BURST)
+session_limiter = RateLimiter("session", settings.RATE_LIMIT_SESSION_PER_MINUTE / 60, settings.RATE_LIMIT_SESSION_BURST)
+register_stats_source("rate_limit_ip", ip_limiter.stats)
+register_stats_source("rate_limit_session", session_limiter.stats)
+
+# Doesn't need the AI service, so images are served even while it is still being built
+image_variants = ImageVariants(settings.IMAGES_DIR, settings.IMAGE_CACHE_DIR, settings.IMAGE_WIDTHS, settings.IMAGE_QUALITY)
+register_stats_source("images", image_variants.stats)
+
+def retry_after_header(seconds: float) -> dict:
+    return {"Retry-After": str(max(1, math.ceil(seconds)))}
+
+def check_limits(http_request: Request, session_id: Optional[str], ai_service) -> None:
+    """
+    Reject before any work is done: 429 when the client IP or session is over its
+    rate limit, 503 when the LLM queue is already full. Both carry Retry-After.
+    """
+    if settings.RATE_LIMIT_ENABLED:
+        wait = ip_limiter.check(http_request.client.host if http_request.client else "unknown")
+        if not wait and session_id:
+            wait = session_limiter.check(session_id)
+        if wait:
+            raise HTTPException(status_code=429, detail="Rate limit exceeded", headers=retry_after_header(wait))
+    try:
+        ai_service.llm_gate.check()
+    except OverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers=retry_after_header(e.retry_after))
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if settings.STARTUP_MODE == "lifespan":
+        # Serve only once the service is built
+        await service_loader.get()
+    elif settings.STARTUP_WARMUP:
+        # Serve liveness checks right away, build in the background
+        service_loader.warm_up()
+    yield
+    if service_loader.ready:
+        await service_loader.instance.data_store.stop()
+        if service_loader.instance.upstream is not None:
+            await service_loader.instance.upstream.close()
 
 # Initialize FastAPI app
 app = FastAPI(
     title="Portfolio AI Backend",
     description="Backend service for portfolio chat application",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan,
+    # orjson for response bodies, and for request bodies through the route class
+    default_response_class=ORJSONResponse
 )
+app.router.route_class = ORJSONRoute
 
 # CORS middleware
 app.add_middleware(
@@ -25,30 +104,211 @@ app.add_middleware(
     allow_headers=settings.CORS_ALLOW_HEADERS,
 )
 
-# Initialize AI service
-ai_service = AIService()
+# Brotli/gzip for text responses above the size threshold; streams are flushed per event
+if settings.COMPRESSION_ENABLED:
+    app.add_middleware(
+        CompressionMiddleware,
+        minimum_size=settings.COMPRESSION_MIN_SIZE,
+        gzip_level=settings.COMPRESSION_GZIP_LEVEL,
+        brotli_quality=settings.COMPRESSION_BROTLI_QUALITY
+    )
+
+# Trace id per request, request metrics and one JSON log line per request
+app.add_middleware(TraceMiddleware, log_requests=settings.TRACE_LOG_ENABLED)
+trace_logger = logging.getLogger("portfolio")
+trace_logger.setLevel(logging.INFO)
+trace_logger.addHandler(logging.StreamHandler())
 
 @app.get("/")
 async def root():
     return {"message": "Portfolio AI Backend is running"}
 
+@app.get("/ready")
+async def ready():
+    """Readiness: 503 until the AI service is built"""
+    status = service_loader.status()
+    return JSONResponse(status, status_code=200 if status["ready"] else 503)
+
+@app.get("/metrics")
+async def metrics():
+    return Response(generate_latest(metrics_registry()), media_type=CONTENT_TYPE_LATEST)
+
+@app.api_route("/api/images/{path:path}", methods=["GET", "HEAD"])
+async def image(
+    path: str,
+    request: Request,
+    w: Optional[int] = Query(None, ge=1, le=10000),
+    fmt: Optional[str] = Query(None, alias="format")
+):
+    """
+    A portfolio image resized to the next width step at or above w, as AVIF/WebP when
+    the client accepts it (or ?format=avif|webp|png|original). Variants are generated
+    once and cached on disk; ETag revalidation and single byte ranges are supported.
+    """
+    source = image_variants.source(path)
+    if source is None:
+        raise HTTPException(status_code=404, detail="Image not found")
+    
+    headers = {"Cache-Control": f"public, max-age={settings.IMAGE_MAX_AGE_SECONDS}"}
+    if fmt == "original" or not image_variants.formats:
+        file, etag = source, f'"{image_variants.variant_key(source, 0, "original")}"'
+        media_type = None
+    else:
+        fmt_used = image_variants.negotiate(fmt, request.headers.get("accept", ""))
+        file, etag = await image_variants.get(source, image_variants.snap_width(w), fmt_used)
+        media_type = MEDIA_TYPES[fmt_used]
+        if fmt is None:
+            headers["Vary"] = "Accept"
+    headers["ETag"] = etag
+    
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match and (if_none_match.strip() == "*" or etag in [tag.strip() for tag in if_none_match.split(",")]):
+        return Response(status_code=304, headers=headers)
+    
+    stat_result = os.stat(file)
+    range_header = request.headers.get("range")
+    if request.headers.get("if-range", etag) != etag:
+        # The client's partial copy is stale: send the whole file
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, stat_result.st_size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{stat_result.st_size}"})
+    return RangeFileResponse(file, byte_range, stat_result, media_type=media_type, headers=headers)
+
+@app.get("/api/data/stats")
+async def data_stats(ai_service=Depends(get_ai_service)):
+    return {**ai_service.data_store.stats(), "digest": ai_service.data_store.snapshot.digest}
+
+@app.get("/api/router/stats")
+async def router_stats(ai_service=Depends(get_ai_service)):
+    if not ai_service.fast_router:
+        return {"enabled": False}
+    return {"enabled": True, **ai_service.fast_router.stats()}
+
+@app.get("/api/cache/stats")
+async def cache_stats(ai_service=Depends(get_ai_service)):
+    if ai_service.response_cache is None:
+        return {"enabled": False}
+    return {"enabled": True, **ai_service.response_cache.stats()}
+
+@app.get("/api/coalescing/stats")
+async def coalescing_stats(ai_service=Depends(get_ai_service)):
+    if ai_service.coalescer is None:
+        return {"enabled": False}
+    return {"enabled": True, **ai_service.coalescer.stats()}
+
+@app.get("/api/sessions/stats")
+async def session_stats(ai_service=Depends(get_ai_service)):
+    return ai_service.session_store.stats()
+
+@app.get("/api/limits/stats")
+async def limits_stats(ai_service=Depends(get_ai_service)):
+    return {
+        "enabled": settings.RATE_LIMIT_ENABLED,
+        "ip": ip_limiter.stats(),
+        "session": session_limiter.stats(),
+        "llm_gate": ai_service.llm_gate.stats(),
+    }
+
 @app.post("/api/chat", response_model=ChatResponse)
-async def chat(request: ChatRequest):
+async def chat(request: ChatRequest, http_request: Request, ai_service=Depends(get_ai_service)):
+    check_limits(http_request, request.session_id, ai_service)
     try:
         result = await ai_service.chat(
-            [msg.dict() for msg in request.messages],
-            state_vars=request.state
+            [msg.model_dump() for msg in request.messages],
+            state_vars=request.state,
+            session_id=request.session_id
         )
         
-        return ChatResponse(
+        response = ChatResponse(
             response=result["response"],
             state=result["state"],
             needs_interrupt=result.get("needs_interrupt", False),
+            session_id=request.session_id,
+            input_tokens=result.get("input_tokens", {}),
             selection_options=result.get("selection_options")
         )
+        # Already validated; returning a Response skips FastAPI's second pass over response_model
+        return ORJSONResponse(response.model_dump())
+    except OverloadedError as e:
+        raise HTTPException(status_code=503, detail=str(e), headers=retry_after_header(e.retry_after))
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="LLM call timed out")
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+def format_sse(event: str, data: dict) -> str:
+    """Encode one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {dumps(data).decode('utf-8')}\n\n"
+
+@app.post("/api/chat/stream")
+async def chat_stream(request: ChatRequest, http_request: Request, ai_service=Depends(get_ai_service)):
+    check_limits(http_request, request.session_id, ai_service)
+    
+    async def event_source():
+        try:
+            async for event in ai_service.stream_chat(
+                [msg.model_dump() for msg in request.messages],
+                state_vars=request.state,
+                session_id=request.session_id
+            ):
+                yield format_sse(event["event"], event["data"])
+        except OverloadedError as e:
+            yield format_sse("error", {"detail": str(e), "retry_after": max(1, math.ceil(e.retry_after))})
+        except asyncio.TimeoutError:
+            yield format_sse("error", {"detail": "LLM call timed out"})
+        except Exception as e:
+            # Headers are already sent, so report failures in-band
+            yield format_sse("error", {"detail": str(e)})
+    
+    return StreamingResponse(
+        event_source(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
+
+@app.post("/api/chat/batch")
+async def chat_batch(request: BatchChatRequest, http_request: Request, ai_service=Depends(get_ai_service)):
+    """
+    Run many chat requests with bounded parallelism; results stream back as JSONL
+    in completion order, followed by a summary line. Admin only: needs BATCH_ENABLED
+    and the BATCH_ADMIN_TOKEN as a bearer token.
+    """
+    if not settings.BATCH_ENABLED or not settings.BATCH_ADMIN_TOKEN:
+        raise HTTPException(status_code=404, detail="Not Found")
+    authorization = http_request.headers.get("authorization", "")
+    if not hmac.compare_digest(authorization.encode("utf-8"), f"Bearer {settings.BATCH_ADMIN_TOKEN}".encode("utf-8")):
+        raise HTTPException(status_code=401, detail="Invalid admin token", headers={"WWW-Authenticate": "Bearer"})
+    if len(request.requests) > settings.BATCH_MAX_ITEMS:
+        raise HTTPException(status_code=413, detail=f"At most {settings.BATCH_MAX_ITEMS} requests per batch")
+    check_limits(http_request, None, ai_service)
+    client_ip = http_request.client.host if http_request.client else "unknown"
+    
+    async def admit():
+        # Every item is charged to the caller's IP; the batch runs at the rate it allows
+        if settings.RATE_LIMIT_ENABLED:
+            await ip_limiter.wait(client_ip)
+    
+    concurrency = min(request.concurrency or settings.BATCH_CONCURRENCY, settings.BATCH_MAX_CONCURRENCY)
+    runner = BatchRunner(ai_service, concurrency, admit)
+    
+    async def lines():
+        async for item in runner.run(request.requests):
+            yield dumps(item) + b"\n"
+    
+    return StreamingResponse(lines(), media_type="application/x-ndjson", headers={"X-Accel-Buffering": "no"})
+
 if __name__ == "__main__":
+    import tempfile
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
\ No newline at end of file
+    if settings.WORKERS > 1:
+        # Workers write metrics here so /metrics can aggregate all of them
+        os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="portfolio-metrics-"))
+    uvicorn.run(
+        "app.main:app",
+        host=settings.HOST,
+        port=settings.PORT,
+        workers=settings.WORKERS,
+        reload=settings.RELOAD and settings.WORKERS == 1
+    )
\ No newline at end of file
@@ -1,12 +1,29 @@
-import os
 import json
-from typing import TypedDict, List, Dict, Any, Optional
+import time
+import asyncio
+from typing import TypedDict, List, Dict, Any, Optional, AsyncIterator, Callable
 from langgraph.graph import StateGraph, END
-from langchain_google_genai import ChatGoogleGenerativeAI
-from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, BaseMessage
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage
 from dotenv import load_dotenv
-from ..data.basic_info import basic_info
-from ..data.detailed_info import detailed_info
+from ..config import settings
+from .fast_router import FastRouter
+from .prompt_cache import PromptCache, compact_json
+from .response_cache import create_response_cache, cache_key
+from .session_store import create_session_store
+from .history import HistoryManager, count_input_tokens, estimate_tokens
+from .retrieval import build_index, chunk_basic_info, chunk_detailed_info
+from .coalescing import SingleFlight, flight_key
+from .llm_providers import NodeModels, model_profiles
+from .structured_router import StructuredRouter, RoutingDecision
+from .speculation import Speculator, Speculation
+from .prefetch import Prefetcher, PrefetchKey, conversation_digest
+from .hedging import Hedger
+from .upstream_pool import create_upstream_pool
+from .rate_limit import ConcurrencyGate, OverloadedError
+from .context_cache import create_context_cache, handle_rejected
+from .telemetry import observe_node, observe_llm_call, observe_route, register_stats_source
+from ..data.store import DataStore, DataSnapshot
 
 load_dotenv()
 
@@ -19,8 +36,27 @@ class State(TypedDict):
     imp_points: Optional[List[str]]
     mode: str
     needs_interrupt: bool
+    # Request-scoped bookkeeping, not returned to the client as state
+    session_id: Optional[str]
+    input_tokens: Dict[str, int]
+    # Answer call started before the router decided, if speculation is on
+    speculation: Optional[Speculation]
+    # The router took this turn's message as a pick from the selection list
+    from_selection: bool
 
-INITIAL_ROUTER_PROMPT = f'''
+def record_input_tokens(state: State, node: str, llm_input: List[BaseMessage]) -> Dict[str, int]:
+    """Per-node estimated prompt tokens accumulated over one graph run"""
+    return {**(state.get("input_tokens") or {}), node: count_input_tokens(llm_input)}
+
+
+# Nodes whose LLM output is forwarded to the client token by token
+STREAMING_NODES = ("chat", "deep_dive")
+
+# Topics whose overviews end in a selection list, and the selection type sent back for each
+PREFETCH_TOPICS = {"projects": "project", "experience": "experience"}
+
+# Filled in with the current data by str.format, hence the doubled braces
+INITIAL_ROUTER_PROMPT = '''
 You are an intelligent routing agent that analyzes conversations and determines the flow.
 
 **YOUR TASK:**
@@ -35,7 +71,7 @@ Analyze the conversation and return ONLY a JSON object (no other text) with thes
 }}
 
 **AVAILABLE DATA:**
-{json.dumps(basic_info, indent=2)}
+{data}
 
 **RULES:**
 
@@ -136,111 +172,296 @@ User: "Tell me more technical details about CleanSV"
 '''
 
 
-def get_chat_prompt(state: State) -> str:
-    """Generate chat prompt with context from state variables"""
-    
-    context_parts = [
-        "**STRICT RULES**",
-        "- You only answer using provided data from (basic_info) as your main source of information regarding profile enquiries.",
-        "- You do NOT fabricate information.",
-        "- If you are talking about PROJECTS or EXPERIENCE always end with 'Would you like to deep dive into any of these topics?'",
-        "",
-        "**OBJECTIVE**",
-        "You are a helpful AI assistant for a portfolio website who provides accurate information based on the provided profile data.",
-        "If they ask any technical information not relevant to the profile person but on the technical side, you can answer through your knowledge base, with citations of (basic_info) if any.",
-        "Explain in a concise and clear manner.",
-        "",
-        "**AVAILABLE DATA:**",
-        json.dumps(basic_info, indent=2),
-        ""
-    ]
-    
-    # Add conversation context if available
-    if state.get("current_topic"):
-        context_parts.append(f"**CURRENT TOPIC:** {state['current_topic']}")
-    
-    if state.get("selected_item_id"):
-        context_parts.append(f"**SELECTED ITEM ID:** {state['selected_item_id']}")
-    
-    if state.get("imp_points"):
-        context_parts.append(f"**IMPORTANT POINTS DISCUSSED:** {', '.join(state['imp_points'])}")
-    
-    return "\n".join(context_parts)
-
-
-def get_deep_dive_prompt(state: State) -> str:
-    """Generate deep dive prompt with specific item data if available"""
-    
-    # Base prompt
-    context_parts = [
-        "**OBJECTIVE**",
-        "You are an expert technical interviewer providing in-depth technical information about projects and experiences.",
-        "Focus on:",
-        "- Technical implementation details and architecture decisions",
-        "- Problem-solving approaches and challenges faced",
-        "- Code patterns, best practices, and design choices",
-        "- Performance considerations and trade-offs made",
-        "- Tools and technologies used and why they were chosen",
-        "",
-        "Keep responses detailed but concise, suitable for technical discussion.",
-        ""
-    ]
-    
-    # Get specific data based on selected_item_id
-    selected_id = state.get("selected_item_id")
-    current_topic = state.get("current_topic")
-    
-    if selected_id and current_topic:
-        context_parts.append("**DETAILED DATA FOR THIS ITEM:**")
+class AIService:
+    def __init__(self, llm: Optional[BaseChatModel] = None, data_store: Optional[DataStore] = None):
+        # Connections to the LLM provider, shared by all node models; None for offline providers or an llm passed in
+        self.upstream = create_upstream_pool() if llm is None else None
+        # LLM_PROVIDER picks Gemini or an offline provider unless one is passed in, with the
+        # model, temperature and output cap of each node's profile
+        self.models = NodeModels(model_profiles(), llm, self.upstream)
+        self.llm = self.models.client("chat")
+        # Router calls use JSON-schema output with a small token cap
+        router_profile = self.models.profiles["initial_router"]
+        self.structured_router = StructuredRouter(
+            self.models.client("initial_router"),
+            router_profile.max_tokens,
+            settings.ROUTER_REPAIR_ATTEMPTS,
+            settings.ROUTER_CACHE_SIZE,
+            temperature=router_profile.temperature
+        )
+        # Opt-in: a duplicate call for calls running past their node's recent p95
+        self.hedger = Hedger(
+            settings.HEDGE_PERCENTILE,
+            settings.HEDGE_MIN_DELAY_SECONDS,
+            settings.HEDGE_MAX_FRACTION,
+            settings.HEDGE_MIN_SAMPLES
+        ) if settings.HEDGE_ENABLED else None
+        # Called with (node name, seconds) after every node run
+        self.node_observers: List[Callable[[str, float], None]] = [observe_node]
+        # Static prompt prefixes referenced by handle instead of sent on every call, where supported
+        self.context_cache = create_context_cache(self.llm, self.models.model("chat"))
+        # Prompts, router and indexes are rebuilt whenever the data store publishes a new version
+        self.data_store = data_store or DataStore(settings.DATA_DIR)
+        self._apply_data(self.data_store.snapshot)
+        self.data_store.subscribe(self._apply_data)
+        # Caps in-flight LLM calls across all sessions on this worker, with a bounded wait queue
+        self.llm_gate = ConcurrencyGate(
+            settings.LLM_MAX_CONCURRENCY,
+            settings.LLM_QUEUE_SIZE,
+            settings.LLM_QUEUE_TIMEOUT_SECONDS
+        )
+        self.response_cache = create_response_cache(
+            settings.RESPONSE_CACHE_BACKEND,
+            settings.RESPONSE_CACHE_PATH,
+            settings.RESPONSE_CACHE_SIZE,
+            settings.RESPONSE_CACHE_TTL_SECONDS
+        ) if settings.RESPONSE_CACHE_ENABLED else None
+        self.session_store = create_session_store(
+            settings.SESSION_STORE_BACKEND,
+            settings.SESSION_STORE_PATH,
+            settings.SESSION_MAX_SESSIONS,
+            settings.SESSION_IDLE_TTL_SECONDS,
+            settings.SESSION_MAX_MESSAGES
+        )
+        # Identical concurrent requests share one graph execution
+        self.coalescer = SingleFlight() if settings.COALESCING_ENABLED else None
+        # Opt-in: start the likely answer alongside the LLM router
+        self.speculator = Speculator() if settings.SPECULATION_ENABLED else None
+        # Opt-in: deep-dive answers for the items likely to be picked next, generated while the LLM is idle
+        self.prefetcher = Prefetcher(
+            self._prefetch_answer,
+            lambda: self.llm_gate.waiting == 0 and self.llm_gate.in_flight < settings.PREFETCH_MAX_IN_FLIGHT,
+            tokens_per_minute=settings.PREFETCH_TOKENS_PER_MINUTE,
+            concurrency=settings.PREFETCH_CONCURRENCY,
+            max_queue=settings.PREFETCH_QUEUE_SIZE,
+            max_wait_seconds=settings.PREFETCH_MAX_WAIT_SECONDS,
+            max_entries=settings.PREFETCH_MAX_ENTRIES,
+            ttl_seconds=settings.PREFETCH_TTL_SECONDS
+        ) if settings.PREFETCH_ENABLED else None
+        self.history = HistoryManager(
+            settings.HISTORY_TOKEN_BUDGET,
+            settings.HISTORY_SUMMARY_TOKENS,
+            settings.SESSION_MAX_SESSIONS
+        )
+        self.graph = self._create_graph()
+        self._register_stats()
+
+    def _register_stats(self):
+        """
+        Export the components' stats() on /metrics
+        """
+        # Looked up at scrape time, since data reloads replace these objects
+        register_stats_source("prompts", lambda: self.prompts.stats())
+        register_stats_source("data", self.data_store.stats)
+        register_stats_source("sessions", self.session_store.stats)
+        register_stats_source("router_cache", self.structured_router.stats)
+        register_stats_source("llm_gate", self.llm_gate.stats)
+        if settings.FAST_ROUTER_ENABLED:
+            register_stats_source("fast_router", lambda: self.fast_router.stats())
+        if self.response_cache is not None:
+            register_stats_source("response_cache", self.response_cache.stats)
+        if self.coalescer is not None:
+            register_stats_source("coalescing", self.coalescer.stats)
+        if self.speculator is not None:
+            register_stats_source("speculation", self.speculator.stats)
+        if self.prefetcher is not None:
+            register_stats_source("prefetch", self.prefetcher.stats)
+        if self.upstream is not None:
+            register_stats_source("upstream", self.upstream.stats)
+        if self.hedger is not None:
+            register_stats_source("hedging", self.hedger.stats)
+        if self.context_cache is not None:
+            register_stats_source("context_cache", self.context_cache.stats)
+
+    def _apply_data(self, snapshot: DataSnapshot):
+        """
+        Build everything derived from one data version, then publish it.
+        Data is serialized once here instead of on every turn.
+        """
+        basic_info, detailed_info = snapshot.basic_info, snapshot.detailed_info
+        prompts = PromptCache(
+            basic_info,
+            detailed_info,
+            basic_index=build_index(chunk_basic_info(basic_info), settings.RETRIEVAL_MIN_DATA_TOKENS) if settings.RETRIEVAL_ENABLED else None,
+            detailed_index=build_index(chunk_detailed_info(detailed_info), settings.RETRIEVAL_MIN_DATA_TOKENS) if settings.RETRIEVAL_ENABLED else None,
+            top_k=settings.RETRIEVAL_TOP_K,
+            data_version=snapshot.digest
+        )
+        router_prompt = INITIAL_ROUTER_PROMPT.format(data=compact_json(basic_info))
+        fast_router = FastRouter(basic_info, detailed_info, min_confidence=settings.FAST_ROUTER_MIN_CONFIDENCE) if settings.FAST_ROUTER_ENABLED else None
         
-        if current_topic == "projects":
-            # Find specific project
-            project = next(
-                (p for p in detailed_info["det_projects"]["projects"] if p["id"] == selected_id),
-                None
-            )
-            if project:
-                context_parts.append(json.dumps(project, indent=2))
-            else:
-                # Fallback to all projects if not found
-                context_parts.append(json.dumps(detailed_info["det_projects"], indent=2))
+        # Cache and coalescing keys include prompts.data_version, so answers from the old data stop matching
+        self.prompts = prompts
+        self.router_prompt = router_prompt
+        self.fast_router = fast_router
+        if self.context_cache is not None:
+            # New handles are created on first use; the old version's are deleted
+            self.context_cache.update({"router": router_prompt, **prompts.static_prefixes()})
+
+    def _answer_input(self, node: str, state: State) -> List[BaseMessage]:
+        """
+        What chat/deep_dive send the LLM in this state: the prompt with context
+        from the state, plus history sized by token budget
+        """
+        query = state["messages"][-1]["content"]
+        if node == "deep_dive":
+            system_prompt = self.prompts.deep_dive_prompt(state, query=query)
+        else:
+            system_prompt = self.prompts.chat_prompt(state, query=query)
+        return self.history.build(system_prompt, state["messages"], state.get("session_id"))
+
+    def _speculate(self, state: State) -> Optional[Speculation]:
+        """
+        When the previous turn was answered on a topic, start that answer node's
+        call now, assuming the router will keep the same route
+        """
+        node = state.get("mode")
+        if self.speculator is None or not state.get("current_topic") or state.get("needs_interrupt") or node not in STREAMING_NODES:
+            return None
+        llm_input = self._answer_input(node, state)
+        return self.speculator.start(node, llm_input, self._call_llm(node, llm_input))
+
+    async def _answer(self, node: str, state: State, llm_input: List[BaseMessage]):
+        """
+        The answer node's LLM response: the speculative one if it was started with this exact input
+        """
+        speculation = state.get("speculation")
+        if speculation is not None:
+            response = await self.speculator.adopt(speculation, node, llm_input)
+            if response is not None:
+                return response
+        return await self._call_llm(node, llm_input)
+
+    def _prefetch_key(self, session_id: str, history: List[Dict[str, Any]], topic: str, item_id: Any) -> PrefetchKey:
+        """history: the conversation up to the pick, ending with the answer that offered it"""
+        return (self.prompts.data_version, session_id, conversation_digest(history), topic, item_id)
+
+    async def _prefetch_answer(self, llm_input: List[BaseMessage]) -> str:
+        return str((await self._call_llm("prefetch", llm_input)).content)
+
+    def _schedule_prefetch(self, session_id: Optional[str], messages: List[Dict[str, Any]], response: Dict[str, Any]) -> None:
+        """
+        When a deep dive into projects/experience ends at the selection list, queue the
+        deep dive the next turn would run for each of the topic's most likely picks;
+        a pick from that list is the only turn that serves them. Only for sessions,
+        the one way to know the pick comes from the same conversation.
+        """
+        state = response["state"]
+        topic = state.get("current_topic")
+        if self.prefetcher is None or not session_id or topic not in PREFETCH_TOPICS:
+            return
+        if not state.get("needs_interrupt") or state.get("mode") != "deep_dive":
+            return
+        # The selection prompt itself names no items; the question before it may
+        answer = f"{messages[-1]['content']} {response['response']}".lower() if messages else response["response"].lower()
+        candidates = []
+        for (item_topic, item_id), record in self.data_store.snapshot.items.items():
+            if item_topic != topic:
+                continue
+            names = [record.get(field) for field in ("name", "company", "role") if record.get(field)]
+            mentioned = any(str(name).lower() in answer for name in names)
+            candidates.append((self.prefetcher.score(topic, item_id, mentioned), item_id, names))
+        # Highest score first; ties keep the data's order, which the selection list shows too
+        candidates.sort(key=lambda candidate: -candidate[0])
         
-        elif current_topic == "experience":
-            # Find specific experience
-            experience = next(
-                (e for e in detailed_info["det_experience"]["experience"] if e["id"] == selected_id),
-                None
-            )
-            if experience:
-                context_parts.append(json.dumps(experience, indent=2))
-            else:
-                # Fallback to all experiences if not found
-                context_parts.append(json.dumps(detailed_info["det_experience"], indent=2))
-    else:
-        # No specific item selected, provide all detailed info
-        context_parts.append("**AVAILABLE DETAILED DATA:**")
-        context_parts.append(json.dumps(detailed_info, indent=2))
-    
-    context_parts.append("")
-    
-    # Add conversation context
-    if state.get("imp_points"):
-        context_parts.append(f"**KEY POINTS TO ADDRESS:** {', '.join(state['imp_points'])}")
-    
-    return "\n".join(context_parts)
+        history = messages + [{"role": "assistant", "content": response["response"]}]
+        jobs = []
+        for score, item_id, names in candidates[:settings.PREFETCH_ITEMS_PER_TURN]:
+            selection = json.dumps({"type": PREFETCH_TOPICS[topic], "id": item_id, "name": names[0] if names else None})
+            predicted = self._initial_state(history + [{"role": "user", "content": selection}], {
+                "current_topic": topic,
+                "selected_item_id": item_id,
+                "mode": "deep_dive",
+            })
+            jobs.append((score, self._prefetch_key(session_id, history, topic, item_id), self._answer_input("deep_dive", predicted)))
+        self.prefetcher.schedule(jobs)
+
+    async def _prefetched(self, state: State) -> Optional[str]:
+        """The prefetched first answer for an item just picked from the selection list, if there is one"""
+        session_id = state.get("session_id")
+        if self.prefetcher is None or not session_id or not state.get("from_selection") or state.get("current_topic") not in PREFETCH_TOPICS:
+            return None
+        return await self.prefetcher.take(self._prefetch_key(session_id, state["messages"][:-1], state["current_topic"], state.get("selected_item_id")))
+
+    def _check_decision(self, decision: RoutingDecision):
+        """
+        Reject item ids that don't exist in the data, so they get repaired instead of misrouting
+        """
+        topic, item_id = decision.current_topic, decision.selected_item_id
+        if item_id is not None and topic in ("projects", "experience") and (topic, item_id) not in self.data_store.snapshot.items:
+            raise ValueError(f"selected_item_id {item_id} is not a known {topic} id")
 
-class AIService:
-    def __init__(self):
-        self.llm = ChatGoogleGenerativeAI(
-            model="gemini-2.5-flash-lite",
-            google_api_key=os.getenv("GOOGLE_API_KEY"),
-            temperature=0.7
+    async def _call_llm(self, node: str, llm_input: List[BaseMessage], llm=None):
+        """
+        Call the node's model (or a bound variant of it) natively async, bounded by the concurrency limit.
+        A static prompt prefix with a context cache handle is referenced instead of sent.
+        Slow calls are hedged when that is enabled; each attempt takes its own slot.
+        The node timeout covers both waiting for a slot and the call itself.
+        Latency, outcome and token counts are recorded per node.
+        """
+        model = llm or self.models.get(node)
+        use_cache = self.context_cache is not None and self.context_cache.model == self.models.model(node)
+        cached = self.context_cache.lookup(llm_input) if use_cache else None
+        sent, cached_tokens = (cached[1], cached[2]) if cached else (llm_input, 0)
+        
+        async def call(config=None):
+            nonlocal sent, cached_tokens
+            async with self.llm_gate.slot():
+                if cached:
+                    try:
+                        return await model.bind(cached_content=cached[0]).ainvoke(sent, config=config)
+                    except Exception as e:
+                        if not handle_rejected(e):
+                            raise
+                        # Expired or deleted on the provider's side: send this call inline
+                        self.context_cache.invalidate(cached[0])
+                        sent, cached_tokens = llm_input, 0
+                return await model.ainvoke(llm_input, config=config)
+        
+        start = time.perf_counter()
+        try:
+            attempt = self.hedger.run(node, call) if self.hedger is not None else call()
+            response = await asyncio.wait_for(attempt, timeout=settings.NODE_TIMEOUT_SECONDS)
+        except asyncio.TimeoutError:
+            observe_llm_call(node, time.perf_counter() - start, "timeout")
+            raise
+        except asyncio.CancelledError:
+            observe_llm_call(node, time.perf_counter() - start, "cancelled")
+            raise
+        except OverloadedError:
+            observe_llm_call(node, time.perf_counter() - start, "overloaded")
+            raise
+        except Exception:
+            observe_llm_call(node, time.perf_counter() - start, "error")
+            raise
+        observe_llm_call(
+            node,
+            time.perf_counter() - start,
+            "ok",
+            input_tokens=count_input_tokens(sent),
+            output_tokens=estimate_tokens(str(response.content)),
+            cached_tokens=cached_tokens
         )
-        self.graph = self._create_graph()
+        return response
+
+    def _timed(self, name: str, node):
+        """
+        Wrap a node so each run reports its wall time to the node observers
+        """
+        async def timed_node(state: State) -> State:
+            start = time.perf_counter()
+            try:
+                return await node(state)
+            finally:
+                elapsed = time.perf_counter() - start
+                for observer in self.node_observers:
+                    observer(name, elapsed)
+        
+        return timed_node
 
     def _create_graph(self):
 
-        def initial_router_node(state: State) -> State:
+        async def initial_router_node(state: State) -> State:
             """
             Analyzes conversation and determines routing.
             Also handles selection responses from frontend.
@@ -266,6 +487,7 @@ class AIService:
                         current_topic = "projects"
                     elif selected_type == "experience":
                         current_topic = "experience"  
+                    observe_route("selection", state.get("mode", "chat"), current_topic)
 
                     # IMPORTANT: Preserve the mode from previous state
                     # This ensures we continue with chat/deep_dive as originally intended
@@ -277,49 +499,64 @@ class AIService:
                         "imp_points": state.get("imp_points"),
                         "mode": state.get("mode", "chat"),  # Uses previous mode from state
                         "needs_interrupt": False,  # Clear interrupt flag
-                        "selection_options": None
+                        "selection_options": None,
+                        "from_selection": True
                     }
                 except json.JSONDecodeError:
                     pass  # Not a selection, continue normal routing
             
-            # Build conversation context for normal routing
-            all_messages: list[BaseMessage] = []
-            for msg in state["messages"]:
-                if msg["role"] == "user":
-                    all_messages.append(HumanMessage(content=msg["content"]))
-                elif msg["role"] == "assistant":
-                    all_messages.append(AIMessage(content=msg["content"]))
-
-            # Call LLM to analyze and route
-            llm_input = [SystemMessage(content=INITIAL_ROUTER_PROMPT)] + all_messages[-10:]
+            # Common turns (greetings, named items, topic keywords) skip the LLM router
+            if self.fast_router:
+                routing_decision = self.fast_router.route(
+                    last_message,
+                    state.get("current_topic"),
+                    state.get("selected_item_id"),
+                    state.get("mode")
+                )
+                if routing_decision:
+                    observe_route("fast_router", routing_decision.get("mode"), routing_decision.get("current_topic"))
+                    return {
+                        "messages": state["messages"],
+                        "response": "",
+                        **routing_decision,
+                    }
+            
+            # Call LLM to analyze and route, with history sized by token budget
+            llm_input = self.history.build(self.router_prompt, state["messages"], state.get("session_id"))
             
-            response = self.llm.invoke(llm_input)
+            # The answer node checks whether this guess matches what the router decides
+            speculation = self._speculate(state)
             
-            # Parse JSON response
+            # Structured output validated against RoutingDecision, with bounded repair attempts
             try:
-                # Clean the response (remove markdown if present)
-                response_text = response.content.strip()
-                if response_text.startswith("```json"):
-                    response_text = response_text.split("```json")[1].split("```")[0].strip()
-                elif response_text.startswith("```"):
-                    response_text = response_text.split("```")[1].split("```")[0].strip()
-                
-                routing_decision = json.loads(response_text)
+                routing_decision, source = await self.structured_router.decide(
+                    llm_input,
+                    lambda llm, messages: self._call_llm("initial_router", messages, llm=llm),
+                    validate=self._check_decision
+                )
+            except BaseException:
+                if speculation:
+                    self.speculator.discard(speculation)
+                raise
+            
+            # Selection ends the turn without an answer node
+            if speculation and routing_decision and routing_decision.needs_interrupt:
+                self.speculator.discard(speculation)
+                speculation = None
+            
+            if routing_decision:
+                observe_route(source, routing_decision.mode, routing_decision.current_topic)
                 
                 # Update state with routing decision
                 return {
                     "messages": state["messages"],
                     "response": "",  # No chat output from this node
-                    "current_topic": routing_decision.get("current_topic"),
-                    "selected_item_id": routing_decision.get("selected_item_id"),
-                    "imp_points": routing_decision.get("imp_points"),
-                    "mode": routing_decision.get("mode", "chat"),
-                    "needs_interrupt": routing_decision.get("needs_interrupt", False),
+                    **routing_decision.model_dump(),
+                    "input_tokens": record_input_tokens(state, "initial_router", llm_input),
+                    "speculation": speculation,
                 }
-                
-            except json.JSONDecodeError as e:
-                print(f"Failed to parse routing decision: {e}")
-                print(f"Response was: {response.content}")
+            else:
+                observe_route("fallback", "chat", state.get("current_topic"))
                 
                 # Fallback to safe defaults
                 return {
@@ -330,9 +567,11 @@ class AIService:
                     "imp_points": state.get("imp_points"),
                     "mode": "chat",
                     "needs_interrupt": False,
+                    "input_tokens": record_input_tokens(state, "initial_router", llm_input),
+                    "speculation": speculation,
                 }
 
-        def selection_node(state: State) -> State:
+        async def selection_node(state: State) -> State:
             """
             HITL node - just signals frontend to show selection UI.
             Frontend will generate options based on current_topic.
@@ -344,56 +583,50 @@ class AIService:
                 # REMOVED: All selection_options generation logic
             }
 
-        def chat_node(state: State) -> State:
+        async def chat_node(state: State) -> State:
             """
             Handles normal conversation using basic_info data.
             Provides conversational responses about projects, experience, and skills.
             """
-            # Build conversation history
-            all_messages: list[BaseMessage] = []
-            for msg in state["messages"]:
-                if msg["role"] == "user":
-                    all_messages.append(HumanMessage(content=msg["content"]))
-                elif msg["role"] == "assistant":
-                    all_messages.append(AIMessage(content=msg["content"]))
-            
-            # Generate prompt with context
-            system_prompt = get_chat_prompt(state)
-            
-            # Call LLM
-            llm_input = [SystemMessage(content=system_prompt)] + all_messages[-10:]
-            response = self.llm.invoke(llm_input)
+            # Generate prompt with context and history sized by token budget
+            llm_input = self._answer_input("chat", state)
+            response = await self._answer("chat", state, llm_input)
             
             return {
                 **state,
                 "response": response.content,
-                "needs_interrupt": False
+                "needs_interrupt": False,
+                "input_tokens": record_input_tokens(state, "chat", llm_input),
+                "speculation": None,
             }
         
-        def deep_dive_node(state: State) -> State:
+        async def deep_dive_node(state: State) -> State:
             """
             Handles detailed technical discussions using detailed_info data.
             Provides in-depth technical responses with specific item data if available.
             """
-            # Build conversation history
-            all_messages: list[BaseMessage] = []
-            for msg in state["messages"]:
-                if msg["role"] == "user":
-                    all_messages.append(HumanMessage(content=msg["content"]))
-                elif msg["role"] == "assistant":
-                    all_messages.append(AIMessage(content=msg["content"]))
-            
-            # Generate prompt with context and specific item data
-            system_prompt = get_deep_dive_prompt(state)
+            # An item just picked from the selection list may have been answered ahead of time
+            prefetched = await self._prefetched(state)
+            if prefetched is not None:
+                if state.get("speculation"):
+                    self.speculator.discard(state["speculation"])
+                return {
+                    **state,
+                    "response": prefetched,
+                    "needs_interrupt": False,
+                    "speculation": None,
+                }
             
-            # Call LLM
-            llm_input = [SystemMessage(content=system_prompt)] + all_messages[-10:]
-            response = self.llm.invoke(llm_input)
+            # Generate prompt with context, specific item data and history sized by token budget
+            llm_input = self._answer_input("deep_dive", state)
+            response = await self._answer("deep_dive", state, llm_input)
             
             return {
                 **state,
                 "response": response.content,
-                "needs_interrupt": False
+                "needs_interrupt": False,
+                "input_tokens": record_input_tokens(state, "deep_dive", llm_input),
+                "speculation": None,
             }
 
         # Routing functions
@@ -426,10 +659,10 @@ class AIService:
         graph = StateGraph(State)
         
         # Add nodes
-        graph.add_node("initial_router", initial_router_node)
-        graph.add_node("selection", selection_node)
-        graph.add_node("chat", chat_node)
-        graph.add_node("deep_dive", deep_dive_node)
+        graph.add_node("initial_router", self._timed("initial_router", initial_router_node))
+        graph.add_node("selection", self._timed("selection", selection_node))
+        graph.add_node("chat", self._timed("chat", chat_node))
+        graph.add_node("deep_dive", self._timed("deep_dive", deep_dive_node))
         
         # Set entry point - ALL messages start here
         graph.set_entry_point("initial_router")
@@ -456,11 +689,11 @@ class AIService:
         
         return graph.compile()
 
-    async def chat(self, messages: List[Dict[str, Any]], state_vars: Dict[str, Any] = None) -> Dict[str, Any]:
+    def _initial_state(self, messages: List[Dict[str, Any]], state_vars: Dict[str, Any] = None, session_id: Optional[str] = None) -> State:
         """
-        Process chat with state
+        Build the graph input from the request messages and persisted state
         """
-        initial_state = {
+        return {
             "messages": messages,
             "response": "",
             "current_topic": state_vars.get("current_topic") if state_vars else None,
@@ -468,10 +701,16 @@ class AIService:
             "imp_points": state_vars.get("imp_points") if state_vars else None,
             "mode": state_vars.get("mode", "chat") if state_vars else "chat",
             "needs_interrupt": state_vars.get("needs_interrupt", False) if state_vars else False,
+            "session_id": session_id,
+            "input_tokens": {},
+            "speculation": None,
+            "from_selection": False,
         }
-        
-        result = await self.graph.ainvoke(initial_state)
-        
+
+    def _format_result(self, result: State) -> Dict[str, Any]:
+        """
+        Shape the final graph state into the API response payload
+        """
         return {
             "response": result["response"],
             "state": {
@@ -482,4 +721,159 @@ class AIService:
                 "needs_interrupt": result.get("needs_interrupt", False),
             },
             "needs_interrupt": result.get("needs_interrupt", False),
-        }
\ No newline at end of file
+            "input_tokens": result.get("input_tokens") or {},
+        }
+
+    def _cache_key(self, messages: List[Dict[str, Any]], state_vars: Dict[str, Any] = None) -> Optional[str]:
+        """
+        Response cache key for this turn, or None when caching is off
+        """
+        if self.response_cache is None:
+            return None
+        return cache_key(messages, state_vars, self.prompts.data_version)
+
+    @staticmethod
+    def _routing_event(routing: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        The routing fields the stream reports before any tokens
+        """
+        return {
+            "current_topic": routing.get("current_topic"),
+            "selected_item_id": routing.get("selected_item_id"),
+            "mode": routing.get("mode", "chat"),
+            "needs_interrupt": routing.get("needs_interrupt", False),
+        }
+
+    def _load_session(self, session_id: Optional[str], messages: List[Dict[str, Any]], state_vars: Dict[str, Any] = None):
+        """
+        In session mode the client only sends the new message; prepend the stored
+        history and use the stored state unless the client sent its own
+        """
+        if not session_id:
+            return messages, state_vars
+        session = self.session_store.get(session_id)
+        if session is None:
+            return messages, state_vars
+        return session["messages"] + messages, state_vars if state_vars is not None else session["state"]
+
+    def _save_session(self, session_id: Optional[str], messages: List[Dict[str, Any]], response: Dict[str, Any]) -> None:
+        if session_id:
+            self.session_store.save(
+                session_id,
+                messages + [{"role": "assistant", "content": response["response"]}],
+                response["state"]
+            )
+
+    def _replay_events(self, response: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """
+        A finished response as the routing/token/done sequence the stream produces
+        """
+        return [
+            {"event": "routing", "data": self._routing_event(response["state"])},
+            {"event": "token", "data": {"content": response["response"]}},
+            {"event": "done", "data": response},
+        ]
+
+    async def _invoke_events(self, messages: List[Dict[str, Any]], state_vars: Dict[str, Any], session_id: Optional[str], key: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the graph in one go and emit the finished response as stream events
+        """
+        initial_state = self._initial_state(messages, state_vars, session_id)
+        
+        result = await self.graph.ainvoke(initial_state)
+        
+        response = self._format_result(result)
+        if key:
+            self.response_cache.set(key, response)
+        for event in self._replay_events(response):
+            yield event
+
+    async def _stream_events(self, messages: List[Dict[str, Any]], state_vars: Dict[str, Any], session_id: Optional[str], key: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run the graph, emitting events as it goes:
+        - "routing" once initial_router has decided where to go
+        - "token" for every chunk generated by chat/deep_dive
+        - "done" with the same payload chat() returns
+        """
+        initial_state = self._initial_state(messages, state_vars, session_id)
+        streamed = False
+        
+        async for event in self.graph.astream_events(initial_state, version="v2"):
+            kind = event["event"]
+            node = event.get("metadata", {}).get("langgraph_node")
+            
+            if kind == "on_chain_end" and event["name"] == "initial_router" and node == "initial_router":
+                yield {"event": "routing", "data": self._routing_event(event["data"]["output"])}
+            
+            elif kind == "on_chat_model_stream" and node in STREAMING_NODES:
+                content = event["data"]["chunk"].content
+                if content:
+                    streamed = True
+                    yield {"event": "token", "data": {"content": content}}
+            
+            # A speculative answer was generated under initial_router, so its tokens weren't forwarded
+            elif kind == "on_chain_end" and event["name"] in STREAMING_NODES and node == event["name"] and not streamed:
+                content = event["data"]["output"]["response"]
+                if content:
+                    yield {"event": "token", "data": {"content": content}}
+            
+            # The graph itself is the only run without a parent
+            elif kind == "on_chain_end" and not event.get("parent_ids"):
+                response = self._format_result(event["data"]["output"])
+                if key:
+                    self.response_cache.set(key, response)
+                yield {"event": "done", "data": response}
+
+    def _run(self, producer, messages: List[Dict[str, Any]], state_vars: Dict[str, Any], session_id: Optional[str], key: Optional[str]) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Run a graph producer, sharing one execution between identical concurrent requests
+        """
+        if self.coalescer is None:
+            return producer(messages, state_vars, session_id, key)
+        return self.coalescer.run(
+            flight_key(messages, state_vars, self.prompts.data_version),
+            lambda: producer(messages, state_vars, session_id, key)
+        )
+
+    async def chat(self, messages: List[Dict[str, Any]], state_vars: Dict[str, Any] = None, session_id: Optional[str] = None) -> Dict[str, Any]:
+        """
+        Process chat with state
+        """
+        messages, state_vars = self._load_session(session_id, messages, state_vars)
+        
+        key = self._cache_key(messages, state_vars)
+        cached = self.response_cache.get(key) if key else None
+        # Cache hits spend no LLM tokens
+        response = {**cached, "input_tokens": {}} if cached else None
+        
+        if not response:
+            async for event in self._run(self._invoke_events, messages, state_vars, session_id, key):
+                if event["event"] == "done":
+                    response = event["data"]
+        
+        self._save_session(session_id, messages, response)
+        self._schedule_prefetch(session_id, messages, response)
+        return response
+
+    async def stream_chat(self, messages: List[Dict[str, Any]], state_vars: Dict[str, Any] = None, session_id: Optional[str] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        Process chat with state, yielding routing/token/done events as the graph runs
+        """
+        messages, state_vars = self._load_session(session_id, messages, state_vars)
+        
+        key = self._cache_key(messages, state_vars)
+        cached = self.response_cache.get(key) if key else None
+        if cached:
+            # Replay a cached answer through the same event sequence
+            response = {**cached, "input_tokens": {}}
+            self._save_session(session_id, messages, response)
+            self._schedule_prefetch(session_id, messages, response)
+            for event in self._replay_events(response):
+                yield event
+            return
+        
+        async for event in self._run(self._stream_events, messages, state_vars, session_id, key):
+            if event["event"] == "done":
+                self._save_session(session_id, messages, event["data"])
+                self._schedule_prefetch(session_id, messages, event["data"])
+            yield event
@@ -0,0 +1,139 @@
+import time
+import uuid
+import asyncio
+from typing import Dict, Any, List, Optional, AsyncIterator, Callable, Awaitable
+
+from ..config import ChatRequest
+from .coalescing import flight_key
+from .telemetry import Trace, current_trace
+
+
+def plan_batch(requests: List[ChatRequest], data_version: str):
+    """
+    Group a batch into lanes that can run in parallel.
+    Requests sharing a session_id form one lane, run in submission order since each
+    turn builds on the previous one. Every other distinct request is a lane of its own;
+    identical ones (same normalized history and state) are recorded as duplicates of the first.
+    Returns (lanes, duplicates): lists of indexes, and first index -> duplicate indexes.
+    """
+    lanes: Dict[str, List[int]] = {}
+    duplicates: Dict[int, List[int]] = {}
+    for index, request in enumerate(requests):
+        if request.session_id:
+            lanes.setdefault(f"session:{request.session_id}", []).append(index)
+            continue
+        key = flight_key([m.model_dump() for m in request.messages], request.state, data_version)
+        if key in lanes:
+            duplicates.setdefault(lanes[key][0], []).append(index)
+        else:
+            lanes[key] = [index]
+    return list(lanes.values()), duplicates
+
+
+class BatchRunner:
+    """
+    Runs a batch of chat requests through the AI service with at most `concurrency`
+    in flight, yielding one result per request as soon as it is done (not in input order;
+    each carries its `index`), then a summary. Answers land in the response cache like
+    any other request, so a batch also pre-warms it.
+
+    A batch's session ids are its own: their history is kept here for the length of
+    the batch, never read from or written to the service's session store. `admit`,
+    if given, is awaited before each request runs (the server charges rate limits there).
+    """
+
+    def __init__(self, ai_service, concurrency: int = 8, admit: Optional[Callable[[], Awaitable[None]]] = None):
+        self.ai_service = ai_service
+        self.concurrency = max(1, concurrency)
+        self.admit = admit
+        self.batch_id = uuid.uuid4().hex[:12]
+        # session id -> {"messages": [...], "state": {...}} after its latest turn
+        self.sessions: Dict[str, Dict[str, Any]] = {}
+
+    async def _run_item(self, index: int, request: ChatRequest) -> Dict[str, Any]:
+        if self.admit is not None:
+            await self.admit()
+        # Own trace per item so its route and node timings aren't mixed with the others'
+        trace = Trace(f"{self.batch_id}-{index}")
+        token = current_trace.set(trace)
+        start = time.perf_counter()
+        try:
+            messages = [m.model_dump() for m in request.messages]
+            state_vars = request.state
+            session = self.sessions.get(request.session_id) if request.session_id else None
+            if session is not None:
+                # Like a session request: the client only sends the new message
+                messages = session["messages"] + messages
+                state_vars = state_vars if state_vars is not None else session["state"]
+            result = await self.ai_service.chat(messages, state_vars=state_vars)
+            if request.session_id:
+                self.sessions[request.session_id] = {
+                    "messages": messages + [{"role": "assistant", "content": result["response"]}],
+                    "state": result["state"],
+                }
+            state = result["state"]
+            item = {
+                "index": index,
+                "response": result["response"],
+                "routing": {
+                    "current_topic": state.get("current_topic"),
+                    "selected_item_id": state.get("selected_item_id"),
+                    "mode": state.get("mode"),
+                    "needs_interrupt": result.get("needs_interrupt", False),
+                },
+                "state": state,
+                "input_tokens": result.get("input_tokens", {}),
+            }
+        except Exception as e:
+            item = {"index": index, "error": str(e) or type(e).__name__}
+        finally:
+            current_trace.reset(token)
+
+        item.update({
+            "session_id": request.session_id,
+            "seconds": round(time.perf_counter() - start, 4),
+            # None when the answer came from the response cache without running the graph
+            "router": trace.route["source"] if trace.route else None,
+            "nodes_ms": {node: round(seconds * 1000, 2) for node, seconds in trace.nodes.items()},
+            "llm_calls": trace.llm_calls,
+        })
+        return item
+
+    async def run(self, requests: List[ChatRequest]) -> AsyncIterator[Dict[str, Any]]:
+        start = time.perf_counter()
+        lanes, duplicates = plan_batch(requests, self.ai_service.data_store.snapshot.digest)
+        pending: asyncio.Queue = asyncio.Queue()
+        for lane in lanes:
+            pending.put_nowait(lane)
+        results: asyncio.Queue = asyncio.Queue()
+
+        async def worker():
+            while not pending.empty():
+                for index in pending.get_nowait():
+                    await results.put(await self._run_item(index, requests[index]))
+
+        workers = [asyncio.create_task(worker()) for _ in range(min(self.concurrency, len(lanes)))]
+        errors = 0
+        try:
+            for _ in range(sum(len(lane) for lane in lanes)):
+                item = await results.get()
+                errors += "error" in item
+                yield item
+                for index in duplicates.get(item["index"], []):
+                    errors += "error" in item
+                    yield {**item, "index": index, "duplicate_of": item["index"]}
+        finally:
+            # Also stops the remaining work when the consumer goes away
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
+
+        duplicate_count = sum(len(indexes) for indexes in duplicates.values())
+        yield {"summary": {
+            "batch_id": self.batch_id,
+            "items": len(requests),
+            "executed": len(requests) - duplicate_count,
+            "duplicates": duplicate_count,
+            "errors": errors,
+            "seconds": round(time.perf_counter() - start, 4),
+        }}
@@ -0,0 +1,103 @@
+import json
+import asyncio
+import hashlib
+from typing import Dict, Any, List, Optional, Callable, AsyncIterator
+
+from .response_cache import normalize_message
+
+
+def flight_key(messages: List[Dict[str, Any]], state_vars: Optional[Dict[str, Any]], data_version: str) -> str:
+    """Requests are identical when their whole normalized history and state match"""
+    payload = [
+        data_version,
+        [(m["role"], normalize_message(m["content"])) for m in messages],
+        {k: v for k, v in (state_vars or {}).items() if k != "needs_interrupt"},
+    ]
+    return hashlib.sha256(json.dumps(payload, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
+class Flight:
+    """
+    Events of one in-flight graph execution. Every subscriber sees the full
+    sequence, so late joiners first get a replay of what was already produced.
+    """
+
+    def __init__(self):
+        self.events: List[Dict[str, Any]] = []
+        self.finished = False
+        self.error: Optional[BaseException] = None
+        self.waiter = asyncio.get_running_loop().create_future()
+        self.task: Optional[asyncio.Task] = None
+
+    def publish(self, event: Dict[str, Any]) -> None:
+        self.events.append(event)
+        self._wake()
+
+    def finish(self, error: Optional[BaseException] = None) -> None:
+        self.finished = True
+        self.error = error
+        self._wake()
+
+    def _wake(self) -> None:
+        if not self.waiter.done():
+            self.waiter.set_result(None)
+        self.waiter = asyncio.get_running_loop().create_future()
+
+    async def subscribe(self) -> AsyncIterator[Dict[str, Any]]:
+        position = 0
+        while True:
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            if self.finished:
+                if self.error:
+                    raise self.error
+                return
+            await asyncio.shield(self.waiter)
+
+
+class SingleFlight:
+    """
+    Concurrent requests with the same key share one execution of the producer.
+    The producer runs in its own task, so a disconnecting leader doesn't cancel it for the others.
+    """
+
+    def __init__(self):
+        self.flights: Dict[str, Flight] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def run(self, key: str, producer: Callable[[], AsyncIterator[Dict[str, Any]]]) -> AsyncIterator[Dict[str, Any]]:
+        flight = self.flights.get(key)
+        if flight is None:
+            flight = Flight()
+            self.flights[key] = flight
+            self.executions += 1
+            flight.task = asyncio.create_task(self._execute(key, flight, producer))
+        else:
+            self.coalesced += 1
+
+        async for event in flight.subscribe():
+            yield event
+
+    async def _execute(self, key: str, flight: Flight, producer: Callable[[], AsyncIterator[Dict[str, Any]]]) -> None:
+        try:
+            async for event in producer():
+                flight.publish(event)
+            flight.finish()
+        except Exception as e:
+            flight.finish(e)
+        finally:
+            if not flight.finished:
+                flight.finish(asyncio.CancelledError())
+            if self.flights.get(key) is flight:
+                del self.flights[key]
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.executions + self.coalesced
+        return {
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+            "in_flight": len(self.flights),
+            "coalesced_rate": self.coalesced / total if total else 0.0,
+        }
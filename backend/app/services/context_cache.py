@@ -0,0 +1,264 @@
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import datetime
+from typing import Dict, Any, List, Optional, Set, Tuple
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import BaseMessage, HumanMessage, SystemMessage
+
+from ..config import settings
+from .history import estimate_tokens
+from .llm_providers import SyntheticChatModel, CachedContentNotFound, import_gemini
+
+logger = logging.getLogger("portfolio.context_cache")
+
+# Start replacing a handle this long before it expires, so calls never hit an expired one
+RENEW_BEFORE_SECONDS = 60
+
+# After a failed create, that prefix is sent inline for this long before trying again
+FAILURE_BACKOFF_SECONDS = 300
+
+
+def handle_rejected(error: BaseException) -> bool:
+    """
+    Whether a call failed because its cached content is gone (expired, deleted, or
+    not this key's). Any other failure, a 429 or 5xx included, says nothing about the handle.
+    """
+    if isinstance(error, CachedContentNotFound):
+        return True
+    try:
+        exceptions = import_gemini("google.api_core.exceptions")
+    except ImportError:
+        return False
+    return isinstance(error, (exceptions.NotFound, exceptions.PermissionDenied))
+
+
+class GeminiContextCacheProvider:
+    """Gemini explicit context caching: the prefix becomes the system instruction of a CachedContent"""
+
+    def __init__(self, model: str, api_key: str):
+        import_gemini("google.generativeai").configure(api_key=api_key)
+        self.caching = import_gemini("google.generativeai.caching")
+        self.model = model if model.startswith("models/") else f"models/{model}"
+
+    def create(self, name: str, text: str, ttl_seconds: float) -> str:
+        cached = self.caching.CachedContent.create(
+            model=self.model,
+            display_name=f"portfolio-{name}",
+            system_instruction=text,
+            ttl=datetime.timedelta(seconds=ttl_seconds)
+        )
+        return cached.name
+
+    def delete(self, handle: str) -> None:
+        self.caching.CachedContent.get(handle).delete()
+
+
+class StubContextCacheProvider:
+    """
+    Offline provider: handles map to the prefix text in `contents`, which the synthetic
+    model reads back. To exercise the inline fallbacks, fail="create" makes every create
+    raise, and fail="reject" hands out handles the model then rejects as not found
+    (like ones the provider dropped early), so each call is retried with the prefix inline.
+    """
+
+    def __init__(self, contents: Dict[str, str], fail: str = "none"):
+        if fail not in ("none", "create", "reject"):
+            raise ValueError(f"Unknown stub context cache failure: {fail}")
+        self.contents = contents
+        self.fail = fail
+        self.created = 0
+
+    def create(self, name: str, text: str, ttl_seconds: float) -> str:
+        if self.fail == "create":
+            raise RuntimeError("context caching unavailable")
+        self.created += 1
+        handle = f"cachedContents/stub-{name}-{self.created}"
+        if self.fail != "reject":
+            self.contents[handle] = text
+        return handle
+
+    def delete(self, handle: str) -> None:
+        self.contents.pop(handle, None)
+
+
+class CachedPrefix:
+    __slots__ = ("text", "digest", "handle", "expires_at", "failed_until")
+
+    def __init__(self, text: str):
+        self.text = text
+        self.digest = hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+        self.handle: Optional[str] = None
+        self.expires_at = 0.0
+        self.failed_until = 0.0
+
+
+class ContextCache:
+    """
+    Registers the static prompt prefixes (router prompt, chat preamble, ...) with the
+    provider's context cache and rewrites LLM calls that start with one to reference it
+    by handle, sending only the rest of the input.
+
+    Handles are created in the background on first use; until one exists, after a
+    failed create, or for prefixes under min_tokens, the prompt is sent inline.
+    update() swaps in the prefixes of a new data version; handles of replaced
+    prefixes are deleted once in-flight calls had time to finish.
+    """
+
+    def __init__(self, provider, model: str, ttl_seconds: float = 3600, min_tokens: int = 1024, grace_seconds: float = 60):
+        self.provider = provider
+        # Handles are only valid for calls to the model they were created for
+        self.model = model
+        self.ttl_seconds = ttl_seconds
+        self.min_tokens = min_tokens
+        self.grace_seconds = grace_seconds
+        self.prefixes: Dict[str, CachedPrefix] = {}
+        self.retired: List[str] = []
+        self._creating: Set[str] = set()
+        self._tasks: Set[asyncio.Task] = set()
+        self.created = 0
+        self.failures = 0
+        self.hits = 0
+        self.inline = 0
+        self.invalidated = 0
+
+    def update(self, prefixes: Dict[str, str]) -> None:
+        """Set the current static prefixes by name; unchanged ones keep their handle"""
+        current = {}
+        for name, text in prefixes.items():
+            existing = self.prefixes.get(name)
+            if existing is not None and existing.text == text:
+                current[name] = existing
+            else:
+                current[name] = CachedPrefix(text)
+                if existing is not None and existing.handle:
+                    self.retired.append(existing.handle)
+        for name, existing in self.prefixes.items():
+            if name not in current and existing.handle:
+                self.retired.append(existing.handle)
+        self.prefixes = current
+
+    def lookup(self, llm_input: List[BaseMessage]) -> Optional[Tuple[str, List[BaseMessage], int]]:
+        """
+        (handle, input without the cached prefix, tokens cached) if llm_input starts
+        with a registered prefix that has a live handle, else None to send it inline
+        """
+        self._retire()
+        if not llm_input or not isinstance(llm_input[0], SystemMessage):
+            return None
+        system_prompt = str(llm_input[0].content)
+        for name, prefix in self.prefixes.items():
+            if not system_prompt.startswith(prefix.text):
+                continue
+            now = time.time()
+            if prefix.expires_at - now < RENEW_BEFORE_SECONDS:
+                self._schedule_create(name, prefix, now)
+            if prefix.handle is None or prefix.expires_at <= now:
+                self.inline += 1
+                return None
+
+            self.hits += 1
+            # Cached contents carry the system instruction, so what follows the
+            # prefix (topic, selection, history summary) goes in as a user turn
+            rest = system_prompt[len(prefix.text):].strip()
+            messages = ([HumanMessage(content=rest)] if rest else []) + list(llm_input[1:])
+            return prefix.handle, messages, estimate_tokens(prefix.text)
+        return None
+
+    def invalidate(self, handle: str) -> None:
+        """The provider rejected this handle; send that prefix inline until it is recreated"""
+        self.invalidated += 1
+        for prefix in self.prefixes.values():
+            if prefix.handle == handle:
+                prefix.handle = None
+                prefix.expires_at = 0.0
+
+    def _schedule_create(self, name: str, prefix: CachedPrefix, now: float) -> None:
+        if prefix.digest in self._creating or now < prefix.failed_until:
+            return
+        if estimate_tokens(prefix.text) < self.min_tokens:
+            # Below the provider's minimum; never worth a handle
+            prefix.failed_until = float("inf")
+            return
+        self._creating.add(prefix.digest)
+        self._spawn(self._create(name, prefix))
+
+    async def _create(self, name: str, prefix: CachedPrefix) -> None:
+        try:
+            handle = await asyncio.to_thread(self.provider.create, name, prefix.text, self.ttl_seconds)
+        except Exception as e:
+            self.failures += 1
+            prefix.failed_until = time.time() + FAILURE_BACKOFF_SECONDS
+            logger.warning(json.dumps({"event": "context_cache_create_failed", "prefix": name, "error": repr(e)[:300]}))
+            return
+        finally:
+            self._creating.discard(prefix.digest)
+
+        self.created += 1
+        if prefix.handle:
+            # Renewal: the old handle may still be in use for a moment
+            self.retired.append(prefix.handle)
+        prefix.handle = handle
+        prefix.expires_at = time.time() + self.ttl_seconds
+        if self.prefixes.get(name) is not prefix:
+            # The data changed while this was being created
+            self.retired.append(handle)
+
+    def _retire(self) -> None:
+        while self.retired:
+            self._spawn(self._delete(self.retired.pop()))
+
+    async def _delete(self, handle: str) -> None:
+        await asyncio.sleep(self.grace_seconds)
+        try:
+            await asyncio.to_thread(self.provider.delete, handle)
+        except Exception as e:
+            # It expires on its own after the TTL anyway
+            logger.warning(json.dumps({"event": "context_cache_delete_failed", "handle": handle, "error": repr(e)[:300]}))
+
+    def _spawn(self, coro) -> None:
+        task = asyncio.create_task(coro)
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "prefixes": len(self.prefixes),
+            "live_handles": sum(1 for prefix in self.prefixes.values() if prefix.handle),
+            "created": self.created,
+            "failures": self.failures,
+            "hits": self.hits,
+            "inline": self.inline,
+            "invalidated": self.invalidated,
+        }
+
+
+def create_context_cache(llm: BaseChatModel, model: str) -> Optional[ContextCache]:
+    """
+    CONTEXT_CACHE_PROVIDER:
+    - "auto": Gemini's context cache when talking to Gemini directly, otherwise none
+    - "gemini" / "stub" (offline, with the synthetic provider) / "none"
+    """
+    provider = settings.CONTEXT_CACHE_PROVIDER
+    if provider == "auto":
+        provider = "gemini" if settings.LLM_PROVIDER == "gemini" else "none"
+    if provider == "none":
+        return None
+    if provider == "gemini":
+        cache_provider = GeminiContextCacheProvider(model, settings.GOOGLE_API_KEY)
+    elif provider == "stub":
+        if not isinstance(llm, SyntheticChatModel):
+            raise ValueError("The stub context cache only works with the synthetic LLM provider")
+        cache_provider = StubContextCacheProvider(llm.cached_contents, settings.CONTEXT_CACHE_STUB_FAIL)
+    else:
+        raise ValueError(f"Unknown context cache provider: {provider}")
+    return ContextCache(
+        cache_provider,
+        model,
+        ttl_seconds=settings.CONTEXT_CACHE_TTL_SECONDS,
+        min_tokens=settings.CONTEXT_CACHE_MIN_TOKENS,
+        grace_seconds=settings.NODE_TIMEOUT_SECONDS
+    )
@@ -0,0 +1,188 @@
+import re
+from typing import Dict, Any, List, Optional, Tuple
+
+# Phrases that mean the visitor wants technical depth rather than an overview
+DEEP_DIVE_PATTERNS = [
+    r"\bdeep ?dive\b",
+    r"\bin ?depth\b",
+    r"\btechnical details?\b",
+    r"\bhow (did|do|does|was|were) (you|it|they) (build|built|implement|implemented|design|designed|architect|work)",
+    r"\barchitecture\b",
+    r"\bunder the hood\b",
+]
+
+# Matched against the whole normalized message, so "ok how does the caching work" is not a greeting
+GREETING_PATTERN = re.compile(
+    r"^(hi+|hello+|hey+|yo|hiya|howdy|greetings|good (morning|afternoon|evening)|"
+    r"how are you( doing)?|what s up|whats up|sup|thanks|thank you|ok(ay)?|cool|nice|bye|goodbye)"
+    r"( there| again| so much| a lot| everyone)?( thanks| thank you)?$"
+)
+
+# Static keywords per topic; skill names from the data are matched separately
+TOPIC_KEYWORDS = {
+    "projects": ["project", "projects", "portfolio", "built", "side project"],
+    "experience": ["experience", "experiences", "internship", "internships", "intern", "job", "jobs", "work history", "worked", "company", "companies"],
+    "skills": ["skill", "skills", "tech stack", "technologies", "technology", "programming languages", "frameworks", "tools"],
+    "personal": ["education", "college", "university", "degree", "background", "about yourself", "about you", "who are you", "contact", "email", "linkedin", "github", "resume"],
+}
+
+# Beyond this many words a message is too nuanced for keyword rules
+MAX_WORDS = 25
+
+# A bare skill name is about the portfolio only when the visitor addresses its owner
+# ("have you used react"), not in a general question ("react vs vue in general")
+ADDRESS_WORDS = {"you", "your", "yours", "youve", "yourself"}
+
+
+def normalize(text: str) -> str:
+    """Lowercase and collapse everything but letters/digits into single spaces"""
+    return " ".join(re.sub(r"[^a-z0-9]+", " ", text.lower()).split())
+
+
+def contains_phrase(haystack: str, phrase: str) -> bool:
+    """Whole-word phrase match on normalized text"""
+    return f" {phrase} " in f" {haystack} "
+
+
+def item_aliases(*names: str) -> List[str]:
+    """
+    Derive the phrases an item can be referred to by, e.g.
+    "CSV Cleaner (CleanSV)" -> ["csv cleaner cleansv", "csv cleaner", "cleansv"]
+    "10xScale.ai" -> ["10xscale ai", "10xscale"]
+    Text after a comma is usually a location, so it is not an alias on its own.
+    """
+    aliases = []
+    for name in names:
+        if not name:
+            continue
+        candidates = [name, name.split(",")[0]] + re.split(r"[()]", name)
+        candidates += [re.sub(r"\.(ai|com|io|org|in)\b", "", c, flags=re.IGNORECASE) for c in candidates]
+        for candidate in candidates:
+            alias = normalize(candidate)
+            if len(alias) >= 4 and alias not in aliases:
+                aliases.append(alias)
+    return aliases
+
+
+class FastRouter:
+    """
+    Rule/index based routing for the common turns, so they skip the LLM router.
+    Only answers when confident; anything else returns None and goes to the LLM.
+    """
+
+    def __init__(self, basic_info: Dict[str, Any], detailed_info: Dict[str, Any], min_confidence: float = 0.8):
+        self.min_confidence = min_confidence
+        self.deep_dive_patterns = [re.compile(p) for p in DEEP_DIVE_PATTERNS]
+        self.topic_keywords = {topic: [normalize(k) for k in keywords] for topic, keywords in TOPIC_KEYWORDS.items()}
+        self.skill_names = [normalize(n) for names in basic_info["skills"]["skills"].values() for n in names if len(normalize(n)) >= 2]
+
+        # alias -> (topic, item id)
+        self.item_index: Dict[str, Tuple[str, int]] = {}
+        for source in (basic_info["projects"], detailed_info["det_projects"]):
+            for project in source["projects"]:
+                for alias in item_aliases(project.get("name")):
+                    self.item_index.setdefault(alias, ("projects", project["id"]))
+        for source in (basic_info["experience"], detailed_info["det_experience"]):
+            for experience in source["experience"]:
+                for alias in item_aliases(experience.get("company")):
+                    self.item_index.setdefault(alias, ("experience", experience["id"]))
+
+        self.hits = 0
+        self.misses = 0
+        self.rule_hits: Dict[str, int] = {}
+
+    def classify(
+        self,
+        message: str,
+        current_topic: Optional[str] = None,
+        selected_item_id: Optional[Any] = None,
+        mode: Optional[str] = None
+    ) -> Tuple[Optional[Dict[str, Any]], float, str]:
+        """
+        Returns (routing decision, confidence, rule name).
+        The decision has the same fields the LLM router produces. The previous turn's
+        topic, item and mode keep follow-ups about an item ("which tools did you use
+        there?") from being taken for a new topic; those go to the LLM router.
+        """
+        text = normalize(message)
+        if not text or len(text.split()) > MAX_WORDS:
+            return None, 0.0, "unsupported"
+
+        words = set(text.split())
+        items = {hit for alias, hit in self.item_index.items() if contains_phrase(text, alias)}
+        topics = {topic for topic, keywords in self.topic_keywords.items() if any(contains_phrase(text, k) for k in keywords)}
+        skill_named = any(contains_phrase(text, name) for name in self.skill_names)
+        deep_dive = any(p.search(text) for p in self.deep_dive_patterns)
+        in_context = selected_item_id is not None or mode == "deep_dive"
+
+        def decision(topic, item_id, mode, needs_interrupt):
+            return {
+                "current_topic": topic,
+                "selected_item_id": item_id,
+                "imp_points": None,
+                "mode": mode,
+                "needs_interrupt": needs_interrupt,
+            }
+
+        if len(items) > 1:
+            return None, 0.3, "ambiguous_item"
+
+        if items:
+            topic, item_id = next(iter(items))
+            # Mentioning some other topic too ("skills used in CleanSV") is less certain
+            confidence = 0.95 if topics <= {topic, "skills"} else 0.6
+            if deep_dive:
+                return decision(topic, item_id, "deep_dive", False), confidence, "item_deep_dive"
+            return decision(topic, item_id, "chat", False), confidence, "item"
+
+        if skill_named and not topics:
+            if not words & ADDRESS_WORDS:
+                return None, 0.4, "general_skill"
+            topics = {"skills"}
+
+        if len(topics) > 1:
+            return None, 0.3, "ambiguous_topic"
+
+        if topics and in_context:
+            # Most likely about the item being discussed; the LLM router has the history to tell
+            return None, 0.5, "topic_in_context"
+
+        if topics:
+            topic = next(iter(topics))
+            if deep_dive:
+                # Deep dive without a specific item needs the selection UI
+                if topic in ("projects", "experience"):
+                    return decision(topic, None, "deep_dive", True), 0.9, "topic_deep_dive"
+                return None, 0.4, "topic_deep_dive"
+            return decision(topic, None, "chat", False), 0.85, "topic"
+
+        if GREETING_PATTERN.match(text) and not deep_dive:
+            # Small talk keeps whatever topic and item the conversation is on
+            return decision(current_topic, selected_item_id, "chat", False), 0.9, "greeting"
+
+        return None, 0.0, "no_match"
+
+    def route(
+        self,
+        message: str,
+        current_topic: Optional[str] = None,
+        selected_item_id: Optional[Any] = None,
+        mode: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Decision if confident enough, else None; records hit-rate metrics"""
+        routing, confidence, rule = self.classify(message, current_topic, selected_item_id, mode)
+        if routing is None or confidence < self.min_confidence:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.rule_hits[rule] = self.rule_hits.get(rule, 0) + 1
+        return routing
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "rule_hits": dict(self.rule_hits),
+        }
@@ -0,0 +1,136 @@
+import math
+import time
+import asyncio
+from collections import defaultdict, deque
+from typing import Dict, Any, Optional, Callable, Awaitable
+
+from langchain_core.callbacks import AsyncCallbackHandler, BaseCallbackManager
+from langchain_core.runnables.config import ensure_config
+
+from .telemetry import HEDGES
+
+# Recent call latencies kept per node for the percentile
+LATENCY_WINDOW = 200
+
+
+class FirstToken(AsyncCallbackHandler):
+    """Notices the first streamed token of the call it is attached to"""
+
+    def __init__(self):
+        self.seen = asyncio.Event()
+
+    async def on_llm_new_token(self, token: str, **kwargs: Any) -> None:
+        self.seen.set()
+
+    def config(self) -> Dict[str, Any]:
+        """Run config keeping the caller's callbacks (so tokens still stream) with this one added"""
+        callbacks = ensure_config().get("callbacks")
+        if isinstance(callbacks, BaseCallbackManager):
+            callbacks = callbacks.copy()
+            callbacks.add_handler(self, inherit=False)
+        else:
+            callbacks = list(callbacks or []) + [self]
+        return {"callbacks": callbacks}
+
+
+class Hedger:
+    """
+    Hedged LLM calls: a call still running after its node's recent latency percentile
+    (never less than min_delay) gets a duplicate, the first to finish is used and the
+    other cancelled. Only the slowest few percent of calls reach that point, and
+    max_fraction caps hedges against all calls, so the cost stays close to one call each.
+
+    A call that has started streaming tokens to the client is never hedged or
+    replaced, since its tokens are already out; hedges run without callbacks, so
+    theirs never reach the stream. Latencies are recorded per node; when the hedge
+    wins, the elapsed time stands in for the primary's (a lower bound).
+    """
+
+    def __init__(self, percentile: float = 95, min_delay: float = 0.2, max_fraction: float = 0.1, min_samples: int = 20):
+        self.percentile = percentile
+        self.min_delay = min_delay
+        self.max_fraction = max_fraction
+        self.min_samples = min_samples
+        self.latencies: Dict[str, deque] = defaultdict(lambda: deque(maxlen=LATENCY_WINDOW))
+        self.calls = 0
+        self.hedged = 0
+        self.hedge_wins = 0
+
+    def delay(self, node: str) -> Optional[float]:
+        """Seconds before hedging this node's calls, None until enough latencies are known"""
+        latencies = self.latencies[node]
+        if len(latencies) < self.min_samples:
+            return None
+        ordered = sorted(latencies)
+        index = min(len(ordered) - 1, math.ceil(self.percentile / 100 * len(ordered)) - 1)
+        return max(self.min_delay, ordered[index])
+
+    def _record(self, node: str, seconds: float) -> None:
+        self.latencies[node].append(seconds)
+
+    async def run(self, node: str, attempt: Callable[[Optional[Dict[str, Any]]], Awaitable[Any]]) -> Any:
+        """
+        Result of attempt(config), hedged if it is slow. attempt makes one call with
+        the given run config (None: the caller's own).
+        """
+        self.calls += 1
+        delay = self.delay(node)
+        start = time.perf_counter()
+        if delay is None:
+            result = await attempt(None)
+            self._record(node, time.perf_counter() - start)
+            return result
+
+        first_token = FirstToken()
+        primary = asyncio.ensure_future(attempt(first_token.config()))
+        hedge = streaming = None
+        try:
+            done, _ = await asyncio.wait({primary}, timeout=delay)
+            if done or first_token.seen.is_set() or self.hedged >= self.max_fraction * self.calls:
+                result = await primary
+                self._record(node, time.perf_counter() - start)
+                return result
+
+            self.hedged += 1
+            hedge = asyncio.ensure_future(attempt({"callbacks": []}))
+            streaming = asyncio.ensure_future(first_token.seen.wait())
+            pending = {primary, hedge, streaming}
+            while True:
+                done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                if streaming in done:
+                    # The primary is streaming to the client now; it has to be the one that finishes
+                    hedge.cancel()
+                    HEDGES.labels(node, "streaming").inc()
+                    result = await primary
+                    self._record(node, time.perf_counter() - start)
+                    return result
+                winner = next((task for task in (primary, hedge) if task in done and task.exception() is None), None)
+                if winner is None:
+                    if primary.done() and hedge.done():
+                        # Both failed; report the primary's error
+                        return primary.result()
+                    # One failed; the other may still succeed
+                    continue
+                outcome = "primary" if winner is primary else "hedge"
+                self.hedge_wins += winner is hedge
+                HEDGES.labels(node, outcome).inc()
+                self._record(node, time.perf_counter() - start)
+                return winner.result()
+        finally:
+            for task in (primary, hedge, streaming):
+                if task is None:
+                    continue
+                if not task.done():
+                    task.cancel()
+                elif not task.cancelled():
+                    # Mark the loser's error as seen; nobody will await it
+                    task.exception()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "hedged": self.hedged,
+            "hedge_wins": self.hedge_wins,
+            "hedge_rate": self.hedged / self.calls if self.calls else 0.0,
+            "delays": {node: self.delay(node) for node in self.latencies},
+        }
@@ -0,0 +1,105 @@
+import hashlib
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+from langchain_core.messages import HumanMessage, AIMessage, SystemMessage, BaseMessage
+
+# Rough chars-per-token for English prose; Gemini token counting needs a network call
+CHARS_PER_TOKEN = 4
+
+# Characters of each older message kept in the rolling summary
+SUMMARY_LINE_CHARS = 200
+
+
+def estimate_tokens(text: str) -> int:
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+def count_input_tokens(llm_input: List[BaseMessage]) -> int:
+    """Estimated prompt size of one LLM call"""
+    return sum(estimate_tokens(str(message.content)) for message in llm_input)
+
+
+def message_hash(message: Dict[str, Any]) -> str:
+    return hashlib.sha1(f"{message['role']}:{message['content']}".encode("utf-8")).hexdigest()
+
+
+def summary_line(message: Dict[str, Any]) -> str:
+    speaker = "User" if message["role"] == "user" else "Assistant"
+    content = " ".join(message["content"].split())
+    if len(content) > SUMMARY_LINE_CHARS:
+        content = content[:SUMMARY_LINE_CHARS].rsplit(" ", 1)[0] + "..."
+    return f"- {speaker}: {content}"
+
+
+class HistoryManager:
+    """
+    Picks the conversation history sent to the LLM by token budget instead of message count.
+    Turns that fall out of the window are folded into a rolling summary, built
+    incrementally and cached per session so each turn is only summarized once.
+    """
+
+    def __init__(self, budget_tokens: int = 2000, summary_tokens: int = 300, max_sessions: int = 10000):
+        self.budget_tokens = budget_tokens
+        self.summary_tokens = summary_tokens
+        self.max_sessions = max_sessions
+        # session id -> (hash of the newest folded message, summary lines)
+        self.summaries: "OrderedDict[str, Tuple[str, List[str]]]" = OrderedDict()
+
+    def build(self, system_prompt: str, messages: List[Dict[str, Any]], session_id: Optional[str] = None) -> List[BaseMessage]:
+        """
+        LLM input: the system prompt (plus a summary of older turns, if any)
+        followed by the most recent turns that fit the budget
+        """
+        conversation = [m for m in messages if m["role"] in ("user", "assistant")]
+
+        # Newest first until the budget is spent; the latest message is always kept
+        window_start = len(conversation)
+        used = 0
+        while window_start > 0:
+            cost = estimate_tokens(conversation[window_start - 1]["content"])
+            if used + cost > self.budget_tokens and window_start < len(conversation):
+                break
+            used += cost
+            window_start -= 1
+
+        # Gemini only accepts a single, leading system message
+        older = conversation[:window_start]
+        if older:
+            summary = self._summarize(older, conversation, session_id)
+            system_prompt = f"{system_prompt}\n\n**EARLIER CONVERSATION (summary):**\n{summary}"
+
+        llm_input: List[BaseMessage] = [SystemMessage(content=system_prompt)]
+        for msg in conversation[window_start:]:
+            if msg["role"] == "user":
+                llm_input.append(HumanMessage(content=msg["content"]))
+            else:
+                llm_input.append(AIMessage(content=msg["content"]))
+        return llm_input
+
+    def _summarize(self, older: List[Dict[str, Any]], conversation: List[Dict[str, Any]], session_id: Optional[str]) -> str:
+        last_folded, lines = self.summaries.get(session_id, (None, [])) if session_id else (None, [])
+
+        # Only fold what arrived since the last call for this session
+        older_hashes = [message_hash(m) for m in older]
+        if last_folded in older_hashes:
+            new = older[len(older_hashes) - older_hashes[::-1].index(last_folded):]
+        elif last_folded and last_folded in (message_hash(m) for m in conversation[len(older):]):
+            # The window grew back over already summarized turns
+            new = []
+        else:
+            # First summary, or the history no longer contains what was folded last (trimmed
+            # or edited by the client): the old lines may not belong to it, so start over
+            new = older
+            lines = []
+        lines = lines + [summary_line(m) for m in new]
+
+        # Keep the newest lines within the summary budget
+        while len(lines) > 1 and sum(estimate_tokens(line) for line in lines) > self.summary_tokens:
+            lines = lines[1:]
+
+        if session_id:
+            self.summaries[session_id] = (older_hashes[-1] if new else last_folded, lines)
+            self.summaries.move_to_end(session_id)
+            while len(self.summaries) > self.max_sessions:
+                self.summaries.popitem(last=False)
+        return "\n".join(lines)
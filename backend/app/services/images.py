@@ -0,0 +1,196 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import logging
+import tempfile
+from pathlib import Path
+from typing import Dict, Any, List, Optional, Tuple
+
+import anyio
+from starlette.responses import FileResponse
+
+logger = logging.getLogger("portfolio.images")
+
+SOURCE_SUFFIXES = (".png", ".jpg", ".jpeg", ".webp")
+
+MEDIA_TYPES = {"avif": "image/avif", "webp": "image/webp", "png": "image/png"}
+
+# Most preferred first, when the client accepts several
+NEGOTIATED_FORMATS = ("avif", "webp")
+
+
+def encoder_formats() -> Tuple[str, ...]:
+    """Output formats this Pillow build can encode; empty without Pillow"""
+    try:
+        from PIL import features
+    except ImportError:
+        return ()
+    return tuple(fmt for fmt in ("avif", "webp") if features.check(fmt)) + ("png",)
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    (first, last) byte of a single `bytes=` range, None for no/unsupported range.
+    Raises ValueError when the range can't be satisfied.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start, end = int(first), int(last) if last else size - 1
+        else:
+            # Suffix range: the last N bytes
+            start, end = max(0, size - int(last)), size - 1
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise ValueError("unsatisfiable range")
+    return start, min(end, size - 1)
+
+
+class RangeFileResponse(FileResponse):
+    """
+    FileResponse answering a single byte range with 206. Whole files go through the
+    server's http.response.pathsend extension when it has one, so the server sends
+    the file itself without it passing through Python; otherwise they are streamed in chunks.
+    """
+
+    def __init__(self, path: Path, byte_range: Optional[Tuple[int, int]], stat_result: os.stat_result, **kwargs):
+        super().__init__(path, stat_result=stat_result, **kwargs)
+        self.byte_range = byte_range
+        self.headers["accept-ranges"] = "bytes"
+        if byte_range is not None:
+            start, end = byte_range
+            self.status_code = 206
+            self.headers["content-range"] = f"bytes {start}-{end}/{stat_result.st_size}"
+            self.headers["content-length"] = str(end - start + 1)
+
+    async def __call__(self, scope, receive, send) -> None:
+        if self.byte_range is None:
+            if "http.response.pathsend" in scope.get("extensions", {}) and scope["method"] != "HEAD":
+                await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+                await send({"type": "http.response.pathsend", "path": str(self.path)})
+                return
+            return await super().__call__(scope, receive, send)
+
+        await send({"type": "http.response.start", "status": self.status_code, "headers": self.raw_headers})
+        if scope["method"] == "HEAD":
+            return await send({"type": "http.response.body", "body": b"", "more_body": False})
+        start, end = self.byte_range
+        async with await anyio.open_file(self.path, mode="rb") as file:
+            await file.seek(start)
+            remaining = end - start + 1
+            while remaining:
+                chunk = await file.read(min(self.chunk_size, remaining))
+                remaining -= len(chunk)
+                await send({"type": "http.response.body", "body": chunk, "more_body": bool(remaining and chunk)})
+                if not chunk:
+                    break
+
+
+class ImageVariants:
+    """
+    Resized, re-encoded copies of the portfolio images, generated on first request and
+    kept in cache_dir. A variant's file name hashes the source's path, size and mtime with
+    the width, format and quality, so editing an image yields new variants and the hash
+    doubles as a strong ETag. Files are written to a temp name and renamed into place,
+    so workers sharing the cache directory never see a partial file.
+    Widths are snapped up to the configured steps (never above the original) to bound the cache.
+    """
+
+    def __init__(self, source_dir: str, cache_dir: str, widths: List[int], quality: int = 75):
+        self.source_dir = Path(source_dir).resolve()
+        self.cache_dir = Path(cache_dir)
+        self.widths = sorted(widths)
+        self.quality = quality
+        self.formats = encoder_formats()
+        self._pending: Dict[str, asyncio.Future] = {}
+        self.generated = 0
+        self.generate_seconds = 0.0
+        self.hits = 0
+        self.failures = 0
+
+    def source(self, relative: str) -> Optional[Path]:
+        """The source image for a request path, None if it isn't one (or escapes source_dir)"""
+        path = (self.source_dir / relative).resolve()
+        if path.suffix.lower() not in SOURCE_SUFFIXES or self.source_dir not in path.parents or not path.is_file():
+            return None
+        return path
+
+    def negotiate(self, requested: Optional[str], accept: str) -> str:
+        """Explicit format if this build can encode it, else the best one the client accepts, else png"""
+        if requested in self.formats:
+            return requested
+        for fmt in NEGOTIATED_FORMATS:
+            if fmt in self.formats and MEDIA_TYPES[fmt] in accept:
+                return fmt
+        return "png"
+
+    def snap_width(self, width: Optional[int]) -> int:
+        if width is None:
+            return self.widths[-1]
+        return next((step for step in self.widths if step >= width), self.widths[-1])
+
+    def variant_key(self, source: Path, width: int, fmt: str) -> str:
+        stat_result = source.stat()
+        identity = [str(source.relative_to(self.source_dir)), stat_result.st_size, stat_result.st_mtime_ns, width, fmt, self.quality]
+        return hashlib.sha256(json.dumps(identity).encode("utf-8")).hexdigest()[:24]
+
+    async def get(self, source: Path, width: int, fmt: str) -> Tuple[Path, str]:
+        """(variant file, ETag); generated once, concurrent requests for it wait for the same run"""
+        key = self.variant_key(source, width, fmt)
+        path = self.cache_dir / f"{source.stem}-{width}-{key}.{fmt}"
+        if path.exists():
+            self.hits += 1
+            return path, f'"{key}"'
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = self._pending[key] = asyncio.ensure_future(asyncio.to_thread(self._generate, source, width, fmt, path))
+            pending.add_done_callback(lambda _: self._pending.pop(key, None))
+        await asyncio.shield(pending)
+        return path, f'"{key}"'
+
+    def _generate(self, source: Path, width: int, fmt: str, path: Path) -> None:
+        from PIL import Image
+
+        start = time.perf_counter()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.cache_dir, suffix=f".{fmt}.tmp")
+        try:
+            with os.fdopen(fd, "wb") as file, Image.open(source) as image:
+                if image.width > width:
+                    image = image.resize((width, round(image.height * width / image.width)), Image.LANCZOS)
+                if fmt == "png":
+                    image.save(file, format="PNG", optimize=True)
+                else:
+                    image.save(file, format=fmt.upper(), quality=self.quality)
+            os.replace(tmp, path)
+        except Exception as e:
+            os.unlink(tmp)
+            self.failures += 1
+            logger.error(json.dumps({"event": "image_variant_failed", "source": str(source), "error": repr(e)[:300]}))
+            raise
+
+        elapsed = time.perf_counter() - start
+        self.generated += 1
+        self.generate_seconds += elapsed
+        logger.info(json.dumps({
+            "event": "image_variant_generated",
+            "source": source.name,
+            "width": width,
+            "format": fmt,
+            "bytes": path.stat().st_size,
+            "ms": round(elapsed * 1000, 1),
+        }))
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "generated": self.generated,
+            "generate_seconds": self.generate_seconds,
+            "hits": self.hits,
+            "failures": self.failures,
+        }
@@ -0,0 +1,255 @@
+import os
+import json
+import time
+import asyncio
+import hashlib
+import importlib
+import threading
+from types import ModuleType
+from typing import Any, Dict, List, Optional, AsyncIterator
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, AIMessageChunk, BaseMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatGenerationChunk, ChatResult
+
+from ..config import settings
+
+# The router prompt asks for this; synthetic answers to it must parse as a routing decision
+ROUTER_MARKER = "intelligent routing agent"
+
+SYNTHETIC_ROUTE = {
+    "current_topic": "projects",
+    "selected_item_id": 1,
+    "imp_points": None,
+    "mode": "chat",
+    "needs_interrupt": False,
+}
+
+
+def import_gemini(name: str) -> ModuleType:
+    """
+    A module of the Gemini client stack (langchain-google-genai, google-generativeai,
+    google-api-core, grpc), imported on first use so offline providers don't need it
+    """
+    return importlib.import_module(name)
+
+
+def messages_hash(messages: List[BaseMessage]) -> str:
+    """Stable identity of an LLM input, used to match recordings"""
+    payload = [(m.type, m.content) for m in messages]
+    return hashlib.sha256(json.dumps(payload, default=str).encode("utf-8")).hexdigest()
+
+
+class CachedContentNotFound(LookupError):
+    """The synthetic model's answer to an unknown cached_content handle, like Gemini's NotFound"""
+
+
+class SyntheticChatModel(BaseChatModel):
+    """
+    Offline stand-in for Gemini: waits `latency` seconds before the first token,
+    then emits `response_tokens` words at `tokens_per_second`.
+    Router calls get a valid routing decision so the whole graph can run.
+    A cached_content handle is resolved through `cached_contents` (filled by the stub
+    context cache) and, like Gemini, rejected when unknown. A generation_config
+    max_output_tokens caps the answer length.
+    """
+    latency: float = 0.3
+    tokens_per_second: float = 200.0
+    response_tokens: int = 120
+    cached_contents: Dict[str, str] = {}
+
+    @property
+    def _llm_type(self) -> str:
+        return "synthetic"
+
+    def _reply(self, messages: List[BaseMessage], cached_content: Optional[str] = None, generation_config: Optional[Dict[str, Any]] = None) -> List[str]:
+        if cached_content:
+            if cached_content not in self.cached_contents:
+                raise CachedContentNotFound(f"CachedContent not found: {cached_content}")
+            messages = [SystemMessage(content=self.cached_contents[cached_content])] + list(messages)
+        if messages and ROUTER_MARKER in str(messages[0].content):
+            return [json.dumps(SYNTHETIC_ROUTE)]
+        max_tokens = (generation_config or {}).get("max_output_tokens") or self.response_tokens
+        return [f"token{i} " for i in range(min(self.response_tokens, max_tokens))]
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens = self._reply(messages, kwargs.get("cached_content"), kwargs.get("generation_config"))
+        time.sleep(self.latency + len(tokens) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        tokens = self._reply(messages, kwargs.get("cached_content"), kwargs.get("generation_config"))
+        await asyncio.sleep(self.latency + len(tokens) / self.tokens_per_second)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="".join(tokens)))])
+
+    async def _astream(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> AsyncIterator[ChatGenerationChunk]:
+        tokens = self._reply(messages, kwargs.get("cached_content"), kwargs.get("generation_config"))
+        await asyncio.sleep(self.latency)
+        for token in tokens:
+            await asyncio.sleep(1 / self.tokens_per_second)
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content=token))
+            if run_manager:
+                await run_manager.on_llm_new_token(token, chunk=chunk)
+            yield chunk
+
+
+# Serializes appends from concurrent calls
+_recording_lock = threading.Lock()
+
+
+class RecordingChatModel(BaseChatModel):
+    """Passes calls through to `inner` and appends each input hash, answer and latency to a JSONL file"""
+    inner: BaseChatModel
+    path: str
+
+    @property
+    def _llm_type(self) -> str:
+        return f"recording-{self.inner._llm_type}"
+
+    def _record(self, messages: List[BaseMessage], content: str, latency: float) -> None:
+        line = json.dumps({"hash": messages_hash(messages), "content": content, "latency": latency})
+        with _recording_lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(line + "\n")
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        message = self.inner.invoke(messages, stop=stop, **kwargs)
+        self._record(messages, message.content, time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        start = time.perf_counter()
+        message = await self.inner.ainvoke(messages, stop=stop, **kwargs)
+        self._record(messages, message.content, time.perf_counter() - start)
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+class ReplayChatModel(BaseChatModel):
+    """
+    Answers from a recording made by RecordingChatModel, optionally sleeping for
+    the recorded latency times `latency_scale`. Unrecorded inputs raise.
+    """
+    path: str
+    latency_scale: float = 0.0
+    recordings: Dict[str, Dict[str, Any]] = {}
+
+    def __init__(self, **kwargs: Any):
+        super().__init__(**kwargs)
+        recordings = {}
+        with open(self.path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    recordings[entry["hash"]] = entry
+        self.recordings = recordings
+
+    @property
+    def _llm_type(self) -> str:
+        return "replay"
+
+    def _lookup(self, messages: List[BaseMessage]) -> Dict[str, Any]:
+        entry = self.recordings.get(messages_hash(messages))
+        if entry is None:
+            raise KeyError(f"No recorded response for this input in {self.path}")
+        return entry
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        entry = self._lookup(messages)
+        time.sleep(entry["latency"] * self.latency_scale)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=entry["content"]))])
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs: Any) -> ChatResult:
+        entry = self._lookup(messages)
+        await asyncio.sleep(entry["latency"] * self.latency_scale)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=entry["content"]))])
+
+
+class ModelProfile:
+    """Model and generation settings one graph node calls the LLM with"""
+    __slots__ = ("model", "temperature", "max_tokens")
+
+    def __init__(self, model: str, temperature: float, max_tokens: int):
+        self.model = model
+        self.temperature = temperature
+        self.max_tokens = max_tokens
+
+    def generation_config(self) -> Dict[str, Any]:
+        return {"temperature": self.temperature, "max_output_tokens": self.max_tokens}
+
+
+def model_profiles() -> Dict[str, ModelProfile]:
+    """Profile per LLM-calling node; prefetched deep dives use the deep_dive profile so they match"""
+    deep_dive = ModelProfile(settings.DEEP_DIVE_MODEL_NAME, settings.DEEP_DIVE_TEMPERATURE, settings.DEEP_DIVE_MAX_TOKENS)
+    return {
+        "initial_router": ModelProfile(settings.ROUTER_MODEL_NAME, settings.ROUTER_TEMPERATURE, settings.ROUTER_MAX_TOKENS),
+        "chat": ModelProfile(settings.CHAT_MODEL_NAME, settings.CHAT_TEMPERATURE, settings.CHAT_MAX_TOKENS),
+        "deep_dive": deep_dive,
+        "prefetch": deep_dive,
+    }
+
+
+class NodeModels:
+    """
+    The LLM each node calls: one client per distinct model in the profiles, bound to the
+    node's temperature and output cap. An llm passed in serves every node. Gemini clients
+    share the upstream pool's connections when there is one.
+    """
+
+    def __init__(self, profiles: Dict[str, ModelProfile], llm: Optional[BaseChatModel] = None, upstream=None):
+        self.profiles = profiles
+        self.clients: Dict[str, BaseChatModel] = {}
+        for profile in profiles.values():
+            if profile.model not in self.clients:
+                self.clients[profile.model] = llm or create_llm(model=profile.model, upstream=upstream)
+        self.bound = {
+            node: self.clients[profile.model].bind(generation_config=profile.generation_config())
+            for node, profile in profiles.items()
+        }
+
+    def client(self, node: str) -> BaseChatModel:
+        """The node's model without its generation settings bound"""
+        return self.clients[self.profiles[node].model]
+
+    def model(self, node: str) -> str:
+        return self.profiles[node].model
+
+    def get(self, node: str):
+        return self.bound[node]
+
+
+def create_gemini_llm(model: Optional[str] = None, upstream=None) -> BaseChatModel:
+    llm = import_gemini("langchain_google_genai").ChatGoogleGenerativeAI(
+        model=model or settings.MODEL_NAME,
+        google_api_key=os.getenv("GOOGLE_API_KEY"),
+        temperature=settings.TEMPERATURE,
+        max_output_tokens=settings.MAX_TOKENS
+    )
+    if upstream is not None:
+        # Async calls (all the graph makes) go over the pool's channels instead of a client of their own
+        llm.async_client_running = upstream.client()
+    return llm
+
+
+def create_llm(provider: Optional[str] = None, model: Optional[str] = None, upstream=None) -> BaseChatModel:
+    """
+    LLM for the configured provider (and model, for gemini; MODEL_NAME by default),
+    connected through the upstream pool if one is given:
+    - "gemini": the real model
+    - "synthetic": fake latency and token rate, no network
+    - "record": gemini, with every call appended to LLM_RECORDING_PATH
+    - "replay": answers from LLM_RECORDING_PATH, no network
+    """
+    provider = provider or settings.LLM_PROVIDER
+    if provider == "gemini":
+        return create_gemini_llm(model, upstream)
+    if provider == "synthetic":
+        return SyntheticChatModel(
+            latency=settings.SYNTHETIC_LATENCY_SECONDS,
+            tokens_per_second=settings.SYNTHETIC_TOKENS_PER_SECOND,
+            response_tokens=settings.SYNTHETIC_RESPONSE_TOKENS
+        )
+    if provider == "record":
+        return RecordingChatModel(inner=create_gemini_llm(model, upstream), path=settings.LLM_RECORDING_PATH)
+    if provider == "replay":
+        return ReplayChatModel(path=settings.LLM_RECORDING_PATH, latency_scale=settings.LLM_REPLAY_LATENCY_SCALE)
+    raise ValueError(f"Unknown LLM provider: {provider}")
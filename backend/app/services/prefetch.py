@@ -0,0 +1,234 @@
+import json
+import time
+import heapq
+import hashlib
+import asyncio
+import logging
+import itertools
+import contextvars
+from collections import Counter, OrderedDict
+from typing import Dict, Any, List, Optional, Tuple, Callable, Awaitable
+
+from langchain_core.messages import BaseMessage
+
+from .history import count_input_tokens, estimate_tokens
+from .telemetry import PREFETCHES, PREFETCH_TOKENS
+
+logger = logging.getLogger("portfolio.prefetch")
+
+# (data version, session id, conversation digest, topic, item id)
+PrefetchKey = Tuple[str, str, str, str, Any]
+
+# Messages before the pick the digest covers: the question and the answer offering the selection
+DIGEST_MESSAGES = 2
+
+# How often a worker looks again while the LLM is too busy to prefetch
+IDLE_POLL_SECONDS = 0.25
+
+# Output size assumed for the budget check until answers have been generated
+EXPECTED_OUTPUT_TOKENS = 400
+
+# Weight of being named in the answer the user is reading, against the item's share of past picks
+MENTION_WEIGHT = 0.5
+
+
+def conversation_digest(messages: List[Dict[str, Any]]) -> str:
+    """Digest of the turn a pick follows, so an answer is only served to the conversation it was generated from"""
+    payload = [[message.get("role"), message.get("content")] for message in messages[-DIGEST_MESSAGES:]]
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+class PrefetchEntry:
+    __slots__ = ("content", "tokens", "created")
+
+    def __init__(self, content: str, tokens: int):
+        self.content = content
+        self.tokens = tokens
+        self.created = time.monotonic()
+
+
+class Prefetcher:
+    """
+    Generates the first deep-dive answer for the items a user is likely to pick next
+    from the selection list, while the LLM has spare capacity, and hands it over when
+    they pick one.
+
+    Candidates wait in a bounded priority queue. Workers take the best one only while
+    is_idle() holds and the per-minute token budget covers its estimated cost; jobs
+    that waited longer than max_wait_seconds (the user has moved on) or don't fit the
+    budget are dropped. A pick arriving while its answer is still generating waits for it.
+    Answers are keyed by session and by the turn they follow as well as by item, so
+    each is only served to the conversation it was generated from, at the next turn.
+    Answers never picked within ttl_seconds, evicted, or left behind by a data reload
+    count as wasted tokens.
+    """
+
+    def __init__(
+        self,
+        generate: Callable[[List[BaseMessage]], Awaitable[str]],
+        is_idle: Callable[[], bool],
+        tokens_per_minute: int = 20000,
+        concurrency: int = 1,
+        max_queue: int = 32,
+        max_wait_seconds: float = 30,
+        max_entries: int = 256,
+        ttl_seconds: float = 900
+    ):
+        self.generate = generate
+        self.is_idle = is_idle
+        self.tokens_per_minute = tokens_per_minute
+        self.concurrency = concurrency
+        self.max_queue = max_queue
+        self.max_wait_seconds = max_wait_seconds
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.budget = float(tokens_per_minute)
+        self.budget_updated = time.monotonic()
+        self._queue: List[Tuple[float, int, PrefetchKey, List[BaseMessage], float]] = []
+        self._order = itertools.count()
+        self._entries: "OrderedDict[PrefetchKey, PrefetchEntry]" = OrderedDict()
+        # key -> (generating task, its input tokens)
+        self._running: Dict[PrefetchKey, Tuple[asyncio.Task, int]] = {}
+        self._workers: set = set()
+        # Past picks per (topic, item id), the prior for which item comes next
+        self.picks: Counter = Counter()
+        self.average_output_tokens = float(EXPECTED_OUTPUT_TOKENS)
+        self.generated = 0
+        self.hits = 0
+        self.misses = 0
+        self.dropped = 0
+        self.failures = 0
+        self.used_tokens = 0
+        self.wasted_tokens = 0
+
+    def score(self, topic: str, item_id: Any, mentioned: bool) -> float:
+        """Share of this topic's past picks that went to the item, plus a bonus if the answer names it"""
+        total = sum(count for (picked_topic, _), count in self.picks.items() if picked_topic == topic)
+        share = self.picks[(topic, item_id)] / total if total else 0.0
+        return share + (MENTION_WEIGHT if mentioned else 0.0)
+
+    def schedule(self, candidates: List[Tuple[float, PrefetchKey, List[BaseMessage]]]) -> None:
+        """Queue (score, key, deep_dive input) candidates; ones already cached, queued or running are skipped"""
+        now = time.monotonic()
+        versions = {key[0] for _, key, _ in candidates}
+        self._expire(now, versions)
+        queued = {job[2] for job in self._queue}
+        for score, key, llm_input in candidates:
+            if key in self._entries or key in self._running or key in queued:
+                continue
+            heapq.heappush(self._queue, (-score, next(self._order), key, llm_input, now))
+            queued.add(key)
+        if len(self._queue) > self.max_queue:
+            # Keep the best max_queue; a sorted list is still a heap
+            self._queue.sort()
+            self.dropped += len(self._queue) - self.max_queue
+            PREFETCHES.labels("dropped").inc(len(self._queue) - self.max_queue)
+            del self._queue[self.max_queue:]
+        while self._queue and len(self._workers) < self.concurrency:
+            # A fresh context, so the calls aren't attributed to the request that scheduled them
+            worker = asyncio.create_task(self._work(), context=contextvars.Context())
+            self._workers.add(worker)
+            worker.add_done_callback(self._workers.discard)
+
+    async def take(self, key: PrefetchKey) -> Optional[str]:
+        """The prefetched answer for a picked item (waiting for it if it is being generated), else None"""
+        self.picks[key[3:]] += 1
+        running = self._running.pop(key, None)
+        if running is not None:
+            task, input_tokens = running
+            try:
+                content = await asyncio.shield(task)
+            except Exception:
+                content = None
+            if content is not None:
+                self._hit(input_tokens + estimate_tokens(content))
+                return content
+
+        entry = self._entries.pop(key, None)
+        if entry is not None and time.monotonic() - entry.created <= self.ttl_seconds:
+            self._hit(entry.tokens)
+            return entry.content
+        if entry is not None:
+            self._waste(entry)
+        self.misses += 1
+        PREFETCHES.labels("miss").inc()
+        return None
+
+    def _hit(self, tokens: int) -> None:
+        self.hits += 1
+        self.used_tokens += tokens
+        PREFETCHES.labels("hit").inc()
+        PREFETCH_TOKENS.labels("used").inc(tokens)
+
+    def _waste(self, entry: PrefetchEntry) -> None:
+        self.wasted_tokens += entry.tokens
+        PREFETCHES.labels("wasted").inc()
+        PREFETCH_TOKENS.labels("wasted").inc(entry.tokens)
+
+    def _expire(self, now: float, versions: set) -> None:
+        """Drop answers past their TTL or from a data version other than the current one"""
+        for key in [key for key, entry in self._entries.items() if now - entry.created > self.ttl_seconds or (versions and key[0] not in versions)]:
+            self._waste(self._entries.pop(key))
+
+    def _spend(self, tokens: float) -> bool:
+        now = time.monotonic()
+        self.budget = min(float(self.tokens_per_minute), self.budget + (now - self.budget_updated) * self.tokens_per_minute / 60)
+        self.budget_updated = now
+        if tokens > self.budget:
+            return False
+        self.budget -= tokens
+        return True
+
+    async def _work(self) -> None:
+        while self._queue:
+            if not self.is_idle():
+                await asyncio.sleep(IDLE_POLL_SECONDS)
+                continue
+            _, _, key, llm_input, queued_at = heapq.heappop(self._queue)
+            input_tokens = count_input_tokens(llm_input)
+            estimate = input_tokens + self.average_output_tokens
+            if time.monotonic() - queued_at > self.max_wait_seconds or not self._spend(estimate):
+                self.dropped += 1
+                PREFETCHES.labels("dropped").inc()
+                continue
+
+            task = asyncio.ensure_future(self.generate(llm_input))
+            self._running[key] = (task, input_tokens)
+            try:
+                content = await asyncio.shield(task)
+            except Exception as e:
+                self.failures += 1
+                PREFETCHES.labels("error").inc()
+                logger.warning(json.dumps({"event": "prefetch_failed", "topic": key[3], "item_id": key[4], "error": repr(e)[:300]}))
+                self._running.pop(key, None)
+                continue
+
+            output_tokens = estimate_tokens(content)
+            # Settle the budget to what the call actually cost
+            self.budget -= input_tokens + output_tokens - estimate
+            self.average_output_tokens = 0.8 * self.average_output_tokens + 0.2 * output_tokens
+            self.generated += 1
+            PREFETCHES.labels("generated").inc()
+            if self._running.pop(key, (None, 0))[0] is not task:
+                # Picked while generating; take() already served it
+                continue
+            self._entries[key] = PrefetchEntry(content, input_tokens + output_tokens)
+            while len(self._entries) > self.max_entries:
+                self._waste(self._entries.popitem(last=False)[1])
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "queued": len(self._queue),
+            "running": len(self._running),
+            "ready": len(self._entries),
+            "generated": self.generated,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "dropped": self.dropped,
+            "failures": self.failures,
+            "used_tokens": self.used_tokens,
+            "wasted_tokens": self.wasted_tokens,
+            "budget_tokens": self.budget,
+        }
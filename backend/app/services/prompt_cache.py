@@ -0,0 +1,166 @@
+import json
+import hashlib
+from functools import lru_cache
+from typing import Dict, Any, Optional, Tuple
+
+CHAT_PROMPT_HEADER = [
+    "**STRICT RULES**",
+    "- You only answer using provided data from (basic_info) as your main source of information regarding profile enquiries.",
+    "- You do NOT fabricate information.",
+    "- If you are talking about PROJECTS or EXPERIENCE always end with 'Would you like to deep dive into any of these topics?'",
+    "",
+    "**OBJECTIVE**",
+    "You are a helpful AI assistant for a portfolio website who provides accurate information based on the provided profile data.",
+    "If they ask any technical information not relevant to the profile person but on the technical side, you can answer through your knowledge base, with citations of (basic_info) if any.",
+    "Explain in a concise and clear manner.",
+    "",
+]
+
+DEEP_DIVE_PROMPT_HEADER = [
+    "**OBJECTIVE**",
+    "You are an expert technical interviewer providing in-depth technical information about projects and experiences.",
+    "Focus on:",
+    "- Technical implementation details and architecture decisions",
+    "- Problem-solving approaches and challenges faced",
+    "- Code patterns, best practices, and design choices",
+    "- Performance considerations and trade-offs made",
+    "- Tools and technologies used and why they were chosen",
+    "",
+    "Keep responses detailed but concise, suitable for technical discussion.",
+    "",
+]
+
+# detailed_info section holding each topic's items
+DETAILED_SECTIONS = {
+    "projects": ("det_projects", "projects"),
+    "experience": ("det_experience", "experience"),
+}
+
+# Number of distinct (topic, item, imp_points) prompts kept per mode
+PROMPT_CACHE_SIZE = 512
+
+
+def compact_json(data: Any) -> str:
+    """JSON without indentation whitespace, which the LLM doesn't need"""
+    return json.dumps(data, separators=(",", ":"), ensure_ascii=False)
+
+
+class PromptCache:
+    """
+    System prompts for chat/deep_dive, built from data serialized once per data version.
+    Final prompts are memoized on the state fields they depend on.
+    """
+
+    def __init__(self, basic_info: Dict[str, Any], detailed_info: Dict[str, Any], basic_index=None, detailed_index=None, top_k: int = 6, data_version: Optional[str] = None):
+        self.basic_json = compact_json(basic_info)
+        self.detailed_json = compact_json(detailed_info)
+        # Changes whenever the underlying data does; caches key on it
+        self.data_version = data_version or hashlib.sha256((self.basic_json + self.detailed_json).encode("utf-8")).hexdigest()[:16]
+
+        # (topic, id) -> serialized item, topic -> serialized section for unknown ids
+        self.item_json: Dict[Tuple[str, Any], str] = {}
+        self.section_json: Dict[str, str] = {}
+        for topic, (section, key) in DETAILED_SECTIONS.items():
+            self.section_json[topic] = compact_json(detailed_info[section])
+            for item in detailed_info[section][key]:
+                self.item_json[(topic, item["id"])] = compact_json(item)
+
+        self.chat_preamble = "\n".join(CHAT_PROMPT_HEADER + ["**AVAILABLE DATA:**", self.basic_json, ""])
+        self.deep_dive_preamble = "\n".join(DEEP_DIVE_PROMPT_HEADER)
+
+        # With an index, only the top_k chunks relevant to the turn replace the full data dumps
+        self.basic_index = basic_index
+        self.detailed_index = detailed_index
+        self.top_k = top_k
+
+        self._chat_prompt = lru_cache(maxsize=PROMPT_CACHE_SIZE)(self._build_chat_prompt)
+        self._deep_dive_prompt = lru_cache(maxsize=PROMPT_CACHE_SIZE)(self._build_deep_dive_prompt)
+
+    @staticmethod
+    def _key(state: Dict[str, Any]) -> Tuple[Optional[str], Any, Optional[Tuple[str, ...]]]:
+        imp_points = state.get("imp_points")
+        return (
+            state.get("current_topic"),
+            state.get("selected_item_id"),
+            tuple(imp_points) if imp_points else None,
+        )
+
+    def chat_prompt(self, state: Dict[str, Any], query: str = "") -> str:
+        """Generate chat prompt with context from state variables"""
+        key = self._key(state)
+        if self.basic_index is None:
+            return self._chat_prompt(*key)
+        return self._build_chat_prompt(*key, data=self._retrieve(self.basic_index, key, query))
+
+    def deep_dive_prompt(self, state: Dict[str, Any], query: str = "") -> str:
+        """Generate deep dive prompt with specific item data if available"""
+        key = self._key(state)
+        current_topic, selected_id, _ = key
+        # A selected item is already a narrow slice of the data
+        if self.detailed_index is None or (selected_id and current_topic):
+            return self._deep_dive_prompt(*key)
+        return self._build_deep_dive_prompt(*key, data=self._retrieve(self.detailed_index, key, query))
+
+    def _retrieve(self, index, key: Tuple[Optional[str], Any, Optional[Tuple[str, ...]]], query: str) -> str:
+        """Chunks matching the latest message, topic and imp_points; overviews if nothing matches"""
+        current_topic, _, imp_points = key
+        query = " ".join([query, current_topic or ""] + list(imp_points or ()))
+        chunks = index.search(query, self.top_k)
+        if not chunks:
+            chunks = [c for c in index.chunks if c["kind"] == "overview"][:self.top_k]
+        return "\n".join(chunk["text"] for chunk in chunks)
+
+    def _build_chat_prompt(self, current_topic: Optional[str], selected_id: Any, imp_points: Optional[Tuple[str, ...]], data: Optional[str] = None) -> str:
+        if data is None:
+            context_parts = [self.chat_preamble]
+        else:
+            context_parts = CHAT_PROMPT_HEADER + ["**AVAILABLE DATA:**", data, ""]
+
+        # Add conversation context if available
+        if current_topic:
+            context_parts.append(f"**CURRENT TOPIC:** {current_topic}")
+
+        if selected_id:
+            context_parts.append(f"**SELECTED ITEM ID:** {selected_id}")
+
+        if imp_points:
+            context_parts.append(f"**IMPORTANT POINTS DISCUSSED:** {', '.join(imp_points)}")
+
+        return "\n".join(context_parts)
+
+    def _build_deep_dive_prompt(self, current_topic: Optional[str], selected_id: Any, imp_points: Optional[Tuple[str, ...]], data: Optional[str] = None) -> str:
+        context_parts = [self.deep_dive_preamble]
+
+        if selected_id and current_topic:
+            context_parts.append("**DETAILED DATA FOR THIS ITEM:**")
+            if current_topic in DETAILED_SECTIONS:
+                # Fallback to the whole section if the id is not found
+                context_parts.append(
+                    self.item_json.get((current_topic, selected_id), self.section_json[current_topic])
+                )
+        else:
+            # No specific item selected, provide all detailed info
+            context_parts.append("**AVAILABLE DETAILED DATA:**")
+            context_parts.append(self.detailed_json if data is None else data)
+
+        context_parts.append("")
+
+        # Add conversation context
+        if imp_points:
+            context_parts.append(f"**KEY POINTS TO ADDRESS:** {', '.join(imp_points)}")
+
+        return "\n".join(context_parts)
+
+    def static_prefixes(self) -> Dict[str, str]:
+        """Prompt prefixes that only change with the data, which prompts without retrieval start with"""
+        return {
+            "chat": self.chat_preamble,
+            "deep_dive": "\n".join([self.deep_dive_preamble, "**AVAILABLE DETAILED DATA:**", self.detailed_json]),
+        }
+
+    def stats(self) -> Dict[str, Any]:
+        chat, deep_dive = self._chat_prompt.cache_info(), self._deep_dive_prompt.cache_info()
+        return {
+            "chat": {"hits": chat.hits, "misses": chat.misses, "size": chat.currsize},
+            "deep_dive": {"hits": deep_dive.hits, "misses": deep_dive.misses, "size": deep_dive.currsize},
+        }
@@ -0,0 +1,152 @@
+import math
+import time
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+from typing import Dict, Any
+
+from .telemetry import RATE_LIMITED, LLM_QUEUE_DEPTH, LLM_IN_FLIGHT, OVERLOAD_REJECTIONS
+
+
+class OverloadedError(Exception):
+    """No LLM capacity within the wait budget; the client should retry after retry_after seconds"""
+
+    def __init__(self, reason: str, retry_after: float):
+        super().__init__(f"Server overloaded ({reason}), retry in {retry_after:.0f}s")
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    __slots__ = ("tokens", "updated")
+
+    def __init__(self, burst: float, now: float):
+        self.tokens = burst
+        self.updated = now
+
+
+class RateLimiter:
+    """
+    Token bucket per key (client IP, session id): `rate` requests per second
+    on average, bursts up to `burst`. Buckets of the least recently seen keys
+    are dropped beyond max_keys; a dropped key starts again with a full bucket.
+    """
+
+    def __init__(self, scope: str, rate: float, burst: float, max_keys: int = 100000):
+        self.scope = scope
+        self.rate = rate
+        self.burst = burst
+        self.max_keys = max_keys
+        self.buckets: "OrderedDict[str, TokenBucket]" = OrderedDict()
+        self.allowed = 0
+        self.rejected = 0
+
+    def check(self, key: str) -> float:
+        """Take one token for key; 0 if allowed, else seconds until a token is available"""
+        wait = self._take(key)
+        if wait:
+            self.rejected += 1
+            RATE_LIMITED.labels(self.scope).inc()
+        else:
+            self.allowed += 1
+        return wait
+
+    async def wait(self, key: str) -> None:
+        """Take one token for key, sleeping until there is one (for work that queues instead of failing)"""
+        while True:
+            seconds = self._take(key)
+            if not seconds:
+                self.allowed += 1
+                return
+            await asyncio.sleep(seconds)
+
+    def _take(self, key: str) -> float:
+        now = time.monotonic()
+        bucket = self.buckets.get(key)
+        if bucket is None:
+            bucket = self.buckets[key] = TokenBucket(self.burst, now)
+            if len(self.buckets) > self.max_keys:
+                self.buckets.popitem(last=False)
+        else:
+            self.buckets.move_to_end(key)
+            bucket.tokens = min(self.burst, bucket.tokens + (now - bucket.updated) * self.rate)
+            bucket.updated = now
+
+        if bucket.tokens >= 1:
+            bucket.tokens -= 1
+            return 0.0
+        return (1 - bucket.tokens) / self.rate
+
+    def stats(self) -> Dict[str, Any]:
+        return {"keys": len(self.buckets), "allowed": self.allowed, "rejected": self.rejected}
+
+
+class ConcurrencyGate:
+    """
+    At most max_concurrent LLM calls in flight; up to max_queue more wait, each for
+    at most queue_timeout seconds. Anything beyond that raises OverloadedError
+    immediately instead of piling up behind the others.
+    """
+
+    def __init__(self, max_concurrent: int, max_queue: int, queue_timeout: float):
+        self.max_concurrent = max_concurrent
+        self.max_queue = max_queue
+        self.queue_timeout = queue_timeout
+        self.semaphore = asyncio.Semaphore(max_concurrent)
+        self.in_flight = 0
+        self.waiting = 0
+        self.rejected = 0
+        # Moving average of how long a call holds its slot, for Retry-After
+        self.average_hold = 1.0
+
+    def retry_after(self) -> float:
+        """Roughly how long until the current queue has drained"""
+        return max(1.0, math.ceil((self.waiting + 1) / self.max_concurrent * self.average_hold))
+
+    def _reject(self, reason: str) -> OverloadedError:
+        self.rejected += 1
+        OVERLOAD_REJECTIONS.labels(reason).inc()
+        return OverloadedError(reason, self.retry_after())
+
+    def check(self) -> None:
+        """Admission check before starting work that needs the LLM"""
+        if self.in_flight >= self.max_concurrent and self.waiting >= self.max_queue:
+            raise self._reject("queue_full")
+
+    @asynccontextmanager
+    async def slot(self):
+        """Hold one LLM slot for the duration of the block"""
+        if self.semaphore.locked():
+            if self.waiting >= self.max_queue:
+                raise self._reject("queue_full")
+            self.waiting += 1
+            LLM_QUEUE_DEPTH.inc()
+            try:
+                await asyncio.wait_for(self.semaphore.acquire(), timeout=self.queue_timeout)
+            except asyncio.TimeoutError:
+                raise self._reject("queue_timeout") from None
+            finally:
+                self.waiting -= 1
+                LLM_QUEUE_DEPTH.dec()
+        else:
+            await self.semaphore.acquire()
+
+        self.in_flight += 1
+        LLM_IN_FLIGHT.inc()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.average_hold += 0.1 * (time.perf_counter() - start - self.average_hold)
+            self.in_flight -= 1
+            LLM_IN_FLIGHT.dec()
+            self.semaphore.release()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "max_concurrent": self.max_concurrent,
+            "in_flight": self.in_flight,
+            "waiting": self.waiting,
+            "max_queue": self.max_queue,
+            "rejected": self.rejected,
+        }
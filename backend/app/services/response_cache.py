@@ -0,0 +1,135 @@
+import re
+import json
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Tuple
+
+from .sqlite_store import connect_shared
+
+
+def normalize_message(text: str) -> str:
+    """Case, whitespace and trailing punctuation don't change the question"""
+    return re.sub(r"\s+", " ", text.strip().lower()).rstrip("?!. ")
+
+
+def cache_key(messages: List[Dict[str, Any]], state_vars: Optional[Dict[str, Any]], data_version: str) -> str:
+    """
+    Key on the normalized last user message plus the routing state it arrives with.
+    data_version ties entries to the portfolio data they were generated from.
+    """
+    state_vars = state_vars or {}
+    payload = [
+        data_version,
+        normalize_message(messages[-1]["content"]) if messages else "",
+        state_vars.get("current_topic"),
+        state_vars.get("selected_item_id"),
+        state_vars.get("mode", "chat"),
+    ]
+    return hashlib.sha256(json.dumps(payload).encode("utf-8")).hexdigest()
+
+
+class ResponseCache:
+    """In-process LRU cache with a TTL per entry"""
+
+    def __init__(self, max_entries: int = 1024, ttl_seconds: float = 3600):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.entries: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None or time.monotonic() - entry[0] > self.ttl_seconds:
+                if entry is not None:
+                    del self.entries[key]
+                self.misses += 1
+                return None
+            self.entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        with self.lock:
+            self.entries[key] = (time.monotonic(), value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "backend": "memory",
+            "size": len(self),
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+class SQLiteResponseCache(ResponseCache):
+    """Same LRU/TTL behaviour persisted to SQLite, so it survives restarts"""
+
+    def __init__(self, path: str, max_entries: int = 1024, ttl_seconds: float = 3600):
+        super().__init__(max_entries, ttl_seconds)
+        self.conn = connect_shared(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            " key TEXT PRIMARY KEY, value TEXT NOT NULL,"
+            " created_at REAL NOT NULL, accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS responses_accessed_at ON responses (accessed_at)")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT value, created_at FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[1] > self.ttl_seconds:
+                if row is not None:
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self.misses += 1
+                return None
+            self.conn.execute("UPDATE responses SET accessed_at = ? WHERE key = ?", (now, key))
+            self.hits += 1
+            return json.loads(row[0])
+
+    def set(self, key: str, value: Dict[str, Any]) -> None:
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, value, created_at, accessed_at) VALUES (?, ?, ?, ?)",
+                (key, json.dumps(value), now, now)
+            )
+            overflow = len(self) - self.max_entries
+            if overflow > 0:
+                self.conn.execute(
+                    "DELETE FROM responses WHERE key IN"
+                    " (SELECT key FROM responses ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+                self.evictions += overflow
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "backend": "sqlite"}
+
+
+def create_response_cache(backend: str, path: str, max_entries: int, ttl_seconds: float) -> ResponseCache:
+    if backend == "sqlite":
+        return SQLiteResponseCache(path, max_entries, ttl_seconds)
+    if backend == "memory":
+        return ResponseCache(max_entries, ttl_seconds)
+    raise ValueError(f"Unknown response cache backend: {backend}")
@@ -0,0 +1,99 @@
+import re
+from typing import Dict, Any, List, Optional
+
+import numpy as np
+
+from .prompt_cache import compact_json
+from .history import estimate_tokens
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "by", "can", "did", "do", "for", "from", "how",
+    "i", "in", "is", "it", "me", "more", "of", "on", "or", "tell", "that", "the", "this", "to",
+    "used", "was", "what", "which", "with", "you", "your",
+}
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in re.findall(r"[a-z0-9]+", text.lower()) if len(t) > 1 and t not in STOPWORDS]
+
+
+def chunk_records(topic: str, records: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Split each record into an overview chunk (its scalar fields) plus one chunk per
+    nested list/dict field, every chunk tagged with the record's topic and id
+    """
+    chunks = []
+    for record in records:
+        header = {"topic": topic, "id": record.get("id")}
+        overview = {k: v for k, v in record.items() if not isinstance(v, (dict, list))}
+        chunks.append({**header, "kind": "overview", "text": compact_json({**header, **overview})})
+        for field, value in record.items():
+            if isinstance(value, (dict, list)) and value:
+                name = record.get("name") or record.get("company")
+                chunks.append({**header, "kind": field, "text": compact_json({**header, "name": name, field: value})})
+    return chunks
+
+
+def chunk_basic_info(basic_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    chunks = [
+        {"topic": "personal", "id": None, "kind": "overview", "text": compact_json({"personal_info": basic_info["personal_info"]})},
+        {"topic": "skills", "id": None, "kind": "overview", "text": compact_json(basic_info["skills"])},
+    ]
+    chunks += chunk_records("projects", basic_info["projects"]["projects"])
+    chunks += chunk_records("experience", basic_info["experience"]["experience"])
+    return chunks
+
+
+def chunk_detailed_info(detailed_info: Dict[str, Any]) -> List[Dict[str, Any]]:
+    return (
+        chunk_records("projects", detailed_info["det_projects"]["projects"])
+        + chunk_records("experience", detailed_info["det_experience"]["experience"])
+    )
+
+
+class BM25Index:
+    """
+    Okapi BM25 over a fixed set of chunks. Document-side weights are precomputed
+    into a dense (chunks x vocabulary) matrix so a query is one matrix-vector product.
+    """
+
+    def __init__(self, chunks: List[Dict[str, Any]], k1: float = 1.5, b: float = 0.75):
+        self.chunks = chunks
+        docs = [tokenize(chunk["text"]) for chunk in chunks]
+        self.vocab: Dict[str, int] = {}
+        for doc in docs:
+            for token in doc:
+                self.vocab.setdefault(token, len(self.vocab))
+
+        tf = np.zeros((len(docs), len(self.vocab)), dtype=np.float32)
+        for row, doc in enumerate(docs):
+            for token in doc:
+                tf[row, self.vocab[token]] += 1
+
+        doc_len = tf.sum(axis=1, keepdims=True)
+        avg_len = doc_len.mean() if len(docs) else 1.0
+        df = (tf > 0).sum(axis=0)
+        idf = np.log(1 + (len(docs) - df + 0.5) / (df + 0.5))
+        self.weights = idf * tf * (k1 + 1) / (tf + k1 * (1 - b + b * doc_len / avg_len))
+
+    def search(self, query: str, top_k: int) -> List[Dict[str, Any]]:
+        """Best matching chunks, in their original data order"""
+        q = np.zeros(len(self.vocab), dtype=np.float32)
+        for token in tokenize(query):
+            index = self.vocab.get(token)
+            if index is not None:
+                q[index] += 1
+        if not q.any():
+            return []
+        scores = self.weights @ q
+        top = np.argsort(-scores, kind="stable")[:top_k]
+        return [self.chunks[i] for i in sorted(top) if scores[i] > 0]
+
+
+def build_index(chunks: List[Dict[str, Any]], min_tokens: int) -> Optional[BM25Index]:
+    """
+    Index the chunks only once the data outgrows min_tokens;
+    below that embedding everything is cheap enough and loses nothing
+    """
+    size = sum(estimate_tokens(chunk["text"]) for chunk in chunks)
+    return BM25Index(chunks) if size > min_tokens else None
@@ -0,0 +1,116 @@
+import json
+import time
+import threading
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional
+
+from .sqlite_store import connect_shared
+
+
+class SessionStore:
+    """
+    Conversation history and routing state per session, kept server-side so
+    clients only send the new message. Bounded by session count (LRU) and idle time.
+    """
+
+    def __init__(self, max_sessions: int = 10000, idle_ttl_seconds: float = 1800, max_messages: int = 20):
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.max_messages = max_messages
+        self.sessions: "OrderedDict[str, Dict[str, Any]]" = OrderedDict()
+        self.lock = threading.RLock()
+        self.evictions = 0
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        """{"messages": [...], "state": {...}} or None for new/expired sessions"""
+        with self.lock:
+            self._evict_idle()
+            session = self.sessions.get(session_id)
+            if session is None:
+                return None
+            session["accessed_at"] = time.monotonic()
+            self.sessions.move_to_end(session_id)
+            return {"messages": list(session["messages"]), "state": session["state"]}
+
+    def save(self, session_id: str, messages: List[Dict[str, Any]], state: Dict[str, Any]) -> None:
+        with self.lock:
+            self.sessions[session_id] = {
+                "messages": messages[-self.max_messages:],
+                "state": state,
+                "accessed_at": time.monotonic(),
+            }
+            self.sessions.move_to_end(session_id)
+            while len(self.sessions) > self.max_sessions:
+                self.sessions.popitem(last=False)
+                self.evictions += 1
+
+    def _evict_idle(self) -> None:
+        # Ordered by last access, so expired sessions are at the front
+        cutoff = time.monotonic() - self.idle_ttl_seconds
+        while self.sessions:
+            session_id, session = next(iter(self.sessions.items()))
+            if session["accessed_at"] >= cutoff:
+                break
+            del self.sessions[session_id]
+            self.evictions += 1
+
+    def __len__(self) -> int:
+        return len(self.sessions)
+
+    def stats(self) -> Dict[str, Any]:
+        return {"backend": "memory", "sessions": len(self), "evictions": self.evictions}
+
+
+class SQLiteSessionStore(SessionStore):
+    """Same bounds persisted to SQLite, so sessions survive restarts"""
+
+    def __init__(self, path: str, max_sessions: int = 10000, idle_ttl_seconds: float = 1800, max_messages: int = 20):
+        super().__init__(max_sessions, idle_ttl_seconds, max_messages)
+        self.conn = connect_shared(path)
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS sessions ("
+            " id TEXT PRIMARY KEY, messages TEXT NOT NULL, state TEXT NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS sessions_accessed_at ON sessions (accessed_at)")
+
+    def get(self, session_id: str) -> Optional[Dict[str, Any]]:
+        now = time.time()
+        with self.lock:
+            row = self.conn.execute("SELECT messages, state, accessed_at FROM sessions WHERE id = ?", (session_id,)).fetchone()
+            if row is None or now - row[2] > self.idle_ttl_seconds:
+                return None
+            self.conn.execute("UPDATE sessions SET accessed_at = ? WHERE id = ?", (now, session_id))
+            return {"messages": json.loads(row[0]), "state": json.loads(row[1])}
+
+    def save(self, session_id: str, messages: List[Dict[str, Any]], state: Dict[str, Any]) -> None:
+        now = time.time()
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO sessions (id, messages, state, accessed_at) VALUES (?, ?, ?, ?)",
+                (session_id, json.dumps(messages[-self.max_messages:]), json.dumps(state), now)
+            )
+            expired = self.conn.execute("DELETE FROM sessions WHERE accessed_at < ?", (now - self.idle_ttl_seconds,)).rowcount
+            overflow = len(self) - self.max_sessions
+            if overflow > 0:
+                self.conn.execute(
+                    "DELETE FROM sessions WHERE id IN"
+                    " (SELECT id FROM sessions ORDER BY accessed_at LIMIT ?)",
+                    (overflow,)
+                )
+            self.evictions += expired + max(overflow, 0)
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM sessions").fetchone()[0]
+
+    def stats(self) -> Dict[str, Any]:
+        return {**super().stats(), "backend": "sqlite"}
+
+
+def create_session_store(backend: str, path: str, max_sessions: int, idle_ttl_seconds: float, max_messages: int) -> SessionStore:
+    if backend == "sqlite":
+        return SQLiteSessionStore(path, max_sessions, idle_ttl_seconds, max_messages)
+    if backend == "memory":
+        return SessionStore(max_sessions, idle_ttl_seconds, max_messages)
+    raise ValueError(f"Unknown session store backend: {backend}")
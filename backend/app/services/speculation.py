@@ -0,0 +1,77 @@
+import time
+import asyncio
+from typing import Dict, Any, List, Optional, Awaitable
+
+from langchain_core.messages import BaseMessage
+
+from .telemetry import SPECULATIONS, SPECULATION_SAVED_SECONDS
+
+
+class Speculation:
+    """An answer node's LLM call, started with the previous turn's routing before the router decided"""
+
+    def __init__(self, node: str, llm_input: List[BaseMessage], call: Awaitable[Any]):
+        self.node = node
+        self.llm_input = llm_input
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.task = asyncio.create_task(self._run(call))
+
+    async def _run(self, call: Awaitable[Any]) -> Any:
+        try:
+            return await call
+        finally:
+            self.finished = time.perf_counter()
+
+    def cancel(self) -> None:
+        self.task.cancel()
+        if self.task.done() and not self.task.cancelled():
+            # Mark a failed speculative call as seen; nobody will await it
+            self.task.exception()
+
+
+class Speculator:
+    """
+    Starts speculative answer calls and decides whether to keep them.
+    A speculation is only used when the answer node would have sent the LLM exactly
+    the same input, so a hit returns the answer the normal path would have produced.
+    """
+
+    def __init__(self):
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def start(self, node: str, llm_input: List[BaseMessage], call: Awaitable[Any]) -> Speculation:
+        return Speculation(node, llm_input, call)
+
+    async def adopt(self, speculation: Speculation, node: str, llm_input: List[BaseMessage]) -> Optional[Any]:
+        """The speculative response if it matches what node is about to send, else None (and cancelled)"""
+        if speculation.node != node or speculation.llm_input != llm_input:
+            self.discard(speculation)
+            return None
+
+        needed_from = time.perf_counter()
+        response = await speculation.task
+        # Without speculation the call would have started now and taken as long as it did
+        duration = speculation.finished - speculation.started
+        saved = needed_from + duration - max(needed_from, speculation.finished)
+        self.hits += 1
+        self.saved_seconds += saved
+        SPECULATIONS.labels("hit").inc()
+        SPECULATION_SAVED_SECONDS.observe(saved)
+        return response
+
+    def discard(self, speculation: Speculation) -> None:
+        speculation.cancel()
+        self.misses += 1
+        SPECULATIONS.labels("miss").inc()
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "saved_seconds": self.saved_seconds,
+        }
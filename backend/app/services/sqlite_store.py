@@ -0,0 +1,13 @@
+import sqlite3
+
+
+def connect_shared(path: str) -> sqlite3.Connection:
+    """
+    Connection to a SQLite file shared by all worker processes: WAL lets readers run
+    alongside a writer, and other workers' write locks are waited out (sqlite3's 5s timeout).
+    Autocommit; each statement is its own transaction unless one is begun explicitly.
+    """
+    conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
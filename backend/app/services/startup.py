@@ -0,0 +1,66 @@
+import json
+import time
+import asyncio
+import logging
+from typing import Any, Callable, Optional
+
+logger = logging.getLogger("portfolio.startup")
+
+
+class ServiceLoader:
+    """
+    Builds a service on first use instead of at import, so the app can answer
+    liveness checks before the heavy imports and client construction are done.
+    The factory runs in a worker thread; concurrent callers wait for the same build.
+    on_ready then runs on the event loop, e.g. to start the service's background tasks.
+    """
+
+    def __init__(self, factory: Callable[[], Any], on_ready: Optional[Callable[[Any], None]] = None):
+        self.factory = factory
+        self.on_ready = on_ready
+        self.instance: Optional[Any] = None
+        self.error: Optional[BaseException] = None
+        self.startup_seconds: Optional[float] = None
+        self._lock = asyncio.Lock()
+        self._warmup: Optional[asyncio.Task] = None
+
+    @property
+    def ready(self) -> bool:
+        return self.instance is not None
+
+    async def get(self) -> Any:
+        if self.instance is None:
+            async with self._lock:
+                if self.instance is None:
+                    start = time.perf_counter()
+                    try:
+                        instance = await asyncio.to_thread(self.factory)
+                    except Exception as e:
+                        # Kept for the readiness check; the next caller retries
+                        self.error = e
+                        raise
+                    self.startup_seconds = time.perf_counter() - start
+                    self.error = None
+                    if self.on_ready:
+                        self.on_ready(instance)
+                    self.instance = instance
+                    logger.info(json.dumps({"event": "service_ready", "startup_seconds": round(self.startup_seconds, 3)}))
+        return self.instance
+
+    def warm_up(self) -> None:
+        """Start building in the background; requests arriving meanwhile wait for it"""
+        if self._warmup is None:
+            self._warmup = asyncio.create_task(self._warm())
+
+    async def _warm(self) -> None:
+        try:
+            await self.get()
+        except Exception as e:
+            logger.error(json.dumps({"event": "service_warmup_failed", "error": repr(e)}))
+
+    def status(self) -> dict:
+        return {
+            "ready": self.ready,
+            "startup_seconds": self.startup_seconds,
+            "error": repr(self.error) if self.error else None,
+        }
@@ -0,0 +1,151 @@
+from collections import OrderedDict
+from typing import Dict, Any, List, Optional, Literal, Tuple, Callable, Awaitable
+
+from pydantic import BaseModel, ValidationError
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage
+
+from .llm_providers import messages_hash
+from .telemetry import router_parse_failure, ROUTER_REPAIRS
+
+REPAIR_PROMPT = (
+    "Your previous reply was not a valid routing decision: {error}\n"
+    "Reply again with ONLY the JSON object, no other text."
+)
+
+
+class RoutingDecision(BaseModel):
+    """What initial_router decides; the LLM's answer must validate against this"""
+    current_topic: Optional[Literal["projects", "experience", "skills", "personal"]] = None
+    selected_item_id: Optional[int] = None
+    imp_points: Optional[List[str]] = None
+    mode: Literal["chat", "deep_dive"] = "chat"
+    needs_interrupt: bool = False
+
+
+def gemini_schema(schema: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Convert a Pydantic JSON schema to the OpenAPI subset Gemini's response_schema accepts:
+    Optional[X] (anyOf with null) becomes nullable X; titles and defaults are dropped
+    """
+    nullable = False
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+        nullable = len(options) < len(schema["anyOf"])
+        schema = options[0]
+
+    converted: Dict[str, Any] = {"type_": schema["type"].upper()}
+    if nullable:
+        converted["nullable"] = True
+    if "enum" in schema:
+        converted["enum"] = schema["enum"]
+    if "items" in schema:
+        converted["items"] = gemini_schema(schema["items"])
+    if "properties" in schema:
+        converted["properties"] = {name: gemini_schema(prop) for name, prop in schema["properties"].items()}
+        converted["required"] = list(schema["properties"])
+    return converted
+
+
+def router_generation_config(max_tokens: int, temperature: float = 0.0) -> Dict[str, Any]:
+    """Gemini JSON mode constrained to RoutingDecision; other providers ignore it"""
+    return {
+        "temperature": temperature,
+        "max_output_tokens": max_tokens,
+        "response_mime_type": "application/json",
+        "response_schema": gemini_schema(RoutingDecision.model_json_schema()),
+    }
+
+
+def describe_error(error: ValueError) -> str:
+    """Short, LLM-readable reason a decision was rejected"""
+    if isinstance(error, ValidationError):
+        return "; ".join(
+            f"{'.'.join(str(part) for part in e['loc']) or 'reply'}: {e['msg']}" for e in error.errors()
+        )[:300]
+    return str(error)[:300]
+
+
+def parse_decision(text: str) -> RoutingDecision:
+    """Validate an LLM answer; markdown fences are tolerated for providers without JSON mode"""
+    text = text.strip()
+    if text.startswith("```"):
+        text = text.split("```")[1].removeprefix("json").strip()
+    return RoutingDecision.model_validate_json(text)
+
+
+class StructuredRouter:
+    """
+    Asks the LLM for a RoutingDecision in structured-output mode with a small token cap.
+    Invalid answers get up to repair_attempts follow-ups quoting the validation error.
+    Validated decisions are cached on the exact router input.
+    """
+
+    def __init__(self, llm: BaseChatModel, max_tokens: int = 128, repair_attempts: int = 1, cache_size: int = 1024, temperature: float = 0.0):
+        self.llm = llm.bind(generation_config=router_generation_config(max_tokens, temperature))
+        self.repair_attempts = repair_attempts
+        self.cache_size = cache_size
+        self.cache: "OrderedDict[str, RoutingDecision]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.repairs = 0
+        self.failures = 0
+
+    async def decide(
+        self,
+        llm_input: List[BaseMessage],
+        call: Callable[[Any, List[BaseMessage]], Awaitable[BaseMessage]],
+        validate: Optional[Callable[[RoutingDecision], None]] = None
+    ) -> Tuple[Optional[RoutingDecision], str]:
+        """
+        Returns (decision, source) where source is "cache" or "llm",
+        or (None, "fallback") once every attempt failed.
+        call(llm, messages) performs the LLM call; validate may raise ValueError
+        for decisions that parse but don't fit the data.
+        """
+        key = messages_hash(llm_input)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self.cache.move_to_end(key)
+            self.hits += 1
+            return cached.model_copy(), "cache"
+        self.misses += 1
+
+        messages = list(llm_input)
+        for attempt in range(1 + self.repair_attempts):
+            response = await call(self.llm, messages)
+            content = str(response.content)
+            try:
+                decision = parse_decision(content)
+                if validate:
+                    validate(decision)
+            except ValueError as e:
+                # ValidationError is a ValueError too
+                error = describe_error(e)
+                router_parse_failure(error, content)
+                messages = messages + [AIMessage(content=content), HumanMessage(content=REPAIR_PROMPT.format(error=error))]
+                continue
+
+            if attempt:
+                self.repairs += 1
+                ROUTER_REPAIRS.labels("ok").inc()
+            self.cache[key] = decision
+            if len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+            return decision.model_copy(), "llm"
+
+        self.failures += 1
+        if self.repair_attempts:
+            ROUTER_REPAIRS.labels("failed").inc()
+        return None, "fallback"
+
+    def stats(self) -> Dict[str, Any]:
+        total = self.hits + self.misses
+        return {
+            "size": len(self.cache),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "repairs": self.repairs,
+            "failures": self.failures,
+        }
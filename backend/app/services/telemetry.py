@@ -0,0 +1,199 @@
+import os
+import re
+import json
+import time
+import uuid
+import logging
+from contextvars import ContextVar
+from typing import Dict, Any, Optional, Callable
+
+from prometheus_client import Counter, Gauge, Histogram, CollectorRegistry, REGISTRY, multiprocess
+from prometheus_client.core import GaugeMetricFamily
+
+logger = logging.getLogger("portfolio.trace")
+
+# Buckets sized for LLM-bound work: tens of milliseconds up to the node timeout
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+TOPICS = ("projects", "experience", "skills", "personal")
+
+HTTP_REQUESTS = Counter("portfolio_http_requests_total", "HTTP requests", ["path", "method", "status"])
+HTTP_SECONDS = Histogram("portfolio_http_request_seconds", "HTTP request time until the last body byte", ["path"], buckets=LATENCY_BUCKETS)
+HTTP_IN_PROGRESS = Gauge("portfolio_http_requests_in_progress", "HTTP requests being served", multiprocess_mode="livesum")
+NODE_SECONDS = Histogram("portfolio_graph_node_seconds", "Wall time per graph node run", ["node"], buckets=LATENCY_BUCKETS)
+LLM_SECONDS = Histogram("portfolio_llm_call_seconds", "LLM call latency, including waiting for a concurrency slot", ["node", "outcome"], buckets=LATENCY_BUCKETS)
+LLM_INPUT_TOKENS = Counter("portfolio_llm_input_tokens_total", "Estimated prompt tokens sent to the LLM", ["node"])
+LLM_OUTPUT_TOKENS = Counter("portfolio_llm_output_tokens_total", "Estimated tokens generated by the LLM", ["node"])
+LLM_CACHED_TOKENS = Counter("portfolio_llm_cached_input_tokens_total", "Estimated prompt tokens referenced from the provider's context cache instead of sent", ["node"])
+ROUTER_DECISIONS = Counter("portfolio_router_decisions_total", "Routing decisions by how they were made: selection, fast_router, cache, llm or fallback", ["source"])
+ROUTER_PARSE_FAILURES = Counter("portfolio_router_parse_failures_total", "LLM router answers that did not validate as a routing decision")
+ROUTER_REPAIRS = Counter("portfolio_router_repairs_total", "Routing decisions that needed repair follow-ups, by whether one succeeded", ["outcome"])
+ROUTES = Counter("portfolio_routes_total", "Routed turns by mode and topic", ["mode", "topic"])
+RATE_LIMITED = Counter("portfolio_rate_limited_total", "Requests rejected with 429 by rate limit scope", ["scope"])
+LLM_QUEUE_DEPTH = Gauge("portfolio_llm_queue_depth", "LLM calls waiting for a concurrency slot", multiprocess_mode="livesum")
+LLM_IN_FLIGHT = Gauge("portfolio_llm_in_flight", "LLM calls holding a concurrency slot", multiprocess_mode="livesum")
+OVERLOAD_REJECTIONS = Counter("portfolio_overload_rejections_total", "Requests rejected with 503 because the LLM queue was full or too slow", ["reason"])
+SPECULATIONS = Counter("portfolio_speculations_total", "Speculative answer calls by whether the router agreed", ["outcome"])
+SPECULATION_SAVED_SECONDS = Histogram("portfolio_speculation_saved_seconds", "Answer latency saved by speculative hits", buckets=LATENCY_BUCKETS)
+UPSTREAM_CONNECTS = Counter("portfolio_upstream_connections_total", "Connections established by the pooled LLM provider channels, reconnects included")
+HEDGES = Counter("portfolio_llm_hedges_total", "Hedged LLM calls by which call finished first (primary, hedge) or streaming when the primary began streaming", ["node", "outcome"])
+PREFETCHES = Counter("portfolio_prefetches_total", "Prefetched deep-dive answers by outcome: generated, hit, miss, wasted, dropped or error", ["outcome"])
+PREFETCH_TOKENS = Counter("portfolio_prefetch_tokens_total", "Estimated tokens of prefetched answers, by whether they were used or wasted", ["outcome"])
+
+
+class Trace:
+    """Per-request record: where the time went, filled in as the request runs"""
+    __slots__ = ("trace_id", "nodes", "llm_calls", "route")
+
+    def __init__(self, trace_id: str):
+        self.trace_id = trace_id
+        self.nodes: Dict[str, float] = {}
+        self.llm_calls = 0
+        self.route: Optional[Dict[str, Any]] = None
+
+
+current_trace: ContextVar[Optional[Trace]] = ContextVar("current_trace", default=None)
+
+
+def trace_id() -> Optional[str]:
+    trace = current_trace.get()
+    return trace.trace_id if trace else None
+
+
+def observe_node(node: str, seconds: float) -> None:
+    NODE_SECONDS.labels(node).observe(seconds)
+    trace = current_trace.get()
+    if trace:
+        trace.nodes[node] = trace.nodes.get(node, 0.0) + seconds
+
+
+def observe_llm_call(node: str, seconds: float, outcome: str, input_tokens: int = 0, output_tokens: int = 0, cached_tokens: int = 0) -> None:
+    LLM_SECONDS.labels(node, outcome).observe(seconds)
+    if input_tokens:
+        LLM_INPUT_TOKENS.labels(node).inc(input_tokens)
+    if cached_tokens:
+        LLM_CACHED_TOKENS.labels(node).inc(cached_tokens)
+    if output_tokens:
+        LLM_OUTPUT_TOKENS.labels(node).inc(output_tokens)
+    trace = current_trace.get()
+    if trace:
+        trace.llm_calls += 1
+
+
+def observe_route(source: str, mode: Optional[str], topic: Optional[str]) -> None:
+    """Count a routing decision; unknown topics are bucketed so label cardinality stays fixed"""
+    ROUTER_DECISIONS.labels(source).inc()
+    topic = topic if topic in TOPICS else ("none" if topic is None else "other")
+    mode = mode if mode in ("chat", "deep_dive") else "other"
+    ROUTES.labels(mode, topic).inc()
+    trace = current_trace.get()
+    if trace:
+        trace.route = {"source": source, "mode": mode, "topic": topic}
+
+
+def router_parse_failure(error: str, response_text: str) -> None:
+    ROUTER_PARSE_FAILURES.inc()
+    logger.warning(json.dumps({
+        "event": "router_parse_failure",
+        "trace_id": trace_id(),
+        "error": error,
+        "response": response_text[:500],
+    }))
+
+
+class StatsCollector:
+    """
+    Exposes the services' own stats() dicts as gauges, read at scrape time
+    so the request path pays nothing for them
+    """
+
+    def __init__(self):
+        self.sources: Dict[str, Callable[[], Dict[str, Any]]] = {}
+
+    def collect(self):
+        for name, stats in list(self.sources.items()):
+            for key, value in stats().items():
+                metric = re.sub(r"[^a-zA-Z0-9_]", "_", f"portfolio_{name}_{key}")
+                if isinstance(value, dict):
+                    family = GaugeMetricFamily(metric, f"{name} {key}", labels=["key"])
+                    for sub_key, sub_value in value.items():
+                        if isinstance(sub_value, (int, float)):
+                            family.add_metric([str(sub_key)], sub_value)
+                    yield family
+                elif isinstance(value, (int, float)) and not isinstance(value, bool):
+                    yield GaugeMetricFamily(metric, f"{name} {key}", value=value)
+
+
+stats_collector = StatsCollector()
+REGISTRY.register(stats_collector)
+
+
+def register_stats_source(name: str, stats: Callable[[], Dict[str, Any]]) -> None:
+    stats_collector.sources[name] = stats
+
+
+def metrics_registry() -> CollectorRegistry:
+    """
+    What /metrics renders. With several workers (PROMETHEUS_MULTIPROC_DIR set before they start)
+    counters and histograms are summed over all of them; component stats are this worker's.
+    """
+    if "PROMETHEUS_MULTIPROC_DIR" not in os.environ:
+        return REGISTRY
+    registry = CollectorRegistry()
+    multiprocess.MultiProcessCollector(registry)
+    registry.register(stats_collector)
+    return registry
+
+
+class TraceMiddleware:
+    """
+    ASGI middleware giving every request a trace id (the caller's X-Trace-Id if sent),
+    returned in the X-Trace-Id header. Records request metrics once the last body
+    byte is sent, so streamed responses are timed in full, and optionally logs
+    one JSON line per request with its node timings and route.
+    """
+
+    def __init__(self, app, log_requests: bool = True):
+        self.app = app
+        self.log_requests = log_requests
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        incoming = dict(scope["headers"]).get(b"x-trace-id", b"").decode("latin-1")
+        trace = Trace(incoming if re.fullmatch(r"[A-Za-z0-9._-]{1,64}", incoming) else uuid.uuid4().hex)
+        token = current_trace.set(trace)
+        status = 500
+        start = time.perf_counter()
+
+        async def send_with_trace(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+                message["headers"] = list(message.get("headers", [])) + [(b"x-trace-id", trace.trace_id.encode("latin-1"))]
+            await send(message)
+
+        HTTP_IN_PROGRESS.inc()
+        try:
+            await self.app(scope, receive, send_with_trace)
+        finally:
+            elapsed = time.perf_counter() - start
+            HTTP_IN_PROGRESS.dec()
+            current_trace.reset(token)
+            # Only matched routes get their own label; scanners hitting random paths share one
+            path = scope["path"] if "endpoint" in scope else "unmatched"
+            HTTP_REQUESTS.labels(path, scope["method"], str(status)).inc()
+            HTTP_SECONDS.labels(path).observe(elapsed)
+            if self.log_requests and path != "/metrics":
+                logger.info(json.dumps({
+                    "event": "request",
+                    "trace_id": trace.trace_id,
+                    "method": scope["method"],
+                    "path": scope["path"],
+                    "status": status,
+                    "duration_ms": round(elapsed * 1000, 2),
+                    "nodes_ms": {node: round(seconds * 1000, 2) for node, seconds in trace.nodes.items()},
+                    "llm_calls": trace.llm_calls,
+                    "route": trace.route,
+                }))
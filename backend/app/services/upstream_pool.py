@@ -0,0 +1,229 @@
+import json
+import time
+import asyncio
+import logging
+from urllib.parse import urlparse
+from typing import Dict, Any, List, Optional, AsyncIterator
+
+from ..config import settings
+from .llm_providers import import_gemini
+from .telemetry import UPSTREAM_CONNECTS
+
+logger = logging.getLogger("portfolio.upstream")
+
+
+class PooledChannel:
+    __slots__ = ("channel", "client", "in_flight", "calls", "connects", "state", "watcher")
+
+    def __init__(self, channel, client):
+        self.channel = channel
+        self.client = client
+        self.in_flight = 0
+        self.calls = 0
+        self.connects = 0
+        self.state = "IDLE"
+        self.watcher: Optional[asyncio.Task] = None
+
+
+class PooledGenerativeClient:
+    """
+    Stands in for ChatGoogleGenerativeAI's async client: every call goes to the pool's
+    least busy channel. Streams hold their channel until they are exhausted or closed.
+    """
+
+    def __init__(self, pool: "UpstreamPool"):
+        self.pool = pool
+
+    async def generate_content(self, *args, **kwargs):
+        pooled = self.pool.acquire()
+        try:
+            return await pooled.client.generate_content(*args, **kwargs)
+        finally:
+            self.pool.release(pooled)
+
+    async def stream_generate_content(self, *args, **kwargs):
+        pooled = self.pool.acquire()
+        try:
+            stream = await pooled.client.stream_generate_content(*args, **kwargs)
+        except BaseException:
+            self.pool.release(pooled)
+            raise
+        return self._release_after(stream, pooled)
+
+    async def _release_after(self, stream, pooled: PooledChannel) -> AsyncIterator[Any]:
+        try:
+            async for chunk in stream:
+                yield chunk
+        finally:
+            self.pool.release(pooled)
+
+
+class UpstreamPool:
+    """
+    gRPC channels to the Gemini API shared by every model client AIService creates.
+    Each channel is one HTTP/2 connection multiplexing concurrent calls; a call goes to
+    the channel with the fewest in flight. Keepalive pings hold idle connections open
+    (up to the provider's own limits), and start() connects every channel ahead of the
+    first request, then re-connects channels that went idle or failed every check_seconds.
+
+    Channels are opened on first use, since they belong to the event loop and the
+    service is built in a worker thread. An http:// endpoint is plaintext, for a local stub.
+    """
+
+    def __init__(
+        self,
+        endpoint: str,
+        api_key: Optional[str] = None,
+        size: int = 4,
+        keepalive_seconds: float = 300,
+        idle_timeout_seconds: float = 3600,
+        connect_timeout_seconds: float = 5,
+        check_seconds: float = 30
+    ):
+        url = urlparse(endpoint if "://" in endpoint else f"https://{endpoint}")
+        self.secure = url.scheme != "http"
+        self.target = f"{url.hostname}:{url.port or (443 if self.secure else 80)}"
+        self.api_key = api_key
+        self.size = size
+        self.keepalive_seconds = keepalive_seconds
+        self.idle_timeout_seconds = idle_timeout_seconds
+        self.connect_timeout_seconds = connect_timeout_seconds
+        self.check_seconds = check_seconds
+        self.channels: List[PooledChannel] = []
+        self._checker: Optional[asyncio.Task] = None
+        self.max_in_flight = 0
+        self.opened_at: Optional[float] = None
+
+    def client(self) -> PooledGenerativeClient:
+        return PooledGenerativeClient(self)
+
+    def _options(self) -> List[tuple]:
+        options = [
+            # Without this, channels to the same target share one connection
+            ("grpc.use_local_subchannel_pool", 1),
+            ("grpc.client_idle_timeout_ms", int(self.idle_timeout_seconds * 1000)),
+            ("grpc.max_send_message_length", -1),
+            ("grpc.max_receive_message_length", -1),
+        ]
+        if self.keepalive_seconds:
+            options += [
+                ("grpc.keepalive_time_ms", int(self.keepalive_seconds * 1000)),
+                ("grpc.keepalive_timeout_ms", 20000),
+                ("grpc.keepalive_permit_without_calls", 1),
+                ("grpc.http2.max_pings_without_data", 0),
+            ]
+        return options
+
+    def _open(self) -> None:
+        grpc = import_gemini("grpc")
+        aio = import_gemini("grpc.aio")
+        service = import_gemini("google.ai.generativelanguage_v1beta.services.generative_service")
+        transports = import_gemini("google.ai.generativelanguage_v1beta.services.generative_service.transports.grpc_asyncio")
+
+        if self.secure:
+            credentials = grpc.ssl_channel_credentials()
+            if self.api_key:
+                api_key = self.api_key
+                credentials = grpc.composite_channel_credentials(
+                    credentials,
+                    grpc.metadata_call_credentials(lambda context, callback: callback((("x-goog-api-key", api_key),), None))
+                )
+        for _ in range(self.size):
+            if self.secure:
+                channel = aio.secure_channel(self.target, credentials, options=self._options())
+            else:
+                channel = aio.insecure_channel(self.target, options=self._options())
+            pooled = PooledChannel(channel, service.GenerativeServiceAsyncClient(transport=transports.GenerativeServiceGrpcAsyncIOTransport(channel=channel)))
+            pooled.watcher = asyncio.create_task(self._watch(pooled))
+            self.channels.append(pooled)
+        self.opened_at = time.time()
+
+    async def _watch(self, pooled: PooledChannel) -> None:
+        """Track connectivity; every transition to READY is a new connection"""
+        ready = import_gemini("grpc").ChannelConnectivity.READY
+        state = pooled.channel.get_state()
+        while True:
+            await pooled.channel.wait_for_state_change(state)
+            state = pooled.channel.get_state()
+            pooled.state = state.name
+            if state == ready:
+                pooled.connects += 1
+                UPSTREAM_CONNECTS.inc()
+
+    def acquire(self) -> PooledChannel:
+        if not self.channels:
+            self._open()
+        pooled = min(self.channels, key=lambda channel: channel.in_flight)
+        pooled.in_flight += 1
+        pooled.calls += 1
+        self.max_in_flight = max(self.max_in_flight, sum(channel.in_flight for channel in self.channels))
+        return pooled
+
+    def release(self, pooled: PooledChannel) -> None:
+        pooled.in_flight -= 1
+
+    async def connect(self) -> int:
+        """Connect every channel now; returns how many are ready within the timeout"""
+        if not self.channels:
+            self._open()
+        results = await asyncio.gather(
+            *(asyncio.wait_for(pooled.channel.channel_ready(), self.connect_timeout_seconds) for pooled in self.channels),
+            return_exceptions=True
+        )
+        ready = sum(1 for result in results if not isinstance(result, BaseException))
+        if ready < len(self.channels):
+            logger.warning(json.dumps({"event": "upstream_connect_incomplete", "target": self.target, "ready": ready, "size": len(self.channels)}))
+        return ready
+
+    def start(self, preconnect: bool = True) -> None:
+        """Connect in the background, then keep re-connecting channels that went idle or failed"""
+        if self._checker is None:
+            self._checker = asyncio.create_task(self._keep_warm(preconnect))
+
+    async def _keep_warm(self, preconnect: bool) -> None:
+        if preconnect:
+            await self.connect()
+        while self.check_seconds:
+            await asyncio.sleep(self.check_seconds)
+            for pooled in self.channels:
+                # Starts connecting an idle channel (or one in backoff) ahead of the next call
+                pooled.channel.get_state(try_to_connect=True)
+
+    async def close(self) -> None:
+        if self._checker is not None:
+            self._checker.cancel()
+            self._checker = None
+        for pooled in self.channels:
+            if pooled.watcher is not None:
+                pooled.watcher.cancel()
+            await pooled.channel.close()
+        self.channels = []
+
+    def stats(self) -> Dict[str, Any]:
+        in_flight = sum(pooled.in_flight for pooled in self.channels)
+        return {
+            "target": self.target,
+            "size": self.size,
+            "open": len(self.channels),
+            "ready": sum(1 for pooled in self.channels if pooled.state == "READY"),
+            "in_flight": in_flight,
+            "max_in_flight": self.max_in_flight,
+            "busy_channels": sum(1 for pooled in self.channels if pooled.in_flight),
+            "calls": sum(pooled.calls for pooled in self.channels),
+            "connects": sum(pooled.connects for pooled in self.channels),
+        }
+
+
+def create_upstream_pool() -> Optional[UpstreamPool]:
+    """The shared pool when the provider talks to Gemini and LLM_POOL_ENABLED is on, else None"""
+    if not settings.LLM_POOL_ENABLED or settings.LLM_PROVIDER not in ("gemini", "record"):
+        return None
+    return UpstreamPool(
+        settings.LLM_API_ENDPOINT,
+        settings.GOOGLE_API_KEY,
+        size=settings.LLM_POOL_SIZE,
+        keepalive_seconds=settings.LLM_POOL_KEEPALIVE_SECONDS,
+        idle_timeout_seconds=settings.LLM_POOL_IDLE_TIMEOUT_SECONDS,
+        connect_timeout_seconds=settings.LLM_POOL_CONNECT_TIMEOUT_SECONDS,
+        check_seconds=settings.LLM_POOL_CHECK_SECONDS
+    )
@@ -0,0 +1,113 @@
+"""
+End-to-end latency benchmark: drives POST /api/chat through the FastAPI app
+in-process against the synthetic LLM provider, so it needs no network.
+
+Reports p50/p95/p99 request latency, throughput and per-node time
+(initial_router, chat, deep_dive) at each concurrency level.
+Response cache and coalescing are off by default so every request runs the graph.
+
+Run from backend/:  python -m benchmarks.bench_chat --concurrency 1 8 32 128
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from collections import defaultdict
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+QUESTIONS = [
+    "Hey how are you?",
+    "Tell me about your projects",
+    "What skills do you have?",
+    "Tell me about the Autofill Extension",
+    "How did you implement the AI in the Autofill Extension?",
+    "What did you do at 10xScale?",
+    "Which of your projects was the hardest and why?",
+    "I want a deep dive into your projects",
+]
+
+
+def percentiles(values):
+    if not values:
+        return 0.0, 0.0, 0.0
+    p50, p95, p99 = np.percentile(np.array(values) * 1000, [50, 95, 99])
+    return p50, p95, p99
+
+
+async def run_level(client, node_times, concurrency: int, requests: int):
+    latencies = []
+    failures = 0
+    node_times.clear()
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+
+    async def worker():
+        nonlocal failures
+        while not queue.empty():
+            i = queue.get_nowait()
+            body = {"messages": [{"role": "user", "content": f"{QUESTIONS[i % len(QUESTIONS)]} ({i})"}]}
+            start = time.perf_counter()
+            response = await client.post("/api/chat", json=body)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                failures += 1
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    p50, p95, p99 = percentiles(latencies)
+    print(f"{concurrency:>11} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {requests / elapsed:>10.1f} {failures:>6}")
+    for node in ("initial_router", "chat", "deep_dive"):
+        if node_times[node]:
+            n50, n95, _ = percentiles(node_times[node])
+            print(f"{'':>11}   {node:<15} n={len(node_times[node]):<5} p50 {n50:7.1f} ms  p95 {n95:7.1f} ms")
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--concurrency", type=int, nargs="+", default=[1, 8, 32, 128])
+    parser.add_argument("--requests", type=int, default=256, help="requests per concurrency level")
+    parser.add_argument("--latency", type=float, default=0.3, help="synthetic time to first token, seconds")
+    parser.add_argument("--tokens-per-second", type=float, default=200)
+    parser.add_argument("--response-tokens", type=int, default=120)
+    parser.add_argument("--with-caches", action="store_true", help="keep response cache and coalescing on")
+    parser.add_argument("--no-fast-router", action="store_true", help="send every turn through the LLM router")
+    args = parser.parse_args()
+
+    # Settings are read at import, so configure before loading the app
+    os.environ["LLM_PROVIDER"] = "synthetic"
+    os.environ["SYNTHETIC_LATENCY_SECONDS"] = str(args.latency)
+    os.environ["SYNTHETIC_TOKENS_PER_SECOND"] = str(args.tokens_per_second)
+    os.environ["SYNTHETIC_RESPONSE_TOKENS"] = str(args.response_tokens)
+    # Every request comes from one client IP, which the per-IP limit would throttle
+    os.environ["RATE_LIMIT_ENABLED"] = "false"
+    if not args.with_caches:
+        os.environ["RESPONSE_CACHE_ENABLED"] = "false"
+        os.environ["COALESCING_ENABLED"] = "false"
+    if args.no_fast_router:
+        os.environ["FAST_ROUTER_ENABLED"] = "false"
+
+    import httpx
+    from app.main import app, get_ai_service
+
+    ai_service = await get_ai_service()
+    node_times = defaultdict(list)
+    ai_service.node_observers.append(lambda node, seconds: node_times[node].append(seconds))
+
+    print(f"synthetic LLM: {args.latency}s to first token, {args.response_tokens} tokens at {args.tokens_per_second}/s")
+    print(f"{'concurrency':>11} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'req/s':>10} {'errors':>6}")
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=None) as client:
+        for concurrency in args.concurrency:
+            await run_level(client, node_times, concurrency, args.requests)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,108 @@
+"""
+Load benchmark: concurrent chats against a fake LLM with fixed latency.
+
+Compares a blocking LLM (every call is pushed onto the default thread
+executor, like the old sync nodes) with a natively async one.
+
+Run from backend/:  python -m benchmarks.bench_concurrency --sessions 500
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import threading
+from pathlib import Path
+from typing import Any, List, Optional
+
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+# Settings are read at import: every chat goes through the LLM router, so it makes the 2 calls the output reports,
+# and nothing talks to Gemini besides the fake LLM
+os.environ["FAST_ROUTER_ENABLED"] = "false"
+os.environ["CONTEXT_CACHE_PROVIDER"] = "none"
+
+from app.services.ai_services import AIService
+from app.services.llm_providers import ROUTER_MARKER
+
+ROUTE = '{"current_topic": "projects", "selected_item_id": 1, "imp_points": null, "mode": "chat", "needs_interrupt": false}'
+
+
+class BlockingFakeLLM(BaseChatModel):
+    """Sleeps synchronously; async calls fall back to the thread executor"""
+    latency: float = 0.2
+
+    @property
+    def _llm_type(self) -> str:
+        return "blocking-fake"
+
+    def _reply(self, messages: List[BaseMessage]) -> ChatResult:
+        content = ROUTE if ROUTER_MARKER in messages[0].content else "A short answer."
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content=content))])
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        time.sleep(self.latency)
+        return self._reply(messages)
+
+
+class AsyncFakeLLM(BlockingFakeLLM):
+    """Sleeps on the event loop without holding a thread"""
+
+    @property
+    def _llm_type(self) -> str:
+        return "async-fake"
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        await asyncio.sleep(self.latency)
+        return self._reply(messages)
+
+
+async def run(llm: BaseChatModel, sessions: int) -> dict:
+    service = AIService(llm=llm)
+    peak_threads = threading.active_count()
+    done = asyncio.Event()
+
+    async def sample_threads():
+        nonlocal peak_threads
+        while not done.is_set():
+            peak_threads = max(peak_threads, threading.active_count())
+            await asyncio.sleep(0.01)
+
+    sampler = asyncio.create_task(sample_threads())
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        service.chat([{"role": "user", "content": f"Tell me about your projects ({i})"}])
+        for i in range(sessions)
+    ))
+    elapsed = time.perf_counter() - start
+    done.set()
+    await sampler
+
+    return {"elapsed": elapsed, "throughput": sessions / elapsed, "peak_threads": peak_threads}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sessions", type=int, default=500)
+    parser.add_argument("--latency", type=float, default=0.2, help="seconds per fake LLM call")
+    args = parser.parse_args()
+
+    print(f"{args.sessions} concurrent sessions, 2 LLM calls each, {args.latency}s per call")
+    for name, llm in [
+        ("blocking (thread executor)", BlockingFakeLLM(latency=args.latency)),
+        ("native async", AsyncFakeLLM(latency=args.latency)),
+    ]:
+        result = asyncio.run(run(llm, args.sessions))
+        print(
+            f"{name:<28} {result['elapsed']:7.2f}s  "
+            f"{result['throughput']:8.1f} chats/s  "
+            f"peak threads {result['peak_threads']}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""
+Tail latency with and without hedged LLM calls, against a fake LLM whose latency
+has a long tail: most calls take around --latency seconds, --slow-fraction of them
+take --slow-factor times longer (a straggling backend), independently per call.
+
+Calls go through AIService._call_llm, so they take concurrency slots and record
+metrics like real node calls. Reports p50/p95/p99 latency and the LLM calls made
+per request, the extra cost of hedging.
+
+Run from backend/:  python -m benchmarks.bench_hedging --requests 2000
+"""
+import sys
+import random
+import asyncio
+import argparse
+import time
+from pathlib import Path
+from typing import Any, List, Optional
+
+import numpy as np
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage, BaseMessage, HumanMessage, SystemMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.services.ai_services import AIService
+from app.services.hedging import Hedger
+
+
+class TailLatencyLLM(BaseChatModel):
+    """Lognormal latency around `latency`, times `slow_factor` for a `slow_fraction` of calls"""
+    latency: float = 0.1
+    slow_fraction: float = 0.03
+    slow_factor: float = 10.0
+    calls: int = 0
+    seed: int = 0
+
+    @property
+    def _llm_type(self) -> str:
+        return "tail-latency-fake"
+
+    def _generate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        raise NotImplementedError
+
+    async def _agenerate(self, messages: List[BaseMessage], stop: Optional[List[str]] = None, run_manager: Any = None, **kwargs) -> ChatResult:
+        self.calls += 1
+        delay = self.latency * random.lognormvariate(0, 0.25)
+        if random.random() < self.slow_fraction:
+            delay *= self.slow_factor
+        await asyncio.sleep(delay)
+        return ChatResult(generations=[ChatGeneration(message=AIMessage(content="A short answer."))])
+
+
+async def run(service: AIService, llm: TailLatencyLLM, requests: int, concurrency: int):
+    llm.calls = 0
+    latencies = []
+    queue = asyncio.Queue()
+    for i in range(requests):
+        queue.put_nowait(i)
+    llm_input = [SystemMessage(content="You are a helpful assistant."), HumanMessage(content="Tell me about your projects")]
+
+    async def worker():
+        while not queue.empty():
+            queue.get_nowait()
+            start = time.perf_counter()
+            await service._call_llm("chat", llm_input)
+            latencies.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    p50, p95, p99 = np.percentile(np.array(latencies) * 1000, [50, 95, 99])
+    return p50, p95, p99, llm.calls / requests
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--requests", type=int, default=2000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--latency", type=float, default=0.1, help="typical seconds per fake LLM call")
+    parser.add_argument("--slow-fraction", type=float, default=0.03)
+    parser.add_argument("--slow-factor", type=float, default=10.0)
+    parser.add_argument("--percentile", type=float, default=settings.HEDGE_PERCENTILE, help="hedge after this latency percentile")
+    args = parser.parse_args()
+
+    random.seed(0)
+    llm = TailLatencyLLM(latency=args.latency, slow_fraction=args.slow_fraction, slow_factor=args.slow_factor)
+    service = AIService(llm=llm)
+
+    print(f"{'mode':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'calls/request':>14}")
+    for mode in ("off", "hedged"):
+        service.hedger = Hedger(
+            args.percentile,
+            settings.HEDGE_MIN_DELAY_SECONDS,
+            settings.HEDGE_MAX_FRACTION,
+            settings.HEDGE_MIN_SAMPLES
+        ) if mode == "hedged" else None
+        p50, p95, p99, calls = asyncio.run(run(service, llm, args.requests, args.concurrency))
+        print(f"{mode:>8} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f} {calls:>14.3f}")
+        if service.hedger is not None:
+            stats = service.hedger.stats()
+            print(f"  hedged {stats['hedged']} of {stats['calls']} calls, hedge finished first {stats['hedge_wins']} times")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+"""
+Bytes transferred and serve latency for the portfolio images: the original PNGs
+vs resized WebP/AVIF/PNG variants from /api/images.
+
+For each width and format: total bytes for all images, time to generate the
+variants (first request) and p50/p95 latency of serving them from the disk cache,
+plus revalidation (304) latency. Variants go to a temporary cache directory.
+
+Run from backend/:  python -m benchmarks.bench_images --widths 640 1280
+"""
+import os
+import sys
+import time
+import shutil
+import asyncio
+import argparse
+import tempfile
+from pathlib import Path
+
+import numpy as np
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+FORMATS = {"avif": "image/avif", "webp": "image/webp", "png": "image/png"}
+
+
+async def timed_get(client, url, headers=None):
+    start = time.perf_counter()
+    response = await client.get(url, headers=headers)
+    return response, (time.perf_counter() - start) * 1000
+
+
+async def run(args):
+    import httpx
+    from app.main import app, image_variants
+
+    sources = sorted(p.relative_to(image_variants.source_dir).as_posix() for p in image_variants.source_dir.rglob("*.png"))
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=120) as client:
+        original = 0
+        for source in sources:
+            response, _ = await timed_get(client, f"/api/images/{source}?format=original")
+            original += len(response.content)
+        print(f"{len(sources)} images, original total {original / 1024:.0f} KiB\n")
+
+        print(f"{'width':>6} {'format':>6} {'KiB':>8} {'vs original':>11} {'generate ms':>12} {'p50 ms':>7} {'p95 ms':>7} {'304 ms':>7}")
+        for width in args.widths:
+            for fmt in args.formats:
+                if fmt not in image_variants.formats:
+                    print(f"{width:>6} {fmt:>6}  (not supported by this Pillow build)")
+                    continue
+                total, generate, etags = 0, 0.0, []
+                for source in sources:
+                    response, elapsed = await timed_get(client, f"/api/images/{source}?w={width}&format={fmt}")
+                    total += len(response.content)
+                    generate += elapsed
+                    etags.append((source, response.headers["etag"]))
+
+                serve, revalidate = [], []
+                for _ in range(args.repeat):
+                    for source, etag in etags:
+                        serve.append((await timed_get(client, f"/api/images/{source}?w={width}&format={fmt}"))[1])
+                        revalidate.append((await timed_get(client, f"/api/images/{source}?w={width}&format={fmt}", {"if-none-match": etag}))[1])
+                print(f"{width:>6} {fmt:>6} {total / 1024:>8.0f} {total / original:>11.1%} {generate:>12.0f} "
+                      f"{np.percentile(serve, 50):>7.2f} {np.percentile(serve, 95):>7.2f} {np.percentile(revalidate, 50):>7.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--widths", type=int, nargs="+", default=[640, 1280, 1920])
+    parser.add_argument("--formats", nargs="+", default=list(FORMATS))
+    parser.add_argument("--repeat", type=int, default=20, help="warm requests per image")
+    args = parser.parse_args()
+
+    # Settings are read at import, so configure before loading the app
+    cache_dir = tempfile.mkdtemp(prefix="portfolio-images-")
+    os.environ["IMAGE_CACHE_DIR"] = cache_dir
+    os.environ["STARTUP_WARMUP"] = "false"
+    os.environ["TRACE_LOG_ENABLED"] = "false"
+    try:
+        asyncio.run(run(args))
+    finally:
+        shutil.rmtree(cache_dir)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Prompt size and build time as the portfolio data grows: full JSON dumps vs BM25 retrieval.
+
+The real projects/experience are replicated N times (with fresh ids) to simulate a
+larger portfolio. Token counts use the same estimate the service reports.
+
+Run from backend/:  python -m benchmarks.bench_retrieval
+"""
+import sys
+import copy
+import time
+import argparse
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config import settings
+from app.data.store import DataStore
+from app.services.history import estimate_tokens
+from app.services.prompt_cache import PromptCache
+from app.services.retrieval import BM25Index, chunk_basic_info, chunk_detailed_info
+
+QUERIES = [
+    "What projects have you built with LangGraph?",
+    "Which internship used Playwright?",
+    "How did you design the database for the testing platform?",
+    "What skills do you have in Python?",
+]
+
+
+def scale(data, section, key, factor):
+    """Copy of data with section.key's records repeated factor times"""
+    scaled = copy.deepcopy(data)
+    records = data[section][key]
+    scaled[section][key] = [
+        {**copy.deepcopy(record), "id": n * len(records) + i + 1}
+        for n in range(factor)
+        for i, record in enumerate(records)
+    ]
+    return scaled
+
+
+def measure(prompts, repeat=20):
+    tokens, elapsed = 0, 0.0
+    for query in QUERIES:
+        state = {"current_topic": None, "selected_item_id": None, "imp_points": None}
+        start = time.perf_counter()
+        for _ in range(repeat):
+            chat = prompts.chat_prompt(state, query=query)
+            deep_dive = prompts.deep_dive_prompt(state, query=query)
+        elapsed += (time.perf_counter() - start) / repeat
+        tokens += estimate_tokens(chat) + estimate_tokens(deep_dive)
+    return tokens / len(QUERIES), elapsed / len(QUERIES) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--factors", type=int, nargs="+", default=[1, 5, 20, 100])
+    parser.add_argument("--top-k", type=int, default=6)
+    args = parser.parse_args()
+
+    snapshot = DataStore(settings.DATA_DIR).snapshot
+    basic_info, detailed_info = snapshot.basic_info, snapshot.detailed_info
+
+    print(f"{'data x':>6} {'full tokens':>12} {'full ms':>8} {'rag tokens':>11} {'rag ms':>7} {'index ms':>9}")
+    for factor in args.factors:
+        basic = scale(scale(basic_info, "projects", "projects", factor), "experience", "experience", factor)
+        detailed = scale(scale(detailed_info, "det_projects", "projects", factor), "det_experience", "experience", factor)
+
+        full_tokens, full_ms = measure(PromptCache(basic, detailed))
+
+        start = time.perf_counter()
+        basic_index = BM25Index(chunk_basic_info(basic))
+        detailed_index = BM25Index(chunk_detailed_info(detailed))
+        index_ms = (time.perf_counter() - start) * 1000
+        rag_tokens, rag_ms = measure(PromptCache(basic, detailed, basic_index, detailed_index, top_k=args.top_k))
+
+        print(f"{factor:>6} {full_tokens:>12.0f} {full_ms:>8.3f} {rag_tokens:>11.0f} {rag_ms:>7.3f} {index_ms:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
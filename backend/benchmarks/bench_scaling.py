@@ -0,0 +1,124 @@
+"""
+Throughput as worker processes are added: starts the real server (python -m app.main)
+with WORKERS=N against the synthetic LLM, with the SQLite session store and response
+cache shared by all workers, and drives /api/chat from separate client processes.
+
+The default synthetic LLM answers instantly, so the numbers show how the Python side of
+a turn (routing, prompts, graph, serialization) scales with cores.
+
+Run from backend/:  python -m benchmarks.bench_scaling --workers 1 2 4
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import tempfile
+import subprocess
+import multiprocessing
+from pathlib import Path
+
+import httpx
+
+BACKEND = Path(__file__).parent.parent
+
+QUESTIONS = [
+    "Tell me about your projects",
+    "What skills do you have?",
+    "Tell me about the Autofill Extension",
+    "What did you do at 10xScale?",
+]
+
+
+async def drive(base_url: str, client_id: int, concurrency: int, duration: float) -> int:
+    """Send distinct questions for `duration` seconds; returns completed requests"""
+    completed = 0
+    deadline = time.perf_counter() + duration
+
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        async def worker(worker_id: int):
+            nonlocal completed
+            i = 0
+            while time.perf_counter() < deadline:
+                # Unique per request so the shared response cache can't answer it
+                content = f"{QUESTIONS[i % len(QUESTIONS)]} ({client_id}-{worker_id}-{i})"
+                response = await client.post("/api/chat", json={"messages": [{"role": "user", "content": content}]})
+                response.raise_for_status()
+                completed += 1
+                i += 1
+
+        await asyncio.gather(*(worker(w) for w in range(concurrency)))
+    return completed
+
+
+def client_process(args):
+    return asyncio.run(drive(*args))
+
+
+def wait_ready(base_url: str, timeout: float = 60) -> None:
+    deadline = time.perf_counter() + timeout
+    while time.perf_counter() < deadline:
+        try:
+            if httpx.get(f"{base_url}/ready", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError("server did not become ready")
+
+
+def run_level(workers: int, args, port: int) -> float:
+    state_dir = tempfile.mkdtemp(prefix="bench-scaling-")
+    env = {
+        **os.environ,
+        "WORKERS": str(workers),
+        "PORT": str(port),
+        "HOST": "127.0.0.1",
+        "RELOAD": "false",
+        "STARTUP_MODE": "lifespan",
+        "TRACE_LOG_ENABLED": "false",
+        # Every client connects from 127.0.0.1, which the per-IP limit would throttle
+        "RATE_LIMIT_ENABLED": "false",
+        "LLM_PROVIDER": "synthetic",
+        "SYNTHETIC_LATENCY_SECONDS": str(args.latency),
+        "SYNTHETIC_TOKENS_PER_SECOND": "1000000",
+        "SYNTHETIC_RESPONSE_TOKENS": str(args.response_tokens),
+        "RESPONSE_CACHE_PATH": os.path.join(state_dir, "response_cache.sqlite3"),
+        "SESSION_STORE_PATH": os.path.join(state_dir, "sessions.sqlite3"),
+    }
+    server = subprocess.Popen([sys.executable, "-m", "app.main"], cwd=BACKEND, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    base_url = f"http://127.0.0.1:{port}"
+    try:
+        wait_ready(base_url)
+        # Every worker builds its service during startup; give the last ones a moment
+        time.sleep(1 + workers * 0.5)
+        with multiprocessing.Pool(args.clients) as pool:
+            counts = pool.map(client_process, [(base_url, c, args.concurrency, args.duration) for c in range(args.clients)])
+        return sum(counts) / args.duration
+    finally:
+        server.terminate()
+        server.wait(timeout=30)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    parser.add_argument("--clients", type=int, default=2, help="load generator processes")
+    parser.add_argument("--concurrency", type=int, default=32, help="in-flight requests per client process")
+    parser.add_argument("--duration", type=float, default=10, help="seconds of load per level")
+    parser.add_argument("--latency", type=float, default=0.0, help="synthetic time to first token, seconds")
+    parser.add_argument("--response-tokens", type=int, default=40)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{os.cpu_count()} CPUs; {args.clients} client processes x {args.concurrency} in flight, {args.duration}s per level")
+    print(f"{'workers':>7} {'req/s':>10} {'speedup':>8}")
+    baseline = None
+    for workers in args.workers:
+        throughput = run_level(workers, args, args.port)
+        baseline = baseline or throughput
+        print(f"{workers:>7} {throughput:>10.1f} {throughput / baseline:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
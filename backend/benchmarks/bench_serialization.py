@@ -0,0 +1,119 @@
+"""
+Request parsing, response encoding and compression cost at realistic payload sizes.
+
+Parse: a ChatRequest with a growing history, as FastAPI does by default (json.loads,
+then validation) vs the orjson route class. Encode: a ChatResponse with a short chat
+answer up to a long deep-dive answer, via FastAPI's default JSONResponse path vs
+ORJSONResponse. Compress: size and time of gzip and brotli on the encoded response,
+plus a streamed answer compressed event by event as the middleware does.
+
+Run from backend/:  python -m benchmarks.bench_serialization
+"""
+import sys
+import json
+import time
+import argparse
+from pathlib import Path
+
+import orjson
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, ORJSONResponse
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.config import settings, ChatRequest, ChatResponse
+from app.data.store import DataStore
+from app.services.compression import GzipCompressor, BrotliCompressor, brotli
+
+
+def portfolio_text(snapshot) -> str:
+    """Prose from the portfolio data, so payloads compress like real answers do"""
+    return " ".join(str(value) for value in snapshot.detailed_info.values())
+
+
+def answer(text: str, chars: int, offset: int = 0) -> str:
+    offset %= len(text)
+    text = text[offset:] + text[:offset]
+    return (text * (chars // len(text) + 1))[:chars]
+
+
+def per_call_us(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1e6
+
+
+def bench_parse(text: str, history_sizes, repeat: int):
+    print(f"{'history':>8} {'bytes':>8} {'json+validate us':>17} {'orjson+validate us':>19} {'validate_json us':>17}")
+    for size in history_sizes:
+        messages = [
+            {"role": "user" if i % 2 == 0 else "assistant", "content": answer(text, 120 if i % 2 == 0 else 900, offset=i * 997)}
+            for i in range(size - 1)
+        ] + [{"role": "user", "content": "Tell me more about how the testing platform scaled"}]
+        body = json.dumps({
+            "messages": messages,
+            "state": {"current_topic": "projects", "selected_item_id": 2, "imp_points": ["scaling", "queues"], "mode": "deep_dive"},
+        }).encode("utf-8")
+        stdlib = per_call_us(lambda: ChatRequest.model_validate(json.loads(body)), repeat)
+        fast = per_call_us(lambda: ChatRequest.model_validate(orjson.loads(body)), repeat)
+        native = per_call_us(lambda: ChatRequest.model_validate_json(body), repeat)
+        print(f"{size:>8} {len(body):>8} {stdlib:>17.1f} {fast:>19.1f} {native:>17.1f}")
+
+
+def bench_encode(text: str, answer_sizes, repeat: int):
+    print(f"\n{'answer':>8} {'bytes':>8} {'default us':>11} {'orjson us':>10} "
+          f"{'gzip bytes':>11} {'gzip us':>8} {'br bytes':>9} {'br us':>7}")
+    for chars in answer_sizes:
+        response = ChatResponse(
+            response=answer(text, chars),
+            state={"current_topic": "projects", "selected_item_id": 2, "imp_points": ["scaling"], "mode": "deep_dive", "needs_interrupt": False},
+            input_tokens={"initial_router": 2100, "deep_dive": 1800},
+        )
+        default = per_call_us(lambda: JSONResponse(jsonable_encoder(response)).body, repeat)
+        fast = per_call_us(lambda: ORJSONResponse(response.model_dump()).body, repeat)
+        body = ORJSONResponse(response.model_dump()).body
+
+        gzip_body = GzipCompressor(settings.COMPRESSION_GZIP_LEVEL).finish(body)
+        gzip_us = per_call_us(lambda: GzipCompressor(settings.COMPRESSION_GZIP_LEVEL).finish(body), repeat)
+        if brotli is not None:
+            br_size = len(BrotliCompressor(settings.COMPRESSION_BROTLI_QUALITY).finish(body))
+            br_us = per_call_us(lambda: BrotliCompressor(settings.COMPRESSION_BROTLI_QUALITY).finish(body), repeat)
+        else:
+            br_size, br_us = 0, 0.0
+        print(f"{chars:>8} {len(body):>8} {default:>11.1f} {fast:>10.1f} "
+              f"{len(gzip_body):>11} {gzip_us:>8.1f} {br_size:>9} {br_us:>7.1f}")
+
+
+def bench_stream(text: str, chars: int):
+    """A streamed answer as SSE token events, compressed with a flush per event"""
+    words = answer(text, chars).split(" ")
+    events = [f"event: token\ndata: {json.dumps({'content': word + ' '})}\n\n".encode("utf-8") for word in words]
+    raw = sum(len(event) for event in events)
+    print(f"\nstreamed {chars}-char answer: {len(events)} events, {raw} bytes raw")
+    compressors = [("gzip", lambda: GzipCompressor(settings.COMPRESSION_GZIP_LEVEL))]
+    if brotli is not None:
+        compressors.append(("br", lambda: BrotliCompressor(settings.COMPRESSION_BROTLI_QUALITY)))
+    for name, make in compressors:
+        compressor = make()
+        start = time.perf_counter()
+        size = sum(len(compressor.chunk(event)) for event in events) + len(compressor.finish(b""))
+        elapsed = (time.perf_counter() - start) * 1e6
+        print(f"  {name:>4}: {size} bytes ({size / raw:.0%}), {elapsed / len(events):.1f} us per event")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--history", type=int, nargs="+", default=[1, 10, 40, 200], help="messages per request")
+    parser.add_argument("--answers", type=int, nargs="+", default=[300, 2000, 8000, 32000], help="answer sizes in characters")
+    parser.add_argument("--repeat", type=int, default=500)
+    args = parser.parse_args()
+
+    text = portfolio_text(DataStore(settings.DATA_DIR).snapshot)
+    bench_parse(text, args.history, args.repeat)
+    bench_encode(text, args.answers, args.repeat)
+    bench_stream(text, 8000)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,76 @@
+"""
+Startup cost: how long until a fresh process can answer liveness checks, and how
+long until it is ready to chat, for each STARTUP_MODE. Every measurement runs in a
+new interpreter so nothing is already imported.
+
+Also lists the slowest imports of app.main (python -X importtime).
+
+Run from backend/:  python -m benchmarks.bench_startup
+"""
+import os
+import sys
+import json
+import argparse
+import subprocess
+from pathlib import Path
+
+BACKEND = Path(__file__).parent.parent
+
+# Runs in the child: import the app, then drive its lifespan and first request in-process
+PROBE = """
+import time, json
+start = time.perf_counter()
+import app.main as main
+imported = time.perf_counter() - start
+from fastapi.testclient import TestClient
+with TestClient(main.app) as client:
+    live = time.perf_counter() - start
+    client.get("/api/sessions/stats")
+    ready = time.perf_counter() - start
+print(json.dumps({"import": imported, "live": live, "ready": ready}))
+"""
+
+
+def run_probe(env):
+    output = subprocess.run([sys.executable, "-c", PROBE], cwd=BACKEND, env=env, capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def slowest_imports(env, count):
+    stderr = subprocess.run([sys.executable, "-X", "importtime", "-c", "import app.main"], cwd=BACKEND, env=env, capture_output=True, text=True).stderr
+    rows = []
+    for line in stderr.splitlines():
+        if line.startswith("import time:") and "|" in line:
+            _, cumulative, name = line.split("|")
+            if cumulative.strip().isdigit():
+                rows.append((int(cumulative), name.rstrip()))
+    return sorted(rows, reverse=True)[:count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--provider", default="gemini", help="LLM_PROVIDER for the service; gemini needs no real key to start")
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--top", type=int, default=10, help="slowest imports to list")
+    args = parser.parse_args()
+
+    base_env = {**os.environ, "LLM_PROVIDER": args.provider, "GOOGLE_API_KEY": os.getenv("GOOGLE_API_KEY") or "startup-benchmark", "TRACE_LOG_ENABLED": "false", "DATA_POLL_SECONDS": "0"}
+    modes = [
+        ("lazy + warm-up", {"STARTUP_MODE": "lazy", "STARTUP_WARMUP": "true"}),
+        ("lazy", {"STARTUP_MODE": "lazy", "STARTUP_WARMUP": "false"}),
+        ("lifespan", {"STARTUP_MODE": "lifespan"}),
+    ]
+
+    print(f"{'mode':<16} {'import ms':>10} {'live ms':>10} {'ready ms':>10}   (best of {args.runs})")
+    for name, env in modes:
+        runs = [run_probe({**base_env, **env}) for _ in range(args.runs)]
+        best = {key: min(run[key] for run in runs) * 1000 for key in ("import", "live", "ready")}
+        print(f"{name:<16} {best['import']:>10.0f} {best['live']:>10.0f} {best['ready']:>10.0f}")
+
+    print(f"\nslowest imports of app.main (cumulative ms):")
+    for cumulative, name in slowest_imports(base_env, args.top):
+        print(f"{cumulative / 1000:>10.1f}  {name}")
+
+
+if __name__ == "__main__":
+    main()
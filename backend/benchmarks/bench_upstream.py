@@ -0,0 +1,186 @@
+"""
+Connection reuse of the upstream pool, offline: a stub Gemini gRPC server behind a
+TCP proxy that counts new connections and delays each one by --handshake-ms, standing
+in for the TCP+TLS setup a real connection to the API costs.
+
+Calls go through ChatGoogleGenerativeAI with the pool as its async client, like the
+app's. Reports first-call latency cold vs pre-connected, connections opened by a
+burst of concurrent calls (streamed and not), and the first call after the server
+dropped idle connections, with and without the pool re-connecting in the background.
+
+Run from backend/:  python -m benchmarks.bench_upstream --calls 200
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+from pathlib import Path
+
+import numpy as np
+
+# gRPC logs every GOAWAY from the stub's idle timeout otherwise
+os.environ.setdefault("GRPC_VERBOSITY", "ERROR")
+from grpc import aio
+
+sys.path.append(str(Path(__file__).parent.parent))
+
+from app.services.llm_providers import create_gemini_llm
+from app.services.upstream_pool import UpstreamPool
+
+SERVICE = "google.ai.generativelanguage.v1beta.GenerativeService"
+
+
+class StubGenerativeService:
+    """GenerateContent and StreamGenerateContent answering a fixed text after `latency` seconds"""
+
+    def __init__(self, latency: float):
+        from google.ai.generativelanguage_v1beta import types
+        self.types = types
+        self.latency = latency
+        self.requests = 0
+
+    def response(self, text: str):
+        types = self.types
+        return types.GenerateContentResponse(candidates=[types.Candidate(
+            content=types.Content(parts=[types.Part(text=text)], role="model"),
+            finish_reason=types.Candidate.FinishReason.STOP,
+        )])
+
+    async def generate(self, request, context):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        return self.response("A short answer.")
+
+    async def stream(self, request, context):
+        self.requests += 1
+        await asyncio.sleep(self.latency)
+        for word in ("A ", "short ", "answer."):
+            yield self.response(word)
+
+    def handler(self):
+        import grpc
+        request_type, response_type = self.types.GenerateContentRequest, self.types.GenerateContentResponse
+        return grpc.method_handlers_generic_handler(SERVICE, {
+            "GenerateContent": grpc.unary_unary_rpc_method_handler(
+                self.generate, request_deserializer=request_type.deserialize, response_serializer=response_type.serialize
+            ),
+            "StreamGenerateContent": grpc.unary_stream_rpc_method_handler(
+                self.stream, request_deserializer=request_type.deserialize, response_serializer=response_type.serialize
+            ),
+        })
+
+
+class CountingProxy:
+    """Relays TCP to the stub server, counting connections and delaying each new one"""
+
+    def __init__(self, upstream_port: int, handshake_seconds: float):
+        self.upstream_port = upstream_port
+        self.handshake_seconds = handshake_seconds
+        self.connections = 0
+
+    async def handle(self, reader, writer):
+        self.connections += 1
+        try:
+            await asyncio.sleep(self.handshake_seconds)
+            upstream_reader, upstream_writer = await asyncio.open_connection("127.0.0.1", self.upstream_port)
+        except asyncio.CancelledError:
+            # Still connecting when the benchmark shuts down
+            writer.close()
+            return
+
+        async def pipe(source, sink):
+            try:
+                while data := await source.read(65536):
+                    sink.write(data)
+                    await sink.drain()
+            except ConnectionError:
+                pass
+            finally:
+                sink.close()
+
+        try:
+            await asyncio.gather(pipe(reader, upstream_writer), pipe(upstream_reader, writer))
+        except asyncio.CancelledError:
+            # Still open when the benchmark shuts down
+            writer.close()
+
+
+async def timed_call(llm, stream: bool = False) -> float:
+    start = time.perf_counter()
+    if stream:
+        async for _ in llm.astream("Tell me about your projects"):
+            pass
+    else:
+        await llm.ainvoke("Tell me about your projects")
+    return (time.perf_counter() - start) * 1000
+
+
+async def main_async(args):
+    stub = StubGenerativeService(args.latency)
+    # The server drops connections idle for --server-idle seconds, like a provider's frontend would
+    server = aio.server(options=[("grpc.max_connection_idle_ms", int(args.server_idle * 1000))])
+    server.add_generic_rpc_handlers((stub.handler(),))
+    server_port = server.add_insecure_port("127.0.0.1:0")
+    await server.start()
+    proxy = CountingProxy(server_port, args.handshake_ms / 1000)
+    proxy_server = await asyncio.start_server(proxy.handle, "127.0.0.1", 0)
+    endpoint = f"http://127.0.0.1:{proxy_server.sockets[0].getsockname()[1]}"
+
+    def pool(check_seconds: float = 0) -> UpstreamPool:
+        return UpstreamPool(endpoint, size=args.pool_size, keepalive_seconds=args.keepalive, check_seconds=check_seconds)
+
+    print(f"pool size {args.pool_size}, {args.handshake_ms:.0f} ms per new connection, {args.latency * 1000:.0f} ms per call\n")
+
+    cold = pool()
+    llm = create_gemini_llm(upstream=cold)
+    before = proxy.connections
+    print(f"cold first call:          {await timed_call(llm):7.1f} ms, {proxy.connections - before} new connections")
+    await cold.close()
+
+    warm = pool()
+    before = proxy.connections
+    ready = await warm.connect()
+    llm = create_gemini_llm(upstream=warm)
+    print(f"pre-connected first call: {await timed_call(llm):7.1f} ms ({ready} channels connected at startup)")
+
+    before = proxy.connections
+    latencies = await asyncio.gather(*(timed_call(llm, stream=i % 2 == 1) for i in range(args.calls)))
+    p50, p99 = np.percentile(latencies, [50, 99])
+    stats = warm.stats()
+    print(f"{args.calls} concurrent calls:     p50 {p50:.1f} ms, p99 {p99:.1f} ms, {proxy.connections - before} new connections, "
+          f"{stats['max_in_flight']} max in flight over {stats['size']} channels")
+    await warm.close()
+
+    for check_seconds in (0, args.server_idle / 4):
+        idle = pool(check_seconds)
+        idle.start()
+        await asyncio.sleep(0.2)
+        llm = create_gemini_llm(upstream=idle)
+        await timed_call(llm)
+        await asyncio.sleep(args.server_idle * 2)
+        before = proxy.connections
+        label = "with re-connect" if check_seconds else "no re-connect"
+        print(f"after idle, {label:>15}: {await timed_call(llm):7.1f} ms, {proxy.connections - before} new connections on the call's path")
+        await idle.close()
+
+    print(f"\nstub served {stub.requests} calls over {proxy.connections} connections")
+    proxy_server.close()
+    await server.stop(None)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--calls", type=int, default=200)
+    parser.add_argument("--pool-size", type=int, default=4)
+    parser.add_argument("--latency", type=float, default=0.05, help="seconds per stub call")
+    parser.add_argument("--handshake-ms", type=float, default=100, help="delay per new connection")
+    parser.add_argument("--keepalive", type=float, default=0, help="keepalive ping seconds (0: off, so idle connections are dropped)")
+    parser.add_argument("--server-idle", type=float, default=1.0, help="server drops connections idle this long")
+    args = parser.parse_args()
+    os.environ.setdefault("GOOGLE_API_KEY", "offline")
+    asyncio.run(main_async(args))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+# Multi-worker launch profile, run from backend/:  gunicorn -c gunicorn.conf.py app.main:app
+# Workers, host and port come from Settings (WORKERS, HOST, PORT)
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).parent))
+
+from app.config import settings
+
+# Must be set before workers import prometheus_client, so /metrics can sum over all of them
+if settings.WORKERS > 1:
+    os.environ.setdefault("PROMETHEUS_MULTIPROC_DIR", tempfile.mkdtemp(prefix="portfolio-metrics-"))
+
+bind = f"{settings.HOST}:{settings.PORT}"
+workers = settings.WORKERS
+worker_class = "uvicorn.workers.UvicornWorker"
+# Restart a worker whose event loop stops heartbeating this long; slow LLM calls don't block it
+timeout = 60
+graceful_timeout = 30
+keepalive = 5
+
+
+def child_exit(server, worker):
+    if "PROMETHEUS_MULTIPROC_DIR" in os.environ:
+        from prometheus_client import multiprocess
+        multiprocess.mark_process_dead(worker.pid)
@@ -0,0 +1,16 @@
+import os
+import sys
+from pathlib import Path
+
+# Settings are read at import: run everything offline against the synthetic model
+os.environ.update({
+    "LLM_PROVIDER": "synthetic",
+    "SYNTHETIC_LATENCY_SECONDS": "0.01",
+    "SYNTHETIC_TOKENS_PER_SECOND": "100000",
+    "SYNTHETIC_RESPONSE_TOKENS": "20",
+    "TRACE_LOG_ENABLED": "false",
+    "DATA_POLL_SECONDS": "0",
+    "RESPONSE_CACHE_ENABLED": "false",
+})
+
+sys.path.insert(0, str(Path(__file__).parent.parent))
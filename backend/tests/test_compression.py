@@ -0,0 +1,52 @@
+import asyncio
+from pathlib import Path
+
+from app.services.compression import CompressionMiddleware
+from app.services.images import RangeFileResponse
+
+
+def run(app, scope):
+    sent = []
+
+    async def receive():
+        return {"type": "http.request", "body": b"", "more_body": False}
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(CompressionMiddleware(app, minimum_size=1)(scope, receive, send))
+    return sent
+
+
+def http_scope(**extra):
+    return {
+        "type": "http",
+        "method": "GET",
+        "path": "/",
+        "headers": [(b"accept-encoding", b"gzip, br")],
+        **extra,
+    }
+
+
+def test_pathsend_gets_the_held_start_message_first(tmp_path: Path):
+    path = tmp_path / "page.txt"
+    path.write_text("hello " * 100)
+    response = RangeFileResponse(path, None, path.stat(), media_type="text/plain")
+
+    sent = run(response, http_scope(extensions={"http.response.pathsend": {}}))
+
+    assert [message["type"] for message in sent] == ["http.response.start", "http.response.pathsend"]
+    headers = dict(sent[0]["headers"])
+    assert b"content-encoding" not in headers
+    assert headers[b"content-length"] == str(path.stat().st_size).encode()
+
+
+def test_body_is_still_compressed():
+    async def app(scope, receive, send):
+        await send({"type": "http.response.start", "status": 200, "headers": [(b"content-type", b"text/plain")]})
+        await send({"type": "http.response.body", "body": b"hello " * 100})
+
+    sent = run(app, http_scope())
+
+    assert [message["type"] for message in sent] == ["http.response.start", "http.response.body"]
+    assert dict(sent[0]["headers"])[b"content-encoding"] in (b"br", b"gzip")
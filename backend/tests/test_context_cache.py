@@ -0,0 +1,77 @@
+import asyncio
+
+import pytest
+from google.api_core import exceptions
+
+from app.config import settings
+from app.services.ai_services import AIService
+from app.services.llm_providers import SyntheticChatModel
+
+QUESTION = [{"role": "user", "content": "what is your favourite language"}]
+
+
+def cached_service(monkeypatch, fail: str = "none") -> AIService:
+    monkeypatch.setattr(settings, "CONTEXT_CACHE_PROVIDER", "stub")
+    monkeypatch.setattr(settings, "CONTEXT_CACHE_STUB_FAIL", fail)
+    monkeypatch.setattr(settings, "FAST_ROUTER_ENABLED", False)
+    return AIService()
+
+
+def record_calls(monkeypatch, error: Exception = None) -> list:
+    """cached_content of every synthetic model call; with error, calls referencing a handle raise it"""
+    calls = []
+    reply = SyntheticChatModel._reply
+
+    def spy(self, messages, cached_content=None, generation_config=None):
+        calls.append(cached_content)
+        if cached_content and error is not None:
+            raise error
+        return reply(self, messages, cached_content, generation_config)
+
+    monkeypatch.setattr(SyntheticChatModel, "_reply", spy)
+    return calls
+
+
+async def warm(service: AIService) -> None:
+    """Create the handles: the first call sends prefixes inline and registers them"""
+    await service.chat(QUESTION)
+    for _ in range(100):
+        if service.context_cache.stats()["live_handles"]:
+            return
+        await asyncio.sleep(0.01)
+
+
+def test_rate_limited_call_keeps_handle_and_is_not_resent_inline(monkeypatch):
+    service = cached_service(monkeypatch)
+    cache = service.context_cache
+
+    async def run():
+        await warm(service)
+        live = cache.stats()["live_handles"]
+        calls = record_calls(monkeypatch, exceptions.ResourceExhausted("quota exceeded"))
+        with pytest.raises(exceptions.ResourceExhausted):
+            await service.chat(QUESTION)
+        return live, calls
+
+    live, calls = asyncio.run(run())
+    assert live
+    assert calls and all(calls), "a 429 must not be retried with the prompt inline"
+    assert cache.stats()["invalidated"] == 0
+    assert cache.stats()["live_handles"] == live
+
+
+def test_rejected_handle_is_invalidated_and_resent_inline(monkeypatch):
+    service = cached_service(monkeypatch, fail="reject")
+    cache = service.context_cache
+
+    async def run():
+        await warm(service)
+        calls = record_calls(monkeypatch)
+        response = await service.chat(QUESTION)
+        return response, calls
+
+    response, calls = asyncio.run(run())
+    assert response["response"]
+    # Each node: one call by handle, rejected, then the same call inline
+    assert calls[0] is not None and calls[1] is None
+    assert cache.stats()["invalidated"] >= 1
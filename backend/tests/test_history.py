@@ -0,0 +1,48 @@
+from app.services.history import HistoryManager, summary_line
+
+
+def turns(prefix: str, count: int):
+    return [
+        {"role": "user" if i % 2 == 0 else "assistant", "content": f"{prefix} message {i} " + "words " * 20}
+        for i in range(count)
+    ]
+
+
+def summary(llm_input) -> list:
+    system_prompt = str(llm_input[0].content)
+    return system_prompt.split("(summary):**\n", 1)[1].split("\n") if "(summary)" in system_prompt else []
+
+
+def test_summary_grows_incrementally():
+    history = HistoryManager(budget_tokens=60, summary_tokens=10000)
+    conversation = turns("original", 8)
+    first = summary(history.build("system", conversation, "visitor"))
+    longer = summary(history.build("system", conversation + turns("later", 2), "visitor"))
+    assert longer[:len(first)] == first
+    assert len(longer) == len(set(longer)) > len(first)
+
+
+def test_edited_history_rebuilds_summary_instead_of_appending():
+    history = HistoryManager(budget_tokens=60, summary_tokens=10000)
+    history.build("system", turns("original", 8), "visitor")
+
+    # The client resends an edited, shorter history: nothing folded before is in it
+    edited = turns("edited", 6)
+    for _ in range(3):
+        lines = summary(history.build("system", edited, "visitor"))
+        assert not any("original" in line for line in lines)
+        assert len(lines) == len(set(lines))
+        assert lines == [summary_line(m) for m in edited[:len(lines)]]
+
+
+def test_truncated_history_does_not_duplicate_summary():
+    history = HistoryManager(budget_tokens=60, summary_tokens=10000)
+    conversation = turns("original", 10)
+    history.build("system", conversation, "visitor")
+
+    # Trimmed from the front past the last folded message, plus new turns
+    truncated = conversation[9:] + turns("new", 4)
+    first = summary(history.build("system", truncated, "visitor"))
+    again = summary(history.build("system", truncated, "visitor"))
+    assert first == again
+    assert first and set(first) <= {summary_line(m) for m in truncated}
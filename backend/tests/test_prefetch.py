@@ -0,0 +1,46 @@
+import asyncio
+
+from app.config import settings
+from app.services.ai_services import AIService
+
+
+def test_prefetched_answer_is_served_for_the_pick(monkeypatch):
+    monkeypatch.setattr(settings, "PREFETCH_ENABLED", True)
+    monkeypatch.setattr(settings, "FAST_ROUTER_ENABLED", True)
+    service = AIService()
+    prefetcher = service.prefetcher
+
+    async def conversation():
+        shown = await service.chat([{"role": "user", "content": "I want a deep dive into your projects"}], session_id="visitor")
+        assert shown["needs_interrupt"] and shown["state"]["mode"] == "deep_dive"
+
+        for _ in range(200):
+            if prefetcher.stats()["ready"] == settings.PREFETCH_ITEMS_PER_TURN:
+                break
+            await asyncio.sleep(0.01)
+        answers = {key[4]: entry.content for key, entry in prefetcher._entries.items()}
+        assert answers
+
+        item_id, answer = next(iter(answers.items()))
+        picked = await service.chat([{"role": "user", "content": f'Selected: {{"type": "project", "id": {item_id}}}'}], session_id="visitor")
+        return answer, picked
+
+    answer, picked = asyncio.run(conversation())
+    assert picked["response"] == answer
+    assert picked["state"]["selected_item_id"] is not None
+    assert prefetcher.stats()["hits"] == 1
+
+
+def test_no_prefetch_after_an_overview(monkeypatch):
+    monkeypatch.setattr(settings, "PREFETCH_ENABLED", True)
+    monkeypatch.setattr(settings, "FAST_ROUTER_ENABLED", True)
+    service = AIService()
+
+    async def conversation():
+        overview = await service.chat([{"role": "user", "content": "Tell me about your projects"}], session_id="visitor")
+        assert not overview["needs_interrupt"]
+        await asyncio.sleep(0.05)
+
+    asyncio.run(conversation())
+    stats = service.prefetcher.stats()
+    assert stats["queued"] == stats["running"] == stats["ready"] == stats["generated"] == 0
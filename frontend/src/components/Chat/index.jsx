@@ -2,7 +2,7 @@ import { useState, useRef, useEffect } from 'react';
 import ChatMessage from './ChatMessage';
 import ChatInput from './ChatInput';
 import SelectionUI from './SelectionUI';
-import { sendChatMessage } from '../../services/api';
+import { streamChatMessage } from '../../services/api';
 import { MessageCircle } from 'lucide-react';
 import { ALL_EXPERIENCES, ALL_PROJECTS } from '../../data/portfolioItems';
 
@@ -15,6 +15,8 @@ export default function Chat({ scrollToSection }) {
   const [loading, setLoading] = useState(false);
   const [conversationState, setConversationState] = useState(null);
   const [needs_interrupt, setNeedsInterrupt] = useState(false); 
+  // History and state live server-side under this id; each turn sends only the new message
+  const sessionIdRef = useRef(crypto.randomUUID());
   const messagesEndRef = useRef(null);
   const chatContainerRef = useRef(null);
 
@@ -43,6 +45,34 @@ export default function Chat({ scrollToSection }) {
     }
   };
 
+  // Streams one turn into the message list and returns the final payload
+  const runChatTurn = async (newMessage) => {
+    let streamed = false;
+    const data = await streamChatMessage([newMessage], null, {
+      sessionId: sessionIdRef.current,
+      onToken: (token) => {
+        setLoading(false);
+        if (!streamed) {
+          streamed = true;
+          setMessages(prev => [...prev, { role: 'assistant', content: token }]);
+        } else {
+          setMessages(prev => [
+            ...prev.slice(0, -1),
+            { role: 'assistant', content: prev[prev.length - 1].content + token }
+          ]);
+        }
+      }
+    });
+
+    // Selection prompts produce no tokens, so they only arrive with the final payload
+    if (streamed) {
+      setMessages(prev => [...prev.slice(0, -1), { role: 'assistant', content: data.response }]);
+    } else {
+      setMessages(prev => [...prev, { role: 'assistant', content: data.response }]);
+    }
+    return data;
+  };
+
   const handleSend = async () => {
     if (!input.trim()) return;
     
@@ -52,14 +82,10 @@ export default function Chat({ scrollToSection }) {
     setLoading(true);
     
     try {
-      const data = await sendChatMessage(
-        [...messages, { role: 'user', content: userMessage }],
-        conversationState
-      );
+      const data = await runChatTurn({ role: 'user', content: userMessage });
       
       console.log('Response data:', data);
       
-      setMessages(prev => [...prev, { role: 'assistant', content: data.response }]);
       setConversationState(data.state);
       
       // Check if HITL triggered
@@ -96,14 +122,10 @@ export default function Chat({ scrollToSection }) {
     setLoading(true);
     
     try {
-      const data = await sendChatMessage(
-        [...messages, { role: 'user', content: selectionMessage }],
-        conversationState
-      );
+      const data = await runChatTurn({ role: 'user', content: selectionMessage });
       
       console.log('Response after selection:', data);
       
-      setMessages(prev => [...prev, { role: 'assistant', content: data.response }]);
       setConversationState(data.state);
       
       // Check if another interrupt is needed (shouldn't happen normally)
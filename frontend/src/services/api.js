@@ -4,15 +4,66 @@ import axios from 'axios';
 
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
-export const sendChatMessage = async (messages, state = null) => {
+// With a sessionId, pass only the new message; the backend keeps history and state
+export const sendChatMessage = async (messages, state = null, sessionId = null) => {
   try {
     const response = await axios.post(`${API_BASE_URL}/api/chat`, {  
       messages,
-      state
+      state,
+      session_id: sessionId
     });
     return response.data;
   } catch (error) {
     console.error('API Error:', error);
     throw error;
   }
-};
\ No newline at end of file
+};
+
+// Parses one "event: ...\ndata: ..." SSE frame into { event, data }
+const parseSSEFrame = (frame) => {
+  let event = 'message';
+  let data = '';
+  for (const line of frame.split('\n')) {
+    if (line.startsWith('event:')) event = line.slice(6).trim();
+    else if (line.startsWith('data:')) data += line.slice(5).trim();
+  }
+  return { event, data: data ? JSON.parse(data) : null };
+};
+
+export const streamChatMessage = async (messages, state = null, { onRouting, onToken, sessionId = null } = {}) => {
+  const response = await fetch(`${API_BASE_URL}/api/chat/stream`, {
+    method: 'POST',
+    headers: { 'Content-Type': 'application/json' },
+    body: JSON.stringify({ messages, state, session_id: sessionId })
+  });
+  if (!response.ok) {
+    throw new Error(`API Error: ${response.status}`);
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+  let result = null;
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+    buffer += decoder.decode(value, { stream: true });
+
+    let boundary;
+    while ((boundary = buffer.indexOf('\n\n')) !== -1) {
+      const { event, data } = parseSSEFrame(buffer.slice(0, boundary));
+      buffer = buffer.slice(boundary + 2);
+
+      if (event === 'routing') onRouting?.(data);
+      else if (event === 'token') onToken?.(data.content);
+      else if (event === 'done') result = data;
+      else if (event === 'error') throw new Error(data.detail);
+    }
+  }
+
+  if (!result) {
+    throw new Error('Stream ended without a final response');
+  }
+  return result;
+};